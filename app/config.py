@@ -3,7 +3,8 @@
 """
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -37,9 +38,38 @@ class Settings(BaseSettings):
     FRONTEND_DIR: Path = BASE_DIR / "frontend"
     TRAINING_DATA_DIR: Path = BASE_DIR / "training" / "data"
 
+    # ML training
+    ML_HYPERPARAM_SEARCH: bool = False  # Пошук гіперпараметрів при повному перенавчанні
+    ML_SEARCH_BUDGET_SECONDS: int = 120  # Ліміт часу на пошук
+    ML_SEARCH_MAX_CANDIDATES: int = 12  # Скільки комбінацій перевіряє пошук
+    ML_SEARCH_SPACE: Dict[str, List[Any]] = {  # Параметри SGDClassifier (JSON в .env)
+        "loss": ["log_loss", "modified_huber"],  # обидва дають predict_proba
+        "penalty": ["l2", "elasticnet"],
+        "alpha": [1e-6, 1e-5, 1e-4, 1e-3],
+    }
+    ML_LATENCY_BUDGET_P99_MS: float = 50.0  # Моделі з повільнішим p99 не активуються (0 - без ліміту)
+    ML_ARTIFACT_KEEP_LAST: int = 5  # Скільки останніх версій моделі лишає GC
+    ML_ARTIFACT_KEEP_BEST: int = 3  # Скільки найкращих за F1 версій лишає GC
+    ML_RETRAIN_QUIET_MINUTES: int = 10  # Перенавчання після стількох хвилин без нового feedback
+    ML_RETRAIN_MAX_WAIT_HOURS: int = 6  # Після цього quiet period не чекаємо
+    ML_RETRAIN_OFFPEAK_START_HOUR: Optional[int] = None  # Off-peak вікно (локальна година),
+    ML_RETRAIN_OFFPEAK_END_HOUR: Optional[int] = None  # наприклад 22 -> 6; None - будь-коли
+    FEEDBACK_EXPORT_DEBOUNCE_SECONDS: float = 5.0  # Вікно об'єднання сигналів експорту feedback
+    TRAINING_EXPORT_FORMAT: str = "csv"  # "csv" або "parquet" (ML логи, партиції по місяцях)
+    ML_TRAINING_DATA_SOURCE: str = "database"  # "database" або "partitions" (Parquet експорт)
+
     class Config:
         env_file = ".env"
         case_sensitive = True
 
+    @model_validator(mode="after")
+    def _check_training_data_source(self) -> "Settings":
+        # Партиції оновлює лише parquet експорт - з csv навчання читало б застарілі дані
+        if self.ML_TRAINING_DATA_SOURCE == "partitions" and self.TRAINING_EXPORT_FORMAT != "parquet":
+            raise ValueError(
+                'ML_TRAINING_DATA_SOURCE="partitions" requires TRAINING_EXPORT_FORMAT="parquet"'
+            )
+        return self
+
 
 settings = Settings()
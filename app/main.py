@@ -39,6 +39,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # === Routers ===
@@ -77,8 +78,12 @@ def _shutdown_ml_scheduler():
     Зупиняємо scheduler при shutdown.
     """
     from app.services.ml_scheduler import ml_scheduler
+    from app.services.training_worker_service import training_worker_service
+    from app.services.feedback_export_worker import feedback_export_worker
 
     ml_scheduler.stop()
+    training_worker_service.shutdown()
+    feedback_export_worker.shutdown()
 
 
 # === API ===
@@ -1,19 +1,31 @@
+import hashlib
 from pathlib import Path
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 import joblib
 from deep_translator import GoogleTranslator
 
+from app.services.model_artifact_service import model_artifact_service
+
 
 class MLClassifier:
     """
     Обгортка над sklearn-пайплайном для прогнозу пріоритету інциденту.
-    Використовує артефакт artifacts/model_pri_text.joblib
-    (TF-IDF + LogisticRegression, навчений на англомовних тікетах).
+    Використовує активну версію з artifacts/current_model.json
+    (ModelArtifactService), а до першої активації - базовий артефакт
+    artifacts/model_pri_text.joblib (TF-IDF + LogisticRegression,
+    навчений на англомовних тікетах).
+
+    Артефакт може бути sklearn Pipeline або dict {"model", "vectorizer"}
+    (формат ActiveLearningService); vectorizer доступний окремо, щоб інші
+    сервіси (skill matching) використовували ту саму токенізацію.
     """
 
     def __init__(self):
         self.model = None
+        self.vectorizer = None
+        self.classifier = None
+        self.vectorizer_fingerprint: Optional[str] = None
         base_dir = Path(__file__).resolve().parent.parent
         self.artifacts_dir = base_dir / "artifacts"
         self.model_path = self.artifacts_dir / "model_pri_text.joblib"
@@ -22,13 +34,48 @@ class MLClassifier:
         self.translator = GoogleTranslator(source="auto", target="en")
 
     def load(self):
+        self.model_path = model_artifact_service.current_path()
         if not self.model_path.exists():
             print(f"[ML] WARNING: Файл моделі не знайдено: {self.model_path}")
             self.model = None
             return
         self.model = joblib.load(self.model_path)
+
+        if isinstance(self.model, dict):
+            self.vectorizer = self.model["vectorizer"]
+            self.classifier = self.model["model"]
+        else:
+            self.vectorizer = self.model[:-1]
+            self.classifier = self.model[-1]
+
+        self.vectorizer_fingerprint = self.fingerprint(self.vectorizer)
         print(f"[ML] SUCCESS: Модель пріоритету завантажено: {self.model_path}")
 
+    def reload_if_changed(self) -> bool:
+        """Перезавантажує модель, якщо pointer вказує на інший файл (нова активація)."""
+        path = model_artifact_service.current_path()
+        if path == self.model_path and (self.model is not None or not path.exists()):
+            return False
+        self.load()
+        return True
+
+    @staticmethod
+    def fingerprint(vectorizer) -> Optional[str]:
+        """Хеш простору ознак: змінюється разом з vocabulary TF-IDF після перенавчання."""
+        steps = [step for _, step in vectorizer.steps] if hasattr(vectorizer, "steps") else [vectorizer]
+        for step in steps:
+            vocabulary = getattr(step, "vocabulary_", None)
+            if vocabulary is not None:
+                digest = hashlib.md5()
+                for term, idx in sorted(vocabulary.items()):
+                    digest.update(f"{term}\t{idx}\n".encode("utf-8"))
+                return digest.hexdigest()
+            # Stateless векторизатор (HashingVectorizer): простір ознак задають параметри
+            if hasattr(step, "n_features"):
+                digest = hashlib.md5(repr(sorted(step.get_params().items())).encode("utf-8"))
+                return digest.hexdigest()
+        return None
+
     def _to_english(self, text: str) -> str:
         """
         Переклад тексту в англійську. Якщо щось пішло не так – повертаємо оригінал.
@@ -44,19 +91,61 @@ class MLClassifier:
             print(f"[ML] WARNING: Не вдалося перекласти текст: {e}")
             return text  # fallback: без перекладу
 
+    def transform(self, text: str):
+        """
+        Переклад + TF-IDF вектор тексту (sparse, 1 x vocabulary) для predict_priority_vector.
+        """
+        if self.model is None:
+            raise RuntimeError("ML модель не завантажена.")
+
+        return self.vectorize_texts([self._to_english(text)])
+
+    def transform_with_source(self, text: str):
+        """
+        (вектор без перекладу для skill matching, вектор для predict_priority_vector).
+
+        Якщо переклад не змінив текст (вже англійською або перекладач
+        недоступний), TF-IDF рахується один раз для обох.
+        """
+        if self.model is None:
+            raise RuntimeError("ML модель не завантажена.")
+
+        text = (text or "").strip()
+        source_vector = self.vectorize_texts([text])
+        translated = self._to_english(text)
+        if translated == text:
+            return source_vector, source_vector
+        return source_vector, self.vectorize_texts([translated])
+
+    def vectorize_texts(self, texts: List[str]):
+        """
+        TF-IDF вектори текстів без перекладу (sparse, len(texts) x vocabulary).
+
+        Простір skill matching: тікети, specialty та історія агентів
+        векторизуються саме так, щоб cosine порівнював тексти з однаковою
+        обробкою (переклад історії тікетів - мережевий виклик на кожен тікет).
+        """
+        if self.vectorizer is None:
+            raise RuntimeError("ML модель не завантажена.")
+
+        return self.vectorizer.transform(texts)
+
     def predict_priority(self, text: str) -> Tuple[str, float]:
         """
         Повертає (label, confidence), де:
         - label: 'high' / 'medium' / 'low',
         - confidence: ймовірність цього класу (0..1).
         """
+        return self.predict_priority_vector(self.transform(text))
+
+    def predict_priority_vector(self, text_vector) -> Tuple[str, float]:
+        """predict_priority для вже векторизованого тексту (результат transform)."""
         if self.model is None:
             raise RuntimeError("ML модель не завантажена.")
 
-        text_en = self._to_english(text)
-        probs = self.model.predict_proba([text_en])[0]
+        probs = self.classifier.predict_proba(text_vector)[0]
         idx = probs.argmax()
-        label = self.model.classes_[idx]
+        label = self.classifier.classes_[idx]
         conf = float(probs[idx])
 
         print(f"[ML] predict: {label} ({conf:.3f})")
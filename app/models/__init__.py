@@ -9,6 +9,10 @@ from app.models.comment import TicketComment
 from app.models.ml_log import MLPredictionLog
 from app.models.settings import SystemSettings
 from app.models.ml_model_metadata import MLModelMetadata, MLTrainingJob
+from app.models.agent_workload import AgentWorkload
+from app.models.cache_version import CacheVersion
+from app.models.agent_keyword_count import AgentKeywordCount
+from app.models.scheduler_lease import SchedulerLease
 
 __all__ = [
     "User",
@@ -20,4 +24,8 @@ __all__ = [
     "SystemSettings",
     "MLModelMetadata",
     "MLTrainingJob",
+    "AgentWorkload",
+    "CacheVersion",
+    "AgentKeywordCount",
+    "SchedulerLease",
 ]
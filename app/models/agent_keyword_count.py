@@ -0,0 +1,31 @@
+"""
+AgentKeywordCount model - профіль експертизи агента (ключові слова вирішених тікетів)
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+
+from app.database import Base
+
+
+class AgentKeywordCount(Base):
+    """
+    Скільки разів ключове слово зустрічалось у вирішених агентом тікетах.
+
+    Оновлюється LearningService, коли тікет стає RESOLVED/CLOSED або коли
+    автопризначення підтверджено (в тій самій транзакції, що і зміна тікета).
+    """
+    __tablename__ = "agent_keyword_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    keyword = Column(String(100), primary_key=True, index=True)
+    count = Column(Integer, default=0, nullable=False)
+
+    # Count з експоненційним затуханням (старі тікети важать менше), станом на decayed_at
+    decayed_count = Column(Float, default=0.0, nullable=False)
+    decayed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Метадані
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AgentKeywordCount user={self.user_id} {self.keyword}={self.count}>"
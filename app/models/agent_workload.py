@@ -0,0 +1,26 @@
+"""
+AgentWorkload model - матеріалізований лічильник активних тікетів агента
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+
+from app.database import Base
+
+
+class AgentWorkload(Base):
+    """
+    Кількість активних (NEW/TRIAGE/IN_PROGRESS) тікетів, призначених агенту.
+
+    Оновлюється TicketService в тій самій транзакції, що і зміна тікета.
+    Періодична reconciliation-задача виправляє можливий дрейф.
+    """
+    __tablename__ = "agent_workload"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    active_tickets = Column(Integer, default=0, nullable=False)
+
+    # Метадані
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AgentWorkload user={self.user_id} active={self.active_tickets}>"
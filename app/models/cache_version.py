@@ -0,0 +1,27 @@
+"""
+CacheVersion model - лічильники версій для in-process кешів
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.database import Base
+
+
+class CacheVersion(Base):
+    """
+    Версія даних, з яких будується кеш (наприклад, пул кандидатів на assignment).
+
+    Writer збільшує version в тій самій транзакції, що і зміну даних.
+    Кожен worker порівнює version з версією свого кешу (один запит по PK)
+    і перебудовує кеш, якщо вона змінилась.
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+    # Метадані
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
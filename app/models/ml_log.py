@@ -34,7 +34,7 @@ class MLPredictionLog(Base):
     priority_feedback_previous = Column(SQLEnum(PriorityEnum), nullable=True)
     priority_feedback_reason = Column(Text, nullable=True)
     priority_feedback_author_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    priority_feedback_recorded_at = Column(DateTime, nullable=True)
+    priority_feedback_recorded_at = Column(DateTime, nullable=True, index=True)
 
     # Метадані ML
     model_version = Column(String(50), nullable=True)
@@ -32,6 +32,15 @@ class MLModelMetadata(Base):
     # Кількість тренувальних прикладів
     training_samples_count = Column(Integer, nullable=True)
 
+    # Benchmark швидкодії (ModelBenchmarkService) на фіксованому корпусі
+    benchmark_p50_ms = Column(Float, nullable=True)
+    benchmark_p99_ms = Column(Float, nullable=True)
+    benchmark_throughput = Column(JSON, nullable=True)  # {batch_size: прогнозів/сек}
+    benchmark_load_ms = Column(Float, nullable=True)
+    benchmark_artifact_bytes = Column(Integer, nullable=True)
+    benchmark_rss_mb = Column(Float, nullable=True)
+    benchmarked_at = Column(DateTime, nullable=True)
+
     # Чи активна ця модель зараз
     is_active = Column(Boolean, default=False, nullable=False)
 
@@ -57,9 +66,20 @@ class MLTrainingJob(Base):
     started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed_at = Column(DateTime, nullable=True)
 
-    # Статус: RUNNING, COMPLETED, FAILED
+    # Статус: QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED
     status = Column(String(20), default="RUNNING", nullable=False, index=True)
 
+    # Поточна фаза (LOAD_DATA, VECTORIZE, FIT, EVALUATE, SAVE, DONE) і прогрес 0..1
+    phase = Column(String(20), nullable=True)
+    progress = Column(Float, default=0.0, nullable=False)
+
+    # Запит на скасування (worker перевіряє його між фазами)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+
+    # Процеси (host:pid:token), що поставили job в чергу і виконали його
+    queued_by = Column(String(100), nullable=True)
+    executed_by = Column(String(100), nullable=True)
+
     # Версія моделі яка вийшла з цього job
     model_version = Column(String(50), nullable=True)
 
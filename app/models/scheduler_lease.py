@@ -0,0 +1,29 @@
+"""
+SchedulerLease model - lease лідера для фонових задач між процесами
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+
+from app.database import Base
+
+
+class SchedulerLease(Base):
+    """
+    Хто з процесів (uvicorn workers) зараз виконує scheduled задачі.
+
+    Лідер періодично продовжує expires_at (heartbeat). Якщо він впав,
+    lease спливає, і інший процес перехоплює його умовним UPDATE.
+    """
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)
+
+    # Ідентифікатор процесу-власника: host:pid:token
+    holder = Column(String(100), nullable=False)
+
+    acquired_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    renewed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} holder={self.holder} expires={self.expires_at}>"
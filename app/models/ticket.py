@@ -2,7 +2,7 @@
 Ticket model з ML полями
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Boolean, Float, DateTime, ForeignKey, Enum as SQLEnum, Table
+from sqlalchemy import Column, Integer, String, Text, Boolean, Float, DateTime, ForeignKey, Enum as SQLEnum, Table, Index
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -24,6 +24,10 @@ class Ticket(Base):
     Модель тікету (інциденту) з повною підтримкою ML та тріажу
     """
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Порядок списку GET /tickets (keyset пагінація)
+        Index("ix_tickets_list_order", "triage_required", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -54,7 +58,7 @@ class Ticket(Base):
     ensemble_reasoning = Column(Text, nullable=True)  # Пояснення рішення
 
     # === Triage поля ===
-    triage_required = Column(Boolean, default=False, index=True)
+    triage_required = Column(Boolean, default=False, nullable=False, index=True)
     triage_reason = Column(SQLEnum(TriageReasonEnum), nullable=True)
     self_assign_locked = Column(Boolean, default=False)
 
@@ -73,6 +77,9 @@ class Ticket(Base):
     assignment_confirmed_at = Column(DateTime, nullable=True)  # Коли підтверджено/відхилено
     assignment_feedback = Column(Text, nullable=True)  # Коментар спеціаліста
 
+    # Агент, якому зараховано ключові слова тікета в agent_keyword_counts (None = не зараховано)
+    expertise_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
     # === Smart Assignment Decision Logging ===
     assignment_method = Column(String(50), nullable=True)  # LLM_ONLY, SMART_SERVICE, HYBRID, MANUAL
     assignment_confidence = Column(Float, nullable=True)  # Confidence score (0-1)
@@ -11,6 +11,7 @@ from app.schemas.user import UserOut, UserCreate, UserLogin
 from app.models.user import User
 from app.core.security import verify_password, get_password_hash, create_access_token
 from app.core.deps import get_current_active_user
+from app.services.candidate_pool_service import candidate_pool_service
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -39,6 +40,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
+    candidate_pool_service.mark_changed(db)
     db.commit()
     db.refresh(new_user)
 
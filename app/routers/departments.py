@@ -9,6 +9,7 @@ from app.database import get_db
 from app.core.deps import get_current_active_user, require_admin
 from app.models.user import User
 from app.models.department import Department
+from app.services.candidate_pool_service import candidate_pool_service
 from pydantic import BaseModel
 
 
@@ -81,6 +82,7 @@ def create_department(
         lead_user_id=dept_data.lead_user_id
     )
     db.add(new_dept)
+    candidate_pool_service.mark_changed(db)
     db.commit()
     db.refresh(new_dept)
     return new_dept
@@ -141,6 +143,7 @@ def update_department(
             raise HTTPException(status_code=400, detail="User must have LEAD or ADMIN role")
         dept.lead_user_id = dept_data.lead_user_id
 
+    candidate_pool_service.mark_changed(db)
     db.commit()
     db.refresh(dept)
     return dept
@@ -170,6 +173,7 @@ def delete_department(
         )
 
     db.delete(dept)
+    candidate_pool_service.mark_changed(db)
     db.commit()
 
     return {"success": True, "message": "Department deleted"}
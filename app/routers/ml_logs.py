@@ -1,17 +1,70 @@
 """Endpoints for exposing ML/LLM prediction logs to the UI."""
-from typing import List, Optional
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session, joinedload
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.core.deps import require_lead_or_admin
 from app.models.ml_log import MLPredictionLog
+from app.models.ticket import Ticket
 from app.models.user import User
 from app.schemas.ml import MLPredictionLogOut
 
 router = APIRouter(prefix="/ml/logs", tags=["ml"])
 
+# Rows fetched from the DB cursor (and flushed to the client) per chunk
+EXPORT_BATCH_SIZE = 1000
+
+# Columns available in /ml/logs/export (name -> column expression)
+EXPORT_COLUMNS = {
+    "id": MLPredictionLog.id,
+    "ticket_id": MLPredictionLog.ticket_id,
+    "ticket_title": Ticket.title,
+    "ticket_description": Ticket.description,
+    "created_at": MLPredictionLog.created_at,
+    "model_version": MLPredictionLog.model_version,
+    "input_text": MLPredictionLog.input_text,
+    "priority_predicted": MLPredictionLog.priority_predicted,
+    "priority_confidence": MLPredictionLog.priority_confidence,
+    "priority_llm_predicted": MLPredictionLog.priority_llm_predicted,
+    "priority_llm_confidence": MLPredictionLog.priority_llm_confidence,
+    "ensemble_priority": MLPredictionLog.ensemble_priority,
+    "ensemble_confidence": MLPredictionLog.ensemble_confidence,
+    "ensemble_strategy": MLPredictionLog.ensemble_strategy,
+    "category_predicted": MLPredictionLog.category_predicted,
+    "category_confidence": MLPredictionLog.category_confidence,
+    "priority_final": MLPredictionLog.priority_final,
+    "category_final": MLPredictionLog.category_final,
+    "priority_feedback_previous": MLPredictionLog.priority_feedback_previous,
+    "priority_feedback_reason": MLPredictionLog.priority_feedback_reason,
+    "priority_feedback_author": User.email,
+    "priority_feedback_recorded_at": MLPredictionLog.priority_feedback_recorded_at,
+    "triage_reason": MLPredictionLog.triage_reason,
+    "prediction_time_ms": MLPredictionLog.prediction_time_ms,
+}
+
+DEFAULT_EXPORT_COLUMNS = [
+    "id",
+    "ticket_id",
+    "created_at",
+    "model_version",
+    "priority_predicted",
+    "priority_confidence",
+    "priority_llm_predicted",
+    "priority_llm_confidence",
+    "priority_final",
+    "priority_feedback_recorded_at",
+    "triage_reason",
+]
+
 
 @router.get("", response_model=List[MLPredictionLogOut])
 def list_ml_logs(
@@ -59,3 +112,101 @@ def list_ml_logs(
         )
 
     return results
+
+
+@router.get("/export")
+def export_ml_logs(
+    format: str = Query("csv", pattern="^(csv|jsonl)$", description="csv or jsonl"),
+    columns: Optional[str] = Query(None, description="Comma-separated column names"),
+    created_from: Optional[datetime] = Query(None, description="Logs created at or after"),
+    created_to: Optional[datetime] = Query(None, description="Logs created before"),
+    model_version: Optional[str] = Query(None),
+    disagreement_only: bool = Query(
+        False, description="Only logs where ML differs from the LLM or the final priority"
+    ),
+    current_user: User = Depends(require_lead_or_admin),
+) -> StreamingResponse:
+    """Stream ML logs as CSV/JSONL without loading them into memory.
+
+    Rows are read with ``yield_per`` and written to the client one batch at a
+    time, so memory stays constant regardless of how many logs match.
+
+    ``disagreement_only`` compares with SQL ``!=``, which is never true
+    against NULL: a missing LLM or final priority does not count as a
+    disagreement. Rows whose LLM or final priority is NULL are dropped
+    unless the other one differs from the ML prediction.
+    """
+
+    names = [name.strip() for name in columns.split(",") if name.strip()] if columns else DEFAULT_EXPORT_COLUMNS
+    unknown = [name for name in names if name not in EXPORT_COLUMNS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown columns: {', '.join(unknown) or '(empty)'}. "
+                   f"Available: {', '.join(EXPORT_COLUMNS)}",
+        )
+
+    stmt = select(*[EXPORT_COLUMNS[name].label(name) for name in names]).select_from(MLPredictionLog)
+    # Join only when the joined columns are requested
+    if "ticket_title" in names or "ticket_description" in names:
+        stmt = stmt.outerjoin(Ticket, Ticket.id == MLPredictionLog.ticket_id)
+    if "priority_feedback_author" in names:
+        stmt = stmt.outerjoin(User, User.id == MLPredictionLog.priority_feedback_author_id)
+
+    if created_from:
+        stmt = stmt.where(MLPredictionLog.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(MLPredictionLog.created_at < created_to)
+    if model_version:
+        stmt = stmt.where(MLPredictionLog.model_version == model_version)
+    if disagreement_only:
+        stmt = stmt.where(or_(
+            MLPredictionLog.priority_predicted != MLPredictionLog.priority_llm_predicted,
+            MLPredictionLog.priority_predicted != MLPredictionLog.priority_final,
+        ))
+
+    stmt = stmt.order_by(MLPredictionLog.created_at, MLPredictionLog.id).execution_options(
+        yield_per=EXPORT_BATCH_SIZE
+    )
+
+    filename = f"ml_logs_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        _stream_export(stmt, names, format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _stream_export(stmt, names: List[str], format: str) -> Iterator[str]:
+    # The request-scoped session is closed before the body is streamed
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if format == "csv" else None
+        if writer is not None:
+            writer.writerow(names)
+
+        for partition in db.execute(stmt).partitions():
+            for row in partition:
+                values = [_export_value(value) for value in row]
+                if writer is not None:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def _export_value(value) -> object:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
@@ -1,7 +1,7 @@
 """
 ML Training API - endpoints для управління навчанням ML моделей.
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
@@ -10,7 +10,12 @@ from app.models.user import User
 from app.models.ml_model_metadata import MLModelMetadata, MLTrainingJob
 from app.core.deps import require_admin
 from app.services.active_learning_service import active_learning_service
+from app.services.model_artifact_service import model_artifact_service
+from app.services.model_benchmark_service import LatencyBudgetExceeded, model_benchmark_service
+from app.services.training_worker_service import TrainingSubmitConflict, training_worker_service
 from app.services.ml_scheduler import ml_scheduler
+from app.services.scheduler_lease_service import scheduler_lease_service
+from app.services.feedback_export_worker import feedback_export_worker
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -31,6 +36,13 @@ class MLModelMetadataOut(BaseModel):
     recall_p3: Optional[float]
     f1_score: Optional[float]
     training_samples_count: Optional[int]
+    benchmark_p50_ms: Optional[float] = None
+    benchmark_p99_ms: Optional[float] = None
+    benchmark_throughput: Optional[Dict[str, Optional[float]]] = None
+    benchmark_load_ms: Optional[float] = None
+    benchmark_artifact_bytes: Optional[int] = None
+    benchmark_rss_mb: Optional[float] = None
+    benchmarked_at: Optional[datetime] = None
     is_active: bool
     notes: Optional[str]
 
@@ -48,6 +60,11 @@ class MLTrainingJobOut(BaseModel):
     total_training_samples: Optional[int]
     error_message: Optional[str]
     training_type: str
+    phase: Optional[str]
+    progress: float
+    cancel_requested: bool
+    queued_by: Optional[str] = None
+    executed_by: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -71,6 +88,34 @@ class ActivateModelOut(BaseModel):
     message: str
 
 
+class SchedulerStatusOut(BaseModel):
+    process_id: str
+    is_leader: bool
+    leader: Optional[str]
+    lease_renewed_at: Optional[datetime]
+    lease_expires_at: Optional[datetime]
+
+
+class FeedbackExportMetricsOut(BaseModel):
+    signals: int
+    exports: int
+    coalesced_signals: int
+    pending_signals: int
+    failures: int
+    last_export_at: Optional[datetime]
+    last_export_ms: Optional[float]
+    last_batch_signals: int
+    last_error: Optional[str]
+    debounce_seconds: float
+
+
+class ArtifactGCOut(BaseModel):
+    versions: int
+    orphan_files: int
+    orphan_rows: int
+    bytes_freed: int
+
+
 # === Router ===
 
 router = APIRouter(
@@ -98,6 +143,38 @@ def get_retrain_status(
     )
 
 
+@router.get("/scheduler", response_model=SchedulerStatusOut)
+def get_scheduler_status(
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Який процес зараз лідер scheduler-а (виконує фонові ML задачі).
+    Доступ: тільки ADMIN.
+    """
+    lease = scheduler_lease_service.get_lease(db, ml_scheduler.LEASE_NAME)
+
+    return SchedulerStatusOut(
+        process_id=scheduler_lease_service.process_id(),
+        is_leader=ml_scheduler.is_leader,
+        leader=lease.holder if lease else None,
+        lease_renewed_at=lease.renewed_at if lease else None,
+        lease_expires_at=lease.expires_at if lease else None,
+    )
+
+
+@router.get("/feedback-export", response_model=FeedbackExportMetricsOut)
+def get_feedback_export_metrics(
+    current_user: User = Depends(require_admin),
+):
+    """
+    Метрики фонового експорту training feedback поточного процесу
+    (скільки сигналів об'єднано в один експорт).
+    Доступ: тільки ADMIN.
+    """
+    return feedback_export_worker.metrics()
+
+
 @router.post("/trigger", response_model=TriggerRetrainOut)
 def trigger_retrain(
     force: bool = Query(False, description="Force retrain навіть якщо недостатньо feedback"),
@@ -106,6 +183,12 @@ def trigger_retrain(
 ):
     """
     Запускає перенавчання моделі вручну.
+
+    Навчання виконується в окремому процесі: endpoint одразу повертає job_id,
+    прогрес доступний через GET /ml/training/jobs/{job_id}. Якщо нова модель
+    краща за активну - вона активується автоматично. Якщо інший процес саме
+    ставить job у чергу - 409.
+
     Доступ: тільки ADMIN.
     """
     should_train, new_count, reason = active_learning_service.should_retrain(db)
@@ -116,27 +199,18 @@ def trigger_retrain(
         )
 
     try:
-        job = active_learning_service.train_model(db, training_type="MANUAL")
-
-        # Автоматично активуємо якщо це краща модель
-        current_active = (
-            db.query(MLModelMetadata).filter(MLModelMetadata.is_active == True).first()
-        )
+        job, created = training_worker_service.submit(db, training_type="MANUAL")
+    except TrainingSubmitConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start training: {str(e)}")
 
-        new_model = (
-            db.query(MLModelMetadata).filter(MLModelMetadata.version == job.model_version).first()
+    if not created:
+        return TriggerRetrainOut(
+            success=False, job_id=job.id, message=f"Training job {job.id} is already {job.status}"
         )
 
-        if not current_active or (new_model.accuracy > current_active.accuracy):
-            active_learning_service.activate_model(db, job.model_version)
-            message = f"Model {job.model_version} trained and activated successfully!"
-        else:
-            message = f"Model {job.model_version} trained but not activated (accuracy not better)"
-
-        return TriggerRetrainOut(success=True, job_id=job.id, message=message)
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+    return TriggerRetrainOut(success=True, job_id=job.id, message=f"Training job {job.id} queued")
 
 
 @router.get("/models", response_model=List[MLModelMetadataOut])
@@ -174,18 +248,51 @@ def get_model(
     return model
 
 
+@router.post("/models/gc", response_model=ArtifactGCOut)
+def collect_model_artifacts(
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Видаляє старі версії моделі (лишаються активна, останні і найкращі за F1),
+    осиротілі файли артефактів і metadata без файлу.
+    Доступ: тільки ADMIN.
+    """
+    return model_artifact_service.garbage_collect(db)
+
+
+@router.post("/models/{version}/benchmark", response_model=MLModelMetadataOut)
+def benchmark_model(
+    version: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Повторно запускає benchmark швидкодії моделі (латентність, throughput, пам'ять).
+    Доступ: тільки ADMIN.
+    """
+    try:
+        return model_benchmark_service.benchmark_version(db, version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.post("/models/{version}/activate", response_model=ActivateModelOut)
 def activate_model(
     version: str,
+    force: bool = Query(False, description="Activate even if p99 latency exceeds the budget"),
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     """
     Активує певну версію моделі (робить її поточною).
+    Модель, повільніша за ML_LATENCY_BUDGET_P99_MS, активується лише з force=true.
     Доступ: тільки ADMIN.
     """
     try:
-        success = active_learning_service.activate_model(db, version)
+        success = active_learning_service.activate_model(
+            db, version, enforce_latency_budget=not force
+        )
 
         if success:
             return ActivateModelOut(
@@ -198,6 +305,8 @@ def activate_model(
 
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except LatencyBudgetExceeded as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Activation failed: {str(e)}")
 
@@ -205,7 +314,7 @@ def activate_model(
 @router.get("/jobs", response_model=List[MLTrainingJobOut])
 def list_training_jobs(
     limit: int = Query(20, ge=1, le=100),
-    status: Optional[str] = Query(None, description="Filter by status: RUNNING, COMPLETED, FAILED"),
+    status: Optional[str] = Query(None, description="Filter by status: QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED"),
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
@@ -239,3 +348,26 @@ def get_training_job(
         raise HTTPException(status_code=404, detail=f"Training job {job_id} not found")
 
     return job
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=MLTrainingJobOut)
+def cancel_training_job(
+    job_id: int,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Скасувати training job (QUEUED - одразу, RUNNING - на наступній фазі навчання).
+    Доступ: тільки ADMIN.
+    """
+    job = db.query(MLTrainingJob).filter(MLTrainingJob.id == job_id).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Training job {job_id} not found")
+
+    if job.status not in training_worker_service.ACTIVE_STATUSES:
+        raise HTTPException(
+            status_code=400, detail=f"Training job {job_id} is already {job.status}"
+        )
+
+    return training_worker_service.cancel(db, job)
@@ -1,8 +1,13 @@
 """
 Tickets Router - API endpoints для роботи з тікетами.
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
@@ -23,13 +28,23 @@ from app.schemas.ticket import (
     TicketAssign,
     TicketAssignMultiple,
     TicketTriageResolve,
+    TicketBatchAssign,
+    TicketBatchAssignResult,
+    TicketStats,
 )
 from app.services.ticket_service import ticket_service
 from app.services.ml_service import ml_service
+from app.services.workload_service import workload_service
+from app.services.learning_service import learning_service
+from app.services.ticket_count_service import ticket_count_service
 
 
 router = APIRouter(prefix="/tickets", tags=["tickets"])
 
+# Розмір сторінки GET /tickets
+TICKETS_PAGE_SIZE_DEFAULT = 100
+TICKETS_PAGE_SIZE_MAX = 500
+
 
 def _load_ticket_relationships(db: Session, ticket_id: int) -> Ticket:
     """Helper to load ticket with all relationships for TicketOut response"""
@@ -46,6 +61,67 @@ def _load_ticket_relationships(db: Session, ticket_id: int) -> Ticket:
     )
 
 
+def _encode_cursor(ticket: Ticket) -> str:
+    """Непрозорий курсор: позиція тікета в порядку (triage_required, created_at, id)."""
+    payload = [int(bool(ticket.triage_required)), ticket.created_at.isoformat(), ticket.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[bool, datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        triage_required, created_at, ticket_id = json.loads(base64.urlsafe_b64decode(padded))
+        return bool(triage_required), datetime.fromisoformat(created_at), int(ticket_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Невалідний cursor")
+
+
+def _visible_tickets(query, current_user: User):
+    """Обмежує запит тікетами, які бачить користувач."""
+    if current_user.role == RoleEnum.USER:
+        # USER бачить тільки свої тікети
+        return query.filter(Ticket.created_by_user_id == current_user.id)
+    if current_user.role == RoleEnum.AGENT:
+        # AGENT бачить тікети свого департаменту або призначені йому
+        return query.filter(
+            (Ticket.department_id == current_user.department_id) |
+            (Ticket.assigned_to_user_id == current_user.id)
+        )
+    if current_user.role == RoleEnum.LEAD and current_user.department_id:
+        # LEAD бачить тікети свого департаменту
+        return query.filter(Ticket.department_id == current_user.department_id)
+    # ADMIN бачить всі тікети (без фільтра)
+    return query
+
+
+def _filter_tickets(
+    query,
+    status: Optional[StatusEnum] = None,
+    priority: Optional[PriorityEnum] = None,
+    category: Optional[CategoryEnum] = None,
+    department_id: Optional[int] = None,
+    assignee_id: Optional[int] = None,
+    creator_id: Optional[int] = None,
+    triage_required: Optional[bool] = None,
+):
+    """Фільтри списку тікетів (спільні для GET /tickets і GET /tickets/stats)."""
+    if status:
+        query = query.filter(Ticket.status == status)
+    if priority:
+        query = query.filter(Ticket.priority_manual == priority)
+    if category:
+        query = query.filter(Ticket.category == category)
+    if department_id:
+        query = query.filter(Ticket.department_id == department_id)
+    if assignee_id:
+        query = query.filter(Ticket.assigned_to_user_id == assignee_id)
+    if creator_id:
+        query = query.filter(Ticket.created_by_user_id == creator_id)
+    if triage_required is not None:
+        query = query.filter(Ticket.triage_required == triage_required)
+    return query
+
+
 @router.post("", response_model=TicketOut, status_code=201)
 def create_ticket(
     ticket_data: TicketCreate,
@@ -75,6 +151,7 @@ def create_ticket(
 
 @router.get("", response_model=List[TicketListItem])
 def list_tickets(
+    response: Response,
     status: Optional[StatusEnum] = Query(None, description="Фільтр за статусом"),
     priority: Optional[PriorityEnum] = Query(None, description="Фільтр за пріоритетом"),
     category: Optional[CategoryEnum] = Query(None, description="Фільтр за категорією"),
@@ -82,64 +159,160 @@ def list_tickets(
     assignee_id: Optional[int] = Query(None, description="Фільтр за виконавцем"),
     creator_id: Optional[int] = Query(None, description="Фільтр за автором"),
     triage_required: Optional[bool] = Query(None, description="Тільки тікети на тріажі"),
+    limit: int = Query(TICKETS_PAGE_SIZE_DEFAULT, ge=1, le=TICKETS_PAGE_SIZE_MAX, description="Розмір сторінки"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor попередньої сторінки"),
+    include_total: bool = Query(False, description="Повернути X-Total-Count"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
-    Список тікетів з фільтрами.
+    Список тікетів з фільтрами (keyset пагінація).
 
     Доступно: всім авторизованим користувачам.
 
+    Pagination:
+    - Сторінка - до limit тікетів; якщо є наступна, її курсор в заголовку X-Next-Cursor
+    - include_total=true додає X-Total-Count (кешований лічильник, може
+      відставати на ticket_count_service.COUNT_TTL_SECONDS)
+
     Permissions:
     - USER: бачить тільки свої тікети
     - AGENT: бачить тікети свого департаменту + призначені йому
     - LEAD: бачить тікети свого департаменту
     - ADMIN: бачить всі тікети
     """
-    query = db.query(Ticket)
+    query = _filter_tickets(
+        _visible_tickets(db.query(Ticket), current_user),
+        status, priority, category, department_id, assignee_id, creator_id, triage_required,
+    )
 
-    # Permissions
-    if current_user.role == RoleEnum.USER:
-        # USER бачить тільки свої тікети
-        query = query.filter(Ticket.created_by_user_id == current_user.id)
-    elif current_user.role == RoleEnum.AGENT:
-        # AGENT бачить тікети свого департаменту або призначені йому
-        query = query.filter(
-            (Ticket.department_id == current_user.department_id) |
-            (Ticket.assigned_to_user_id == current_user.id)
+    if include_total:
+        total_key = (
+            current_user.role, current_user.id, current_user.department_id,
+            status, priority, category, department_id, assignee_id, creator_id, triage_required,
         )
-    elif current_user.role == RoleEnum.LEAD:
-        # LEAD бачить тікети свого департаменту
-        if current_user.department_id:
-            query = query.filter(Ticket.department_id == current_user.department_id)
-    # ADMIN бачить всі тікети (без фільтра)
+        response.headers["X-Total-Count"] = str(ticket_count_service.get_total(total_key, query))
 
-    # Фільтри
-    if status:
-        query = query.filter(Ticket.status == status)
-    if priority:
-        query = query.filter(Ticket.priority_manual == priority)
-    if category:
-        query = query.filter(Ticket.category == category)
-    if department_id:
-        query = query.filter(Ticket.department_id == department_id)
-    if assignee_id:
-        query = query.filter(Ticket.assigned_to_user_id == assignee_id)
-    if creator_id:
-        query = query.filter(Ticket.created_by_user_id == creator_id)
-    if triage_required is not None:
-        query = query.filter(Ticket.triage_required == triage_required)
+    if cursor:
+        # Тікети після курсора в порядку (triage_required, created_at, id) desc
+        query = query.filter(
+            tuple_(Ticket.triage_required, Ticket.created_at, Ticket.id) < tuple_(*_decode_cursor(cursor))
+        )
 
-    # Сортування: спочатку нові та на тріажі
+    # Сортування: спочатку нові та на тріажі (id - для стабільного курсора)
     query = query.order_by(
         Ticket.triage_required.desc(),
         Ticket.created_at.desc(),
+        Ticket.id.desc(),
     )
 
-    tickets = query.all()
+    # Зайвий рядок показує, чи є наступна сторінка
+    tickets = query.limit(limit + 1).all()
+    if len(tickets) > limit:
+        tickets = tickets[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(tickets[-1])
     return tickets
 
 
+@router.get("/stats", response_model=TicketStats)
+def get_ticket_stats(
+    status: Optional[StatusEnum] = Query(None, description="Фільтр за статусом"),
+    priority: Optional[PriorityEnum] = Query(None, description="Фільтр за пріоритетом"),
+    category: Optional[CategoryEnum] = Query(None, description="Фільтр за категорією"),
+    department_id: Optional[int] = Query(None, description="Фільтр за департаментом"),
+    assignee_id: Optional[int] = Query(None, description="Фільтр за виконавцем"),
+    creator_id: Optional[int] = Query(None, description="Фільтр за автором"),
+    triage_required: Optional[bool] = Query(None, description="Тільки тікети на тріажі"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Агреговані лічильники тікетів для analytics і лічильників Board/списку
+    (один GROUP BY замість завантаження всіх сторінок списку).
+
+    Фільтри - ті самі, що й у GET /tickets.
+
+    Доступно: всім авторизованим користувачам (ті самі права видимості, що й GET /tickets).
+    """
+    query = _filter_tickets(
+        _visible_tickets(
+            db.query(
+                Ticket.status,
+                Ticket.priority_manual,
+                Ticket.category_ml_suggested,
+                Ticket.triage_required,
+                func.count(Ticket.id),
+            ),
+            current_user,
+        ),
+        status, priority, category, department_id, assignee_id, creator_id, triage_required,
+    )
+    rows = (
+        query
+        .group_by(
+            Ticket.status,
+            Ticket.priority_manual,
+            Ticket.category_ml_suggested,
+            Ticket.triage_required,
+        )
+        .all()
+    )
+
+    stats = TicketStats(
+        by_status={value.value: 0 for value in StatusEnum},
+        by_priority={value.value: 0 for value in PriorityEnum},
+    )
+    for row_status, row_priority, category_ml, row_triage, count in rows:
+        stats.total += count
+        if row_triage:
+            stats.triage_required += count
+        stats.by_status[row_status.value] += count
+        stats.by_priority[row_priority.value] += count
+        if category_ml:
+            stats.by_category_ml[category_ml.value] = stats.by_category_ml.get(category_ml.value, 0) + count
+    return stats
+
+
+@router.post("/assignment/batch", response_model=TicketBatchAssignResult)
+def batch_assign_tickets(
+    data: TicketBatchAssign,
+    current_user: User = Depends(require_lead_or_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Розподілити backlog NEW/TRIAGE тікетів між агентами одним планом.
+
+    Доступно: LEAD (тільки свій департамент), ADMIN.
+
+    На відміну від smart assignment при створенні тікета, план враховує
+    workload_capacity агентів для всього набору тікетів одразу.
+    apply=False повертає план без змін; reassign=True дозволяє забрати
+    тікети в інших агентів.
+    """
+    department_id = data.department_id
+
+    if current_user.role == RoleEnum.LEAD:
+        if not current_user.department_id:
+            raise HTTPException(
+                status_code=403,
+                detail="LEAD without department cannot batch-assign tickets"
+            )
+        if department_id and department_id != current_user.department_id:
+            raise HTTPException(
+                status_code=403,
+                detail="LEAD can only assign tickets of own department"
+            )
+        department_id = current_user.department_id
+
+    return ticket_service.batch_assign(
+        department_id=department_id,
+        ticket_ids=data.ticket_ids,
+        apply=data.apply,
+        db=db,
+        reassign=data.reassign,
+    )
+
+
 @router.get("/{ticket_id}", response_model=TicketOut)
 def get_ticket(
     ticket_id: int,
@@ -297,26 +470,11 @@ def assign_multiple_assignees(
 
     Доступно: LEAD, ADMIN.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-
-    # Verify all users exist
-    users = db.query(User).filter(User.id.in_(assign_data.assignee_ids)).all()
-    if len(users) != len(assign_data.assignee_ids):
-        raise HTTPException(status_code=400, detail="One or more assignees not found")
-
-    # Clear previous assignees and set new ones
-    ticket.assignees = users
-
-    # Also update assigned_to_user_id to first assignee for backwards compatibility
-    if users:
-        ticket.assigned_to_user_id = users[0].id
-    else:
-        ticket.assigned_to_user_id = None
-
-    db.commit()
-
+    ticket = ticket_service.update_assignees(
+        ticket_id=ticket_id,
+        assignee_ids=assign_data.assignee_ids,
+        db=db,
+    )
     # Reload with relationships
     return _load_ticket_relationships(db, ticket.id)
 
@@ -441,6 +599,9 @@ def confirm_assignment(
             detail="Assignment already confirmed/rejected"
         )
 
+    previous_assignee_id = ticket.assigned_to_user_id
+    previous_status = ticket.status
+
     # Зберігаємо підтвердження
     ticket.assignment_confirmed = confirmed
     ticket.assignment_confirmed_at = datetime.utcnow()
@@ -466,6 +627,18 @@ def confirm_assignment(
     else:
         print(f"[ASSIGNMENT CONFIRMED] Тікет #{ticket.incident_id} підтверджено {current_user.full_name}")
 
+    workload_service.on_ticket_changed(
+        db=db,
+        ticket=ticket,
+        previous_assignee_id=previous_assignee_id,
+        previous_status=previous_status,
+    )
+    learning_service.on_ticket_changed(
+        db=db,
+        ticket=ticket,
+        previous_assignee_id=previous_assignee_id,
+    )
+
     db.commit()
     db.refresh(ticket)
 
@@ -1,8 +1,8 @@
 """
 Users Router - API endpoints для управління користувачами (admin)
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 
@@ -10,6 +10,9 @@ from app.database import get_db
 from app.core.deps import require_admin
 from app.core.enums import RoleEnum
 from app.models.user import User
+from app.services.specialty_index_service import specialty_index_service
+from app.services.candidate_pool_service import candidate_pool_service
+from app.services.learning_service import learning_service
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -31,6 +34,13 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class ExpertiseMatchOut(BaseModel):
+    agent_id: int
+    full_name: Optional[str] = None
+    score: float
+    contributions: Dict[str, float]
+
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -106,11 +116,33 @@ def create_user(
     )
 
     db.add(new_user)
+    candidate_pool_service.mark_changed(db)
     db.commit()
     db.refresh(new_user)
+
+    if new_user.specialty:
+        specialty_index_service.invalidate()
+
     return new_user
 
 
+@router.get("/expertise/top-agents", response_model=List[ExpertiseMatchOut])
+def get_expertise_top_agents(
+    text: str = Query(..., min_length=1, description="Текст тікета (title + description)"),
+    department_id: Optional[int] = Query(None, description="Департамент кандидатів"),
+    k: int = Query(5, ge=1, le=50),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Топ-k агентів за BM25 профілем експертизи з внеском кожного ключового слова
+    (пояснення, чому match_ticket_to_specialist_by_expertise обирає агента).
+
+    Доступно: тільки ADMIN.
+    """
+    return learning_service.explain_expertise_match(text, department_id, db, k=k)
+
+
 @router.get("/{user_id}", response_model=UserOut)
 def get_user(
     user_id: int,
@@ -170,14 +202,22 @@ def update_user(
     if user_data.department_id is not None:
         user.department_id = user_data.department_id
 
-    if user_data.specialty is not None:
+    specialty_changed = False
+    if user_data.specialty is not None and user_data.specialty != user.specialty:
         user.specialty = user_data.specialty
+        specialty_changed = True
 
     if user_data.password is not None:
         user.hashed_password = pwd_context.hash(user_data.password)
 
+    candidate_pool_service.mark_changed(db)
     db.commit()
     db.refresh(user)
+
+    # Перебудувати індекс спеціалізацій для skill matching
+    if specialty_changed:
+        specialty_index_service.invalidate()
+
     return user
 
 
@@ -202,6 +242,7 @@ def delete_user(
 
     # Замість видалення - деактивуємо
     user.is_active = False
+    candidate_pool_service.mark_changed(db)
     db.commit()
 
     return {"success": True, "message": "User deactivated"}
@@ -1,7 +1,7 @@
 """
 Ticket schemas
 """
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -88,6 +88,43 @@ class TicketTriageResolve(BaseModel):
     assigned_to_user_id: Optional[int] = None
 
 
+class TicketBatchAssign(BaseModel):
+    """Batch assignment backlog тікетів (LEAD)"""
+    department_id: Optional[int] = None
+    ticket_ids: Optional[List[int]] = None
+    apply: bool = False  # False = тільки план
+    reassign: bool = False  # True = дозволити перепризначення тікетів з виконавцем
+
+
+class BatchAssignmentItem(BaseModel):
+    """Одне призначення в batch плані"""
+    ticket_id: int
+    incident_id: str
+    assignee_id: int
+    agent_name: Optional[str] = None
+    score: float
+    skill_match: float
+    workload: float
+    reasoning: str
+
+
+class TicketBatchAssignResult(BaseModel):
+    """Результат batch assignment"""
+    assignments: List[BatchAssignmentItem] = []
+    unassigned_ticket_ids: List[int] = []
+    total_score: float
+    applied: bool
+
+
+class TicketStats(BaseModel):
+    """Агреговані лічильники тікетів для analytics"""
+    total: int = 0
+    triage_required: int = 0
+    by_status: Dict[str, int] = {}
+    by_priority: Dict[str, int] = {}
+    by_category_ml: Dict[str, int] = {}
+
+
 class TicketListItem(BaseModel):
     """Тікет для списку/Board"""
     id: int
@@ -6,24 +6,79 @@ Active Learning Service - автоматичне перенавчання ML м
 2. Коли набирається достатньо (наприклад, 50) - автоматично запускаємо retraining
 3. Зберігаємо метрики нової моделі
 4. Якщо нова модель краща - активуємо її
+
+Ознаки - stateless HashingVectorizer, тому регулярне перенавчання інкрементальне:
+активна модель дотреновується через partial_fit тільки на feedback після її
+навчання (вартість залежить від нового feedback, а не від всієї історії).
+Повний refit виконується кожні FULL_REFIT_EVERY_INCREMENTS інкрементів або
+FULL_REFIT_MAX_AGE_DAYS днів, щоб обмежити drift.
 """
+import copy
 import os
+import time
 import joblib
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, Tuple, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Dict
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.linear_model import SGDClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.utils.class_weight import compute_class_weight
+from sklearn.model_selection import ParameterSampler, train_test_split
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func, select
 
 from app.models.ml_log import MLPredictionLog
 from app.models.ml_model_metadata import MLModelMetadata, MLTrainingJob
 from app.core.enums import PriorityEnum
 from app.config import settings
+from app.ml_model import MLClassifier
+from app.services.feature_cache_service import feature_cache_service
+from app.services.model_artifact_service import model_artifact_service
+from app.services.model_benchmark_service import model_benchmark_service, LatencyBudgetExceeded
+from app.services.prediction_log_export_service import prediction_log_export_service
+from app.services.retrain_trigger_service import retrain_trigger_service
+from app.services.scheduler_lease_service import scheduler_lease_service
+
+
+def _evaluate_candidate(
+    params: Dict[str, Any],
+    X_fit: sparse.csr_matrix,
+    y_fit: np.ndarray,
+    X_tune: sparse.csr_matrix,
+    y_tune: np.ndarray,
+    class_weight: Dict[str, float],
+    deadline: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Навчає і оцінює одного кандидата пошуку гіперпараметрів
+    (функція модуля, щоб joblib міг виконати її в іншому процесі).
+
+    deadline - time.time(), після якого кандидат не запускається (None).
+    """
+    if deadline is not None and time.time() >= deadline:
+        return None
+
+    started = time.perf_counter()
+    model = SGDClassifier(max_iter=1000, random_state=42, class_weight=class_weight, **params)
+    model.fit(X_fit, y_fit)
+    y_pred = model.predict(X_tune)
+    _, _, f1, _ = precision_recall_fscore_support(
+        y_tune, y_pred, labels=ActiveLearningService.LABELS, zero_division=0
+    )
+    return {
+        "params": params,
+        "f1_score": round(float(np.mean(f1)), 4),
+        "accuracy": round(float(accuracy_score(y_tune, y_pred)), 4),
+        "fit_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class TrainingCancelled(Exception):
+    """Job скасовано через API (перевіряється між фазами навчання)."""
 
 
 class ActiveLearningService:
@@ -37,6 +92,51 @@ class ActiveLearningService:
     # Мінімальна кількість всього samples для навчання
     MIN_TOTAL_SAMPLES = 100
 
+    # Простір ознак, у якому модель можна дотреновувати (partial_fit)
+    FEATURE_SPACE = "hashing"
+    HASHING_N_FEATURES = 2 ** 18
+
+    LABELS = ["high", "medium", "low"]
+
+    # Метрики моделі, що зберігаються в MLModelMetadata
+    METRIC_KEYS = (
+        "accuracy", "precision_p1", "precision_p2", "precision_p3",
+        "recall_p1", "recall_p2", "recall_p3", "f1_score",
+    )
+
+    # PriorityEnum -> label (те саме, що _label_expression, для Parquet партицій)
+    PRIORITY_LABELS = {PriorityEnum.P1.value: "high", PriorityEnum.P2.value: "medium"}
+
+    # Розмір батчу при потоковому читанні тренувальних даних
+    TRAINING_BATCH_SIZE = 5000
+
+    # Перекриття при дочитуванні нових рядків у feature cache (feedback,
+    # закомічений трохи пізніше за свій priority_feedback_recorded_at)
+    FEATURE_CACHE_OVERLAP_MINUTES = 10
+
+    # Повний refit після стількох інкрементальних кроків або днів
+    FULL_REFIT_EVERY_INCREMENTS = 10
+    FULL_REFIT_MAX_AGE_DAYS = 7
+
+    # Параметри SGDClassifier за замовчуванням (і перший кандидат пошуку)
+    DEFAULT_HYPERPARAMS = {"loss": "log_loss", "penalty": "l2", "alpha": 1e-4}
+
+    # Простір пошуку і кількість кандидатів - settings.ML_SEARCH_*. Векторизатор
+    # не варіюється: всі кандидати навчаються на одній (кешованій) матриці ознак.
+    SEARCH_N_JOBS = -1  # всі ядра
+
+    # Фази training job і прогрес (0..1) на їх початку
+    PHASE_PROGRESS = {
+        "LOAD_DATA": 0.05,
+        "VECTORIZE": 0.2,
+        "SEARCH": 0.3,
+        "FIT": 0.6,
+        "EVALUATE": 0.8,
+        "SAVE": 0.85,
+        "BENCHMARK": 0.9,
+        "DONE": 1.0,
+    }
+
     def __init__(self):
         self.artifacts_dir = Path(settings.BASE_DIR) / "artifacts"
         self.artifacts_dir.mkdir(exist_ok=True)
@@ -102,7 +202,8 @@ class ActiveLearningService:
         self, db: Session, since_date: Optional[datetime] = None, use_tickets: bool = False
     ) -> Tuple[list, list]:
         """
-        Витягує тренувальні дані з БД.
+        Витягує тренувальні дані з БД (списками; навчання використовує
+        iter_training_batches, щоб не тримати всі тексти в пам'яті).
 
         Args:
             db: Database session
@@ -115,133 +216,265 @@ class ActiveLearningService:
         texts = []
         labels = []
 
+        for _, batch_texts, batch_labels in self.iter_training_batches(db, since_date, use_tickets):
+            texts.extend(batch_texts)
+            labels.extend(batch_labels)
+
+        return texts, labels
+
+    def iter_training_batches(
+        self, db: Session, since_date: Optional[datetime] = None, use_tickets: bool = False
+    ) -> Iterator[Tuple[List[int], List[str], List[str]]]:
+        """
+        Потоково читає тренувальні дані батчами по TRAINING_BATCH_SIZE.
+
+        Вибираються тільки текст і мітка (без ORM об'єктів): текст склеюється,
+        а PriorityEnum -> "high"/"medium"/"low" конвертується в SQL (CASE),
+        рядки читаються через yield_per (server-side cursor, де БД це підтримує).
+
+        Якщо ML_TRAINING_DATA_SOURCE="partitions", ML логи читаються з Parquet
+        партицій (prediction_log_export_service) замість OLTP БД. Перед читанням
+        партиції оновлюються інкрементальним експортом, тож вони не відстають
+        від trained_until / watermark feature cache, виставлених до читання.
+
+        Yields:
+            (ids, texts, labels) для кожного батчу (ids - ID тікетів або ML логів)
+        """
+        if not use_tickets and settings.ML_TRAINING_DATA_SOURCE == "partitions":
+            prediction_log_export_service.export(db)
+            for ids, texts, priorities in prediction_log_export_service.iter_feedback_batches(
+                since_date, self.TRAINING_BATCH_SIZE
+            ):
+                yield ids, texts, [self.PRIORITY_LABELS.get(priority, "low") for priority in priorities]
+            return
+
         # Для initial training - використовуємо тікети напряму
         if use_tickets:
             from app.models.ticket import Ticket
-            tickets = db.query(Ticket).filter(
+
+            # Комбінуємо title + description як input text
+            stmt = select(
+                Ticket.id,
+                Ticket.title + "\n" + Ticket.description,
+                self._label_expression(Ticket.priority_manual),
+            ).where(
                 Ticket.priority_manual.isnot(None),
                 Ticket.title.isnot(None),
                 Ticket.description.isnot(None)
-            ).all()
-
-            for ticket in tickets:
-                # Комбінуємо title + description як input text
-                text = f"{ticket.title}\n{ticket.description}"
-                texts.append(text.strip())
-
-                # Конвертуємо PriorityEnum -> str label для ML
-                priority = ticket.priority_manual
-                if priority == PriorityEnum.P1:
-                    labels.append("high")
-                elif priority == PriorityEnum.P2:
-                    labels.append("medium")
-                elif priority == PriorityEnum.P3:
-                    labels.append("low")
-
-            return texts, labels
-
-        # Для incremental learning - використовуємо ML prediction logs
-        query = db.query(MLPredictionLog).filter(
-            MLPredictionLog.priority_final.isnot(None), MLPredictionLog.input_text.isnot(None)
+            )
+        else:
+            # Для incremental learning - використовуємо ML prediction logs
+            stmt = select(
+                MLPredictionLog.id,
+                MLPredictionLog.input_text,
+                self._label_expression(MLPredictionLog.priority_final),
+            ).where(
+                MLPredictionLog.priority_final.isnot(None),
+                MLPredictionLog.input_text.isnot(None),
+                MLPredictionLog.input_text != "",
+            )
+
+            if since_date:
+                stmt = stmt.where(MLPredictionLog.priority_feedback_recorded_at > since_date)
+
+        result = db.execute(stmt.execution_options(yield_per=self.TRAINING_BATCH_SIZE))
+
+        for partition in result.partitions():
+            yield (
+                [row_id for row_id, _, _ in partition],
+                [text.strip() for _, text, _ in partition],
+                [label for _, _, label in partition],
+            )
+
+    @staticmethod
+    def _label_expression(priority_column):
+        """SQL вираз PriorityEnum -> str label для ML."""
+        return case(
+            (priority_column == PriorityEnum.P1, "high"),
+            (priority_column == PriorityEnum.P2, "medium"),
+            else_="low",
         )
 
-        if since_date:
-            query = query.filter(MLPredictionLog.priority_feedback_recorded_at > since_date)
+    def _vectorize_stream(
+        self, vectorizer: HashingVectorizer, batches: Iterator[Tuple[List[int], List[str], List[str]]]
+    ) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+        """
+        Векторизує батчі по мірі читання: в пам'яті лишається тільки sparse
+        матриця ознак, мітки і ID рядків, тексти кожного батчу одразу відкидаються.
 
-        logs = query.all()
+        Returns:
+            (X, labels, ids)
+        """
+        blocks = []
+        labels: List[str] = []
+        ids: List[int] = []
 
-        for log in logs:
-            if not log.input_text or not log.priority_final:
-                continue
+        for batch_ids, texts, batch_labels in batches:
+            blocks.append(vectorizer.transform(texts))
+            labels.extend(batch_labels)
+            ids.extend(batch_ids)
 
-            texts.append(log.input_text.strip())
+        if not blocks:
+            return (
+                sparse.csr_matrix((0, vectorizer.n_features), dtype=np.float64),
+                np.array([], dtype=str),
+                np.array([], dtype=np.int64),
+            )
 
-            # Конвертуємо PriorityEnum -> str label для ML
-            priority = log.priority_final
-            if priority == PriorityEnum.P1:
-                labels.append("high")
-            elif priority == PriorityEnum.P2:
-                labels.append("medium")
-            elif priority == PriorityEnum.P3:
-                labels.append("low")
+        return sparse.vstack(blocks, format="csr"), np.array(labels), np.array(ids, dtype=np.int64)
 
-        return texts, labels
+    def _cached_feature_matrix(
+        self, db: Session, vectorizer: HashingVectorizer
+    ) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """
+        Матриця ознак всього feedback з feature cache.
+
+        Векторизуються тільки логи з feedback після watermark кешу (з
+        перекриттям FEATURE_CACHE_OVERLAP_MINUTES); рядки логів, чия мітка
+        змінилась, замінюються. Кеш будується заново, якщо змінився
+        fingerprint векторизатора або в БД менше рядків, ніж у кеші.
+        """
+        fingerprint = MLClassifier.fingerprint(vectorizer)
+        snapshot_at = datetime.utcnow()
+
+        cache = feature_cache_service.load(fingerprint)
+        if cache is not None and cache.n_rows > self._count_feedback_rows(db):
+            print("[ActiveLearning] Feature cache has rows missing from DB, rebuilding")
+            cache = None
+
+        since_date = (
+            cache.watermark - timedelta(minutes=self.FEATURE_CACHE_OVERLAP_MINUTES)
+            if cache is not None else None
+        )
+        X_new, labels_new, ids_new = self._vectorize_stream(
+            vectorizer, self.iter_training_batches(db, since_date=since_date)
+        )
+
+        if cache is not None:
+            keep = ~np.isin(cache.log_ids, ids_new)
+            X = sparse.vstack([cache.features[keep], X_new], format="csr")
+            labels = np.concatenate([cache.labels[keep], labels_new])
+            log_ids = np.concatenate([cache.log_ids[keep], ids_new])
+            reused = int(keep.sum())
+        else:
+            X, labels, log_ids, reused = X_new, labels_new, ids_new, 0
+
+        feature_cache_service.save(fingerprint, X, labels, log_ids, watermark=snapshot_at)
+
+        print(f"[ActiveLearning] Feature cache: {reused} rows reused, {len(ids_new)} vectorized")
+        return X, labels
+
+    @staticmethod
+    def _count_feedback_rows(db: Session) -> int:
+        return (
+            db.query(func.count(MLPredictionLog.id))
+            .filter(
+                MLPredictionLog.priority_final.isnot(None),
+                MLPredictionLog.input_text.isnot(None),
+                MLPredictionLog.input_text != "",
+            )
+            .scalar()
+        )
+
+    @staticmethod
+    def _class_distribution(labels: np.ndarray) -> Dict[str, int]:
+        return {label: int(np.count_nonzero(labels == label)) for label in ActiveLearningService.LABELS}
 
     def train_model(self, db: Session, training_type: str = "INCREMENTAL") -> MLTrainingJob:
         """
-        Навчає нову ML модель.
+        Навчає нову ML модель в поточному потоці (API використовує
+        training_worker_service, який виконує run_job в окремому процесі).
+
+        INCREMENTAL - дотреновує активну модель (partial_fit) тільки на feedback,
+        що з'явився після її навчання; якщо це неможливо або настав час повного
+        перенавчання - виконується FULL refit на всій історії.
 
         Args:
             db: Database session
-            training_type: "FULL" або "INCREMENTAL"
+            training_type: "FULL", "INCREMENTAL", "MANUAL" або "INITIAL"
 
         Returns:
             MLTrainingJob record
         """
-        # Створюємо job запис
+        job = self.create_job(db, training_type, status="RUNNING")
+        return self.run_job(db, job)
+
+    def create_job(self, db: Session, training_type: str, status: str = "QUEUED") -> MLTrainingJob:
+        """
+        Створює запис MLTrainingJob (QUEUED - чекає на worker) і скидає
+        лічильник нових feedback, що накопичились до цього навчання.
+        """
         job = MLTrainingJob(
-            started_at=datetime.utcnow(), status="RUNNING", training_type=training_type
+            started_at=datetime.utcnow(),
+            status=status,
+            training_type=training_type,
+            phase="QUEUED" if status == "QUEUED" else None,
+            progress=0.0,
+            queued_by=scheduler_lease_service.process_id(),
         )
         db.add(job)
+        retrain_trigger_service.mark_triggered(db)
         db.commit()
         db.refresh(job)
+        return job
 
-        try:
-            # Отримуємо всі тренувальні дані
-            # Для INITIAL training використовуємо тікети напряму
-            use_tickets = (training_type == "INITIAL")
-            texts, labels = self.get_training_data(db, use_tickets=use_tickets)
-
-            if len(texts) < self.MIN_TOTAL_SAMPLES:
-                raise ValueError(
-                    f"Not enough training samples: {len(texts)}/{self.MIN_TOTAL_SAMPLES}"
-                )
+    def run_job(self, db: Session, job: MLTrainingJob) -> MLTrainingJob:
+        """
+        Виконує навчання для створеного job, оновлюючи phase/progress.
 
-            # Розбиваємо на train/validation
-            X_train, X_val, y_train, y_val = train_test_split(
-                texts, labels, test_size=0.2, random_state=42, stratify=labels
-            )
+        Скасування кооперативне: cancel_requested перевіряється на межі фаз,
+        тоді job отримує статус CANCELLED. Помилка навчання - статус FAILED
+        і виняток прокидається далі.
+        """
+        if job.cancel_requested:
+            job.status = "CANCELLED"
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            print(f"[ActiveLearning] Training job {job.id} cancelled before start")
+            return job
 
-            # Створюємо TF-IDF векторизатор
-            vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
-            X_train_vec = vectorizer.fit_transform(X_train)
-            X_val_vec = vectorizer.transform(X_val)
-
-            # Навчаємо SGDClassifier (підтримує partial_fit для incremental learning)
-            model = SGDClassifier(
-                loss="log_loss",  # для probability estimates
-                max_iter=1000,
-                random_state=42,
-                class_weight="balanced",  # для unbalanced datasets
-            )
-            model.fit(X_train_vec, y_train)
+        job.status = "RUNNING"
+        job.started_at = datetime.utcnow()
+        job.executed_by = scheduler_lease_service.process_id()
+        db.commit()
 
-            # Обчислюємо метрики на validation set
-            y_pred = model.predict(X_val_vec)
-            accuracy = accuracy_score(y_val, y_pred)
+        def report(phase: str) -> None:
+            self._report_phase(db, job, phase)
 
-            # Precision, recall, f1 для кожного класу
-            precision, recall, f1, support = precision_recall_fscore_support(
-                y_val, y_pred, labels=["high", "medium", "low"], zero_division=0
-            )
+        try:
+            # Feedback, записаний після цього моменту, потрапить у наступне навчання
+            trained_until = job.started_at
+            training_type = job.training_type
+
+            report("LOAD_DATA")
+            base = self._incremental_base(db) if training_type == "INCREMENTAL" else None
+
+            if base is not None:
+                result = self._train_incremental(db, base, trained_until, report)
+            else:
+                if training_type == "INCREMENTAL":
+                    job.training_type = "FULL"
+                # Для INITIAL training використовуємо тікети напряму
+                result = self._train_full(
+                    db, trained_until, use_tickets=(training_type == "INITIAL"), report=report
+                )
 
-            metrics = {
-                "accuracy": float(accuracy),
-                "precision_p1": float(precision[0]),  # high
-                "precision_p2": float(precision[1]),  # medium
-                "precision_p3": float(precision[2]),  # low
-                "recall_p1": float(recall[0]),
-                "recall_p2": float(recall[1]),
-                "recall_p3": float(recall[2]),
-                "f1_score": float(np.mean(f1)),
-            }
+            report("SAVE")
+            metrics = result["metrics"]
 
             # Генеруємо версію моделі
             version = datetime.utcnow().strftime("v%Y%m%d_%H%M%S")
 
             # Зберігаємо модель + vectorizer разом
-            model_path = self.artifacts_dir / f"model_pri_text_{version}.joblib"
-            joblib.dump({"model": model, "vectorizer": vectorizer}, model_path)
+            model_path = model_artifact_service.save(
+                version,
+                {
+                    "model": result["model"],
+                    "vectorizer": result["vectorizer"],
+                    "feature_space": self.FEATURE_SPACE,
+                    "class_weight": result["class_weight"],
+                },
+            )
 
             # Створюємо metadata запис
             model_metadata = MLModelMetadata(
@@ -255,39 +488,55 @@ class ActiveLearningService:
                 recall_p2=metrics["recall_p2"],
                 recall_p3=metrics["recall_p3"],
                 f1_score=metrics["f1_score"],
-                training_samples_count=len(texts),
+                training_samples_count=result["total_samples"],
                 is_active=False,  # Не активуємо автоматично
                 model_file_path=str(model_path),
-                metadata_json={
-                    "train_size": len(X_train),
-                    "val_size": len(X_val),
-                    "class_distribution": {
-                        "high": int(labels.count("high")),
-                        "medium": int(labels.count("medium")),
-                        "low": int(labels.count("low")),
-                    },
-                },
-                notes=f"Trained via {training_type} on {len(texts)} samples",
+                metadata_json=result["metadata"],
+                notes=f"Trained via {job.training_type} on {result['new_samples']} samples",
             )
             db.add(model_metadata)
+            db.commit()
+
+            # Benchmark швидкодії; його збій не робить навчання невдалим
+            report("BENCHMARK")
+            try:
+                model_benchmark_service.benchmark_version(db, version)
+            except Exception as e:
+                db.rollback()
+                print(f"[ActiveLearning] WARNING: Benchmark of {version} failed: {e}")
 
             # Оновлюємо job
             job.status = "COMPLETED"
+            job.phase = "DONE"
+            job.progress = self.PHASE_PROGRESS["DONE"]
             job.completed_at = datetime.utcnow()
             job.model_version = version
-            job.total_training_samples = len(texts)
+            job.new_feedback_count = result["new_samples"]
+            job.total_training_samples = result["total_samples"]
             job.training_logs = f"Training completed successfully. Metrics: {metrics}"
 
             db.commit()
 
-            print(f"[ActiveLearning] Model {version} trained successfully!")
-            print(f"[ActiveLearning] Accuracy: {metrics['accuracy']:.3f}")
-            print(f"[ActiveLearning] F1-score: {metrics['f1_score']:.3f}")
+            print(f"[ActiveLearning] Model {version} trained successfully ({job.training_type})!")
+            if metrics["accuracy"] is not None:
+                print(f"[ActiveLearning] Accuracy: {metrics['accuracy']:.3f}")
+                print(f"[ActiveLearning] F1-score: {metrics['f1_score']:.3f}")
+            else:
+                print("[ActiveLearning] Metrics unknown: too few new samples for a holdout")
+
+            return job
+
+        except TrainingCancelled:
+            job.status = "CANCELLED"
+            job.completed_at = datetime.utcnow()
+            db.commit()
 
+            print(f"[ActiveLearning] Training job {job.id} cancelled at phase {job.phase}")
             return job
 
         except Exception as e:
             # Якщо щось пішло не так
+            db.rollback()
             job.status = "FAILED"
             job.completed_at = datetime.utcnow()
             job.error_message = str(e)
@@ -296,39 +545,409 @@ class ActiveLearningService:
             print(f"[ActiveLearning] Training failed: {e}")
             raise
 
-    def activate_model(self, db: Session, version: str) -> bool:
+    def _report_phase(self, db: Session, job: MLTrainingJob, phase: str) -> None:
+        """Записує фазу/прогрес job і перевіряє, чи не запитано скасування."""
+        job.phase = phase
+        job.progress = self.PHASE_PROGRESS[phase]
+        db.commit()
+
+        cancel_requested = (
+            db.query(MLTrainingJob.cancel_requested)
+            .filter(MLTrainingJob.id == job.id)
+            .scalar()
+        )
+        if cancel_requested:
+            raise TrainingCancelled(f"Training job {job.id} cancelled")
+
+    @classmethod
+    def build_vectorizer(cls) -> HashingVectorizer:
+        """
+        Stateless простір ознак: не залежить від даних, тому модель можна
+        дотреновувати новими прикладами без перебудови словника.
+        """
+        return HashingVectorizer(
+            n_features=cls.HASHING_N_FEATURES,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm="l2",
+        )
+
+    def _train_full(
+        self,
+        db: Session,
+        trained_until: datetime,
+        use_tickets: bool = False,
+        report: Callable[[str], None] = lambda phase: None,
+    ) -> Dict:
+        """Повне навчання на всій історії feedback (або тікетах для INITIAL)."""
+        # Читання і векторизація йдуть одним потоком батчів
+        report("VECTORIZE")
+        vectorizer = self.build_vectorizer()
+        if use_tickets:
+            X, labels, _ = self._vectorize_stream(
+                vectorizer, self.iter_training_batches(db, use_tickets=True)
+            )
+        else:
+            X, labels = self._cached_feature_matrix(db, vectorizer)
+        n_samples = X.shape[0]
+
+        if n_samples < self.MIN_TOTAL_SAMPLES:
+            raise ValueError(
+                f"Not enough training samples: {n_samples}/{self.MIN_TOTAL_SAMPLES}"
+            )
+
+        # Розбиваємо на train/validation (по індексах рядків матриці)
+        train_idx, val_idx = train_test_split(
+            np.arange(n_samples), test_size=0.2, random_state=42, stratify=labels
+        )
+        X_train_vec, X_val_vec = X[train_idx], X[val_idx]
+        y_train, y_val = labels[train_idx], labels[val_idx]
+
+        # Ваги класів фіксуємо явно: partial_fit не підтримує class_weight="balanced"
+        classes = np.unique(y_train)
+        class_weight = {
+            str(label): float(weight)
+            for label, weight in zip(
+                classes, compute_class_weight("balanced", classes=classes, y=y_train)
+            )
+        }
+
+        hyperparams = dict(self.DEFAULT_HYPERPARAMS)
+        search = None
+        if settings.ML_HYPERPARAM_SEARCH:
+            report("SEARCH")
+            hyperparams, search = self._search_hyperparameters(X_train_vec, y_train, class_weight)
+
+        # Навчаємо SGDClassifier (підтримує partial_fit для incremental learning)
+        model = SGDClassifier(
+            max_iter=1000,
+            random_state=42,
+            class_weight=class_weight,  # для unbalanced datasets
+            **hyperparams,
+        )
+        report("FIT")
+        model.fit(X_train_vec, y_train)
+
+        report("EVALUATE")
+        metrics = self._compute_metrics(y_val, model.predict(X_val_vec))
+        active_comparison = self._compare_with_active(db, X_val_vec, y_val)
+
+        return {
+            "model": model,
+            "vectorizer": vectorizer,
+            "class_weight": class_weight,
+            "metrics": metrics,
+            "new_samples": n_samples,
+            "total_samples": n_samples,
+            "metadata": {
+                "train_size": len(train_idx),
+                "val_size": len(val_idx),
+                "class_distribution": self._class_distribution(labels),
+                "feature_space": self.FEATURE_SPACE,
+                "hyperparameters": hyperparams,
+                "hyperparameter_search": search,
+                "active_comparison": active_comparison,
+                "trained_until": trained_until.isoformat(),
+                "full_refit_at": trained_until.isoformat(),
+                "increments_since_full": 0,
+            },
+        }
+
+    def _search_hyperparameters(
+        self,
+        X_train: sparse.csr_matrix,
+        y_train: np.ndarray,
+        class_weight: Dict[str, float],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Паралельний пошук гіперпараметрів SGDClassifier з лімітом часу.
+
+        Кандидати (DEFAULT_HYPERPARAMS + випадкова вибірка з ML_SEARCH_SPACE)
+        навчаються в n_jobs процесах на частині train set і оцінюються на
+        решті за macro F1. Дедлайн ML_SEARCH_BUDGET_SECONDS перевіряє кожен
+        кандидат перед стартом, а вже запущені навчання дораховуються: бюджет
+        перевищується не більше ніж на одне навчання в кожному з n_jobs
+        процесів (DEFAULT_HYPERPARAMS оцінюється завжди).
+
+        Returns:
+            (найкращі параметри, опис пошуку для metadata_json)
+        """
+        started = time.monotonic()
+        budget = settings.ML_SEARCH_BUDGET_SECONDS
+        deadline = time.time() + budget
+        max_candidates = max(1, settings.ML_SEARCH_MAX_CANDIDATES)
+
+        candidates = [dict(self.DEFAULT_HYPERPARAMS)]
+        for params in ParameterSampler(settings.ML_SEARCH_SPACE, n_iter=max_candidates, random_state=42):
+            params = {**self.DEFAULT_HYPERPARAMS, **params}
+            if params not in candidates:
+                candidates.append(params)
+        candidates = candidates[:max_candidates]
+
+        try:
+            fit_idx, tune_idx = train_test_split(
+                np.arange(X_train.shape[0]), test_size=0.2, random_state=42, stratify=y_train
+            )
+        except ValueError:
+            fit_idx, tune_idx = train_test_split(
+                np.arange(X_train.shape[0]), test_size=0.2, random_state=42
+            )
+        X_fit, y_fit = X_train[fit_idx], y_train[fit_idx]
+        X_tune, y_tune = X_train[tune_idx], y_train[tune_idx]
+
+        n_jobs = max(1, min(effective_n_jobs(self.SEARCH_N_JOBS), len(candidates)))
+        trace: List[Dict[str, Any]] = []
+
+        results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+            delayed(_evaluate_candidate)(
+                params, X_fit, y_fit, X_tune, y_tune, class_weight,
+                deadline=deadline if idx else None,
+            )
+            for idx, params in enumerate(candidates)
+        )
+        trace.extend(result for result in results if result is not None)
+
+        best = max(trace, key=lambda result: (result["f1_score"], result["accuracy"]))
+        elapsed = time.monotonic() - started
+
+        print(
+            f"[ActiveLearning] Hyperparameter search: {len(trace)}/{len(candidates)} candidates "
+            f"in {elapsed:.1f}s, best {best['params']} (F1 {best['f1_score']:.3f})"
+        )
+
+        return best["params"], {
+            "budget_seconds": budget,
+            "elapsed_seconds": round(elapsed, 3),
+            "n_jobs": n_jobs,
+            "candidates_total": len(candidates),
+            "candidates_evaluated": len(trace),
+            "best": best,
+            "trace": trace,
+        }
+
+    def _train_incremental(
+        self,
+        db: Session,
+        base: Dict,
+        trained_until: datetime,
+        report: Callable[[str], None] = lambda phase: None,
+    ) -> Dict:
+        """
+        Дотреновує активну модель через partial_fit тільки на новому feedback.
+
+        Нові приклади діляться на train/holdout; метрики рахуються на holdout
+        до того, як модель його побачить, після чого holdout теж домішується.
+        Базова (активна) модель оцінюється на тому самому holdout - саме це
+        порівняння використовує activate_if_better. Якщо прикладів замало для
+        holdout, метрики невідомі (None).
+        """
+        base_meta: MLModelMetadata = base["metadata"]
+        base_info = base_meta.metadata_json or {}
+
+        vectorizer = base["vectorizer"]
+        class_weight = base["class_weight"]
+        model = copy.deepcopy(base["model"])
+
+        report("VECTORIZE")
+        X, labels, _ = self._vectorize_stream(
+            vectorizer, self.iter_training_batches(db, since_date=base["trained_until"])
+        )
+        n_samples = X.shape[0]
+
+        if not n_samples:
+            raise ValueError("No new feedback since the active model was trained")
+
+        if n_samples >= 10:
+            _, counts = np.unique(labels, return_counts=True)
+            train_idx, val_idx = train_test_split(
+                np.arange(n_samples), test_size=0.2, random_state=42,
+                stratify=labels if counts.min() >= 2 and len(counts) > 1 else None,
+            )
+        else:
+            train_idx, val_idx = np.arange(n_samples), np.array([], dtype=int)
+
+        X_train_vec, y_train = X[train_idx], labels[train_idx]
+        X_val_vec, y_val = X[val_idx], labels[val_idx]
+
+        def _partial_fit(X_batch, batch_labels):
+            self._partial_fit_step(model, X_batch, batch_labels, class_weight)
+
+        report("FIT")
+        _partial_fit(X_train_vec, y_train)
+
+        report("EVALUATE")
+        if len(val_idx):
+            metrics = self._compute_metrics(y_val, model.predict(X_val_vec))
+            active_comparison = self._holdout_comparison(base_meta.version, base["model"], X_val_vec, y_val)
+            _partial_fit(X_val_vec, y_val)
+        else:
+            # Замало нових прикладів для holdout - якість моделі невідома
+            metrics = dict.fromkeys(self.METRIC_KEYS)
+            active_comparison = None
+
+        return {
+            "model": model,
+            "vectorizer": vectorizer,
+            "class_weight": class_weight,
+            "metrics": metrics,
+            "new_samples": n_samples,
+            "total_samples": (base_meta.training_samples_count or 0) + n_samples,
+            "metadata": {
+                "train_size": len(train_idx),
+                "val_size": len(val_idx),
+                "class_distribution": self._class_distribution(labels),
+                "feature_space": self.FEATURE_SPACE,
+                "base_version": base_meta.version,
+                "active_comparison": active_comparison,
+                "trained_until": trained_until.isoformat(),
+                "full_refit_at": base_info["full_refit_at"],
+                "increments_since_full": int(base_info.get("increments_since_full", 0)) + 1,
+            },
+        }
+
+    @staticmethod
+    def _partial_fit_step(
+        model: SGDClassifier,
+        X_batch: sparse.csr_matrix,
+        batch_labels: np.ndarray,
+        class_weight: Dict[str, float],
+    ) -> None:
+        """
+        Один крок partial_fit з вагами класів full refit.
+
+        Ваги задаються лише через model.class_weight: додатковий sample_weight
+        з тими самими вагами застосував би їх вдруге (weight^2).
+        """
+        model.class_weight = class_weight or None
+        model.partial_fit(X_batch, batch_labels, classes=model.classes_)
+
+    def _incremental_base(self, db: Session) -> Optional[Dict]:
+        """
+        Активна модель, яку можна дотренувати, або None якщо потрібен full refit:
+        немає активної моделі, вона не в hashing просторі ознак, або з останнього
+        повного перенавчання пройшло забагато часу / інкрементів (drift).
+        """
+        active = db.query(MLModelMetadata).filter(MLModelMetadata.is_active == True).first()
+        if not active or not active.model_file_path or not os.path.exists(active.model_file_path):
+            print("[ActiveLearning] No active model to warm-start from, running full refit")
+            return None
+
+        info = active.metadata_json or {}
+        if info.get("feature_space") != self.FEATURE_SPACE or "trained_until" not in info:
+            print(f"[ActiveLearning] Active model {active.version} is not incremental, running full refit")
+            return None
+
+        if int(info.get("increments_since_full", 0)) >= self.FULL_REFIT_EVERY_INCREMENTS:
+            print(f"[ActiveLearning] {info['increments_since_full']} increments since full refit, running full refit")
+            return None
+
+        full_refit_at = datetime.fromisoformat(info["full_refit_at"])
+        if datetime.utcnow() - full_refit_at > timedelta(days=self.FULL_REFIT_MAX_AGE_DAYS):
+            print(f"[ActiveLearning] Last full refit at {full_refit_at}, running full refit")
+            return None
+
+        artifact = joblib.load(active.model_file_path)
+        if not isinstance(artifact, dict) or set(artifact["model"].classes_) != set(self.LABELS):
+            print(f"[ActiveLearning] Active model {active.version} lacks some classes, running full refit")
+            return None
+
+        return {
+            "metadata": active,
+            "model": artifact["model"],
+            "vectorizer": artifact["vectorizer"],
+            "class_weight": artifact.get("class_weight", {}),
+            "trained_until": datetime.fromisoformat(info["trained_until"]),
+        }
+
+    def _compare_with_active(
+        self,
+        db: Session,
+        X_val: sparse.csr_matrix,
+        y_val: np.ndarray,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Оцінює активну модель на validation set нової моделі.
+
+        Returns:
+            Опис порівняння або None, якщо активна модель не в тому самому
+            просторі ознак (її не можна застосувати до X_val)
+        """
+        active = db.query(MLModelMetadata).filter(MLModelMetadata.is_active == True).first()
+        if not active or not active.model_file_path or not os.path.exists(active.model_file_path):
+            return None
+
+        artifact = joblib.load(active.model_file_path)
+        if not isinstance(artifact, dict) or artifact.get("feature_space") != self.FEATURE_SPACE:
+            return None
+
+        return self._holdout_comparison(active.version, artifact["model"], X_val, y_val)
+
+    def _holdout_comparison(self, version: str, model, X_val: sparse.csr_matrix, y_val: np.ndarray) -> Dict[str, Any]:
+        metrics = self._compute_metrics(y_val, model.predict(X_val))
+        return {
+            "version": version,
+            "accuracy": metrics["accuracy"],
+            "f1_score": metrics["f1_score"],
+            "holdout_size": int(len(y_val)),
+        }
+
+    def _compute_metrics(self, y_val: list, y_pred) -> Dict[str, float]:
+        """Accuracy, precision/recall по класах і macro F1 на validation set."""
+        accuracy = accuracy_score(y_val, y_pred)
+
+        # Precision, recall, f1 для кожного класу
+        precision, recall, f1, support = precision_recall_fscore_support(
+            y_val, y_pred, labels=self.LABELS, zero_division=0
+        )
+
+        return {
+            "accuracy": float(accuracy),
+            "precision_p1": float(precision[0]),  # high
+            "precision_p2": float(precision[1]),  # medium
+            "precision_p3": float(precision[2]),  # low
+            "recall_p1": float(recall[0]),
+            "recall_p2": float(recall[1]),
+            "recall_p3": float(recall[2]),
+            "f1_score": float(np.mean(f1)),
+        }
+
+    def activate_model(self, db: Session, version: str, enforce_latency_budget: bool = True) -> bool:
         """
         Активує певну версію моделі (робить її поточною).
 
         Args:
             db: Database session
             version: Версія моделі для активації
+            enforce_latency_budget: Відхиляти моделі з p99 понад ML_LATENCY_BUDGET_P99_MS
 
         Returns:
             True if successful
-        """
-        # Деактивуємо всі моделі
-        db.query(MLModelMetadata).update({"is_active": False})
 
-        # Активуємо вибрану
+        Raises:
+            ValueError: версію не знайдено
+            LatencyBudgetExceeded: модель занадто повільна
+        """
         model = db.query(MLModelMetadata).filter(MLModelMetadata.version == version).first()
 
         if not model:
             raise ValueError(f"Model version {version} not found")
 
-        model.is_active = True
-        db.commit()
+        if enforce_latency_budget:
+            model_benchmark_service.check_latency_budget(model)
+
+        if not model.model_file_path or not os.path.exists(model.model_file_path):
+            return False
 
-        # Копіюємо файл моделі як поточний
-        current_model_path = self.artifacts_dir / "model_pri_text.joblib"
-        if os.path.exists(model.model_file_path):
-            import shutil
+        # Деактивуємо всі моделі і активуємо вибрану
+        db.query(MLModelMetadata).filter(MLModelMetadata.id != model.id).update({"is_active": False})
 
-            shutil.copy(model.model_file_path, current_model_path)
-            print(f"[ActiveLearning] Model {version} activated successfully!")
-            return True
+        model.is_active = True
+        db.commit()
 
-        return False
+        # Перемикаємо pointer на файл версії (без копіювання моделі)
+        model_artifact_service.activate(version, model.model_file_path)
+        print(f"[ActiveLearning] Model {version} activated successfully!")
+        return True
 
     def get_best_model(self, db: Session) -> Optional[MLModelMetadata]:
         """
@@ -361,7 +980,28 @@ class ActiveLearningService:
         print(f"[ActiveLearning] Starting automatic retraining...")
         job = self.train_model(db, training_type="INCREMENTAL")
 
-        # Автоматично активуємо якщо це перша модель або якщо нова краща
+        if job.status == "COMPLETED":
+            self.activate_if_better(db, job)
+
+        return job
+
+    def activate_if_better(self, db: Session, job: MLTrainingJob) -> bool:
+        """
+        Активує модель з job, якщо активної моделі немає або нова краща за accuracy
+        (і вкладається в ліміт латентності).
+
+        Політика порівняння:
+        - обидві моделі оцінені на одному holdout (active_comparison в
+          metadata_json) - нова активується, якщо її accuracy вища;
+        - метрики нової моделі невідомі (замало даних для holdout) або її
+          порівнювали з іншою версією, ніж поточна активна - модель не
+          активується автоматично (лише вручну через API);
+        - активна модель з іншого простору ознак, який не можна оцінити на
+          тому самому holdout - порівнюються збережені validation accuracy.
+
+        Returns:
+            True якщо модель активовано
+        """
         current_active = (
             db.query(MLModelMetadata).filter(MLModelMetadata.is_active == True).first()
         )
@@ -373,19 +1013,43 @@ class ActiveLearningService:
         if not current_active:
             # Перша модель - активуємо
             print(f"[ActiveLearning] Activating first model: {job.model_version}")
-            self.activate_model(db, job.model_version)
-        elif new_model.accuracy > current_active.accuracy:
-            # Нова модель краща - активуємо
+        elif new_model.accuracy is None:
             print(
-                f"[ActiveLearning] New model better ({new_model.accuracy:.3f} > {current_active.accuracy:.3f}), activating {job.model_version}"
+                f"[ActiveLearning] Metrics of {job.model_version} unknown, keeping {current_active.version}"
             )
-            self.activate_model(db, job.model_version)
+            return False
         else:
+            comparison = (new_model.metadata_json or {}).get("active_comparison")
+            if comparison is not None and comparison["version"] != current_active.version:
+                print(
+                    f"[ActiveLearning] {job.model_version} was evaluated against {comparison['version']}, "
+                    f"not the active {current_active.version}; keeping it"
+                )
+                return False
+
+            if comparison is not None:
+                active_accuracy = comparison["accuracy"]
+            elif current_active.accuracy is not None:
+                active_accuracy = current_active.accuracy
+            else:
+                active_accuracy = float("-inf")
+
+            if new_model.accuracy <= active_accuracy:
+                print(
+                    f"[ActiveLearning] New model not better ({new_model.accuracy:.3f} <= {active_accuracy:.3f}), keeping {current_active.version}"
+                )
+                return False
+
+            # Нова модель краща - активуємо
             print(
-                f"[ActiveLearning] New model not better ({new_model.accuracy:.3f} <= {current_active.accuracy:.3f}), keeping {current_active.version}"
+                f"[ActiveLearning] New model better ({new_model.accuracy:.3f} > {active_accuracy:.3f}), activating {job.model_version}"
             )
 
-        return job
+        try:
+            return self.activate_model(db, job.model_version)
+        except LatencyBudgetExceeded as e:
+            print(f"[ActiveLearning] Not activating {job.model_version}: {e}")
+            return False
 
 
 # Глобальний інстанс
@@ -4,23 +4,96 @@
 2. Завантаженості спеціаліста (кількість активних тікетів)
 3. Досвіду з категорією (кількість вирішених тікетів по категорії)
 4. Збігу ключових слів тікета з профілем експертизи спеціаліста (learning-based)
+
+Активні тікети (лічильники agent_workload) і досвід по категорії (один запит
+з умовною агрегацією) для всіх агентів департаменту збираються в
+AgentCategorySnapshot, який recommend будує один раз і передає всім стратегіям.
 """
-from typing import Optional
+from typing import Dict, Optional, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case
 
 from app.models import User, Ticket
 from app.core.enums import RoleEnum, StatusEnum, CategoryEnum
+from app.services.workload_service import workload_service
+from app.services.candidate_pool_service import candidate_pool_service
+
+
+class AgentCategorySnapshot:
+    """Незмінний знімок навантаження і досвіду агентів для однієї категорії."""
+
+    __slots__ = ("category", "active_counts", "experience_counts")
+
+    def __init__(
+        self,
+        category: Optional[CategoryEnum],
+        active_counts: Dict[int, int],
+        experience_counts: Dict[int, int],
+    ):
+        self.category = category
+        self.active_counts = active_counts
+        self.experience_counts = experience_counts
+
+    def active(self, agent_id: int) -> int:
+        return self.active_counts.get(agent_id, 0)
+
+    def experience(self, agent_id: int) -> int:
+        return self.experience_counts.get(agent_id, 0)
 
 
 class AssigneeService:
     """Сервіс для рекомендації виконавця"""
 
+    RESOLVED_STATUSES = (StatusEnum.RESOLVED, StatusEnum.CLOSED)
+
+    @staticmethod
+    def build_snapshot(
+        agent_ids: Sequence[int],
+        category: Optional[CategoryEnum],
+        db: Session
+    ) -> AgentCategorySnapshot:
+        """
+        Збирає метрики всіх агентів:
+        - активні тікети - з лічильників agent_workload (як і решта призначення)
+        - досвід - одним GROUP BY по вирішених тікетах з category == category
+          і з category_ml_suggested == category
+
+        Досвід агента - по category, а якщо таких тікетів немає - по ML suggested category.
+        """
+        if not agent_ids:
+            return AgentCategorySnapshot(category, {}, {})
+
+        active_counts = workload_service.get_active_counts(list(agent_ids), db)
+
+        experience_counts: Dict[int, int] = {}
+        if category:
+            by_category = Ticket.category == category
+            by_ml_category = Ticket.category_ml_suggested == category
+            rows = (
+                db.query(
+                    Ticket.assigned_to_user_id,
+                    func.sum(case((by_category, 1), else_=0)),
+                    func.sum(case((by_ml_category, 1), else_=0)),
+                )
+                .filter(
+                    Ticket.assigned_to_user_id.in_(list(agent_ids)),
+                    Ticket.status.in_(AssigneeService.RESOLVED_STATUSES),
+                    by_category | by_ml_category,
+                )
+                .group_by(Ticket.assigned_to_user_id)
+                .all()
+            )
+            for agent_id, category_count, ml_category_count in rows:
+                experience_counts[agent_id] = int(category_count or 0) or int(ml_category_count or 0)
+
+        return AgentCategorySnapshot(category, active_counts, experience_counts)
+
     @staticmethod
     def recommend_assignee(
         category: Optional[CategoryEnum],
         department_id: Optional[int],
-        db: Session
+        db: Session,
+        snapshot: Optional[AgentCategorySnapshot] = None
     ) -> Optional[User]:
         """
         Рекомендує спеціаліста на основі категорії тікета.
@@ -35,6 +108,8 @@ class AssigneeService:
             category: Категорія тікета (Hardware/Software/Network/Access/Other)
             department_id: ID департаменту
             db: DB сесія
+            snapshot: Готовий знімок метрик (спільний між стратегіями); якщо не
+                передано - будується одним запитом
 
         Returns:
             User або None
@@ -42,39 +117,23 @@ class AssigneeService:
         if not category or not department_id:
             return None
 
-        # 1. Знаходимо всіх агентів з департаменту
-        agents = db.query(User).filter(
-            User.role == RoleEnum.AGENT,
-            User.department_id == department_id,
-            User.is_active == True
-        ).all()
+        # 1. Знаходимо всіх агентів з департаменту (кешований пул)
+        agents = candidate_pool_service.get_pool(department_id, db).select(roles=(RoleEnum.AGENT,))
 
         if not agents:
             return None
 
-        # 2. Для кожного агента рахуємо метрики
+        # 2. Метрики всіх агентів (один запит)
+        if snapshot is None or snapshot.category != category:
+            snapshot = AssigneeService.build_snapshot([agent.id for agent in agents], category, db)
+
         agent_scores = []
         for agent in agents:
             # Кількість активних тікетів
-            active_count = db.query(Ticket).filter(
-                Ticket.assigned_to_user_id == agent.id,
-                Ticket.status.in_([StatusEnum.NEW, StatusEnum.TRIAGE, StatusEnum.IN_PROGRESS])
-            ).count()
-
-            # Кількість вирішених тікетів по категорії
-            experience_count = db.query(Ticket).filter(
-                Ticket.assigned_to_user_id == agent.id,
-                Ticket.status.in_([StatusEnum.RESOLVED, StatusEnum.CLOSED]),
-                Ticket.category == category
-            ).count()
-
-            # Альтернатива: рахуємо по ML suggested category якщо category не встановлено
-            if experience_count == 0:
-                experience_count = db.query(Ticket).filter(
-                    Ticket.assigned_to_user_id == agent.id,
-                    Ticket.status.in_([StatusEnum.RESOLVED, StatusEnum.CLOSED]),
-                    Ticket.category_ml_suggested == category
-                ).count()
+            active_count = snapshot.active(agent.id)
+
+            # Кількість вирішених тікетів по категорії (або по ML suggested category)
+            experience_count = snapshot.experience(agent.id)
 
             # Скор: мінус активні (менше = краще) + досвід (більше = краще)
             # Вага: досвід важливіший, тому множимо на 2
@@ -96,13 +155,14 @@ class AssigneeService:
               f"(активних: {best['active_count']}, досвід з {category.value}: {best['experience_count']}, "
               f"score: {best['score']})")
 
-        return best['agent']
+        return db.get(User, best['agent'].id)
 
     @staticmethod
     def recommend_by_name_pattern(
         category: Optional[CategoryEnum],
         department_id: Optional[int],
-        db: Session
+        db: Session,
+        snapshot: Optional[AgentCategorySnapshot] = None
     ) -> Optional[User]:
         """
         Альтернативна логіка: призначає спеціаліста за іменем.
@@ -125,24 +185,16 @@ class AssigneeService:
         keyword = category_keywords.get(category)
 
         # Знаходимо агентів з потрібним keyword в email
-        agents = db.query(User).filter(
-            User.role == RoleEnum.AGENT,
-            User.department_id == department_id,
-            User.is_active == True
-        )
-
-        if keyword:
-            agents = agents.filter(User.email.contains(keyword))
+        department_agents = candidate_pool_service.get_pool(department_id, db).select(roles=(RoleEnum.AGENT,))
 
-        agents_list = agents.all()
+        agents_list = [
+            agent for agent in department_agents
+            if not keyword or keyword in agent.email
+        ]
 
         if not agents_list:
             # Якщо немає спеціалізованого, беремо будь-якого з департаменту
-            agents_list = db.query(User).filter(
-                User.role == RoleEnum.AGENT,
-                User.department_id == department_id,
-                User.is_active == True
-            ).all()
+            agents_list = list(department_agents)
 
         if not agents_list:
             return None
@@ -150,12 +202,11 @@ class AssigneeService:
         # З відфільтрованих беремо найменш завантаженого
         best_agent = None
         min_active = float('inf')
+        if snapshot is None:
+            snapshot = AssigneeService.build_snapshot([agent.id for agent in department_agents], category, db)
 
         for agent in agents_list:
-            active_count = db.query(Ticket).filter(
-                Ticket.assigned_to_user_id == agent.id,
-                Ticket.status.in_([StatusEnum.NEW, StatusEnum.TRIAGE, StatusEnum.IN_PROGRESS])
-            ).count()
+            active_count = snapshot.active(agent.id)
 
             if active_count < min_active:
                 min_active = active_count
@@ -163,15 +214,44 @@ class AssigneeService:
 
         if best_agent:
             print(f"[ASSIGNEE BY NAME] Обрано: {best_agent.full_name} (активних: {min_active})")
+            return db.get(User, best_agent.id)
 
-        return best_agent
+        return None
 
     @staticmethod
-    def recommend_by_expertise(
+    def recommend(
         ticket_text: str,
         category: Optional[CategoryEnum],
         department_id: Optional[int],
         db: Session
+    ) -> Optional[User]:
+        """
+        Пробує стратегії по черзі: експертиза -> категорія -> ім'я.
+
+        Знімок метрик агентів будується один раз і спільний для всіх стратегій.
+        """
+        if not department_id:
+            return None
+
+        agents = candidate_pool_service.get_pool(department_id, db).select(roles=(RoleEnum.AGENT,))
+        if not agents:
+            return None
+
+        snapshot = AssigneeService.build_snapshot([agent.id for agent in agents], category, db)
+
+        return (
+            AssigneeService.recommend_by_expertise(ticket_text, category, department_id, db, snapshot)
+            or AssigneeService.recommend_assignee(category, department_id, db, snapshot)
+            or AssigneeService.recommend_by_name_pattern(category, department_id, db, snapshot)
+        )
+
+    @staticmethod
+    def recommend_by_expertise(
+        ticket_text: str,
+        category: Optional[CategoryEnum],
+        department_id: Optional[int],
+        db: Session,
+        snapshot: Optional[AgentCategorySnapshot] = None
     ) -> Optional[User]:
         """
         Рекомендує спеціаліста на основі збігу ключових слів тікета
@@ -185,6 +265,8 @@ class AssigneeService:
             category: ML-передбачена категорія
             department_id: ID департаменту
             db: DB сесія
+            snapshot: Готовий знімок метрик; активні тікети з нього
+                використовуються як навантаження агентів
 
         Returns:
             User або None
@@ -195,7 +277,8 @@ class AssigneeService:
             ticket_text=ticket_text,
             category=category,
             department_id=department_id,
-            db=db
+            db=db,
+            active_counts=snapshot.active_counts if snapshot is not None else None
         )
 
         if recommended_agent:
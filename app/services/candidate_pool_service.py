@@ -0,0 +1,178 @@
+"""
+Candidate Pool Service - кеш пулів кандидатів на assignment по департаментах.
+
+Замість запиту до users (роль, is_active, availability, департамент) на кожен тікет:
+1. Для департаменту один раз будується незмінний знімок активних AGENT/LEAD
+2. Writers (users/departments routers, оновлення assignment_score) збільшують
+   версію в cache_versions в тій самій транзакції
+3. Читач порівнює версію з БД (один запит по PK) з версією свого знімка;
+   якщо вона змінилась - всі знімки цього worker-а скидаються
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.cache_version import CacheVersion
+from app.core.enums import RoleEnum
+from app.services.specialty_index_service import SpecialtyIndexService
+
+
+class CandidateAgent:
+    """
+    Незмінний знімок полів агента, потрібних для assignment.
+    Має ті самі імена атрибутів, що й User.
+    """
+
+    __slots__ = (
+        "id", "email", "full_name", "role", "department_id",
+        "specialty", "specialty_tokens",
+        "workload_capacity", "assignment_score", "availability_status",
+    )
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.email = user.email
+        self.full_name = user.full_name
+        self.role = user.role
+        self.department_id = user.department_id
+        self.specialty = user.specialty
+        self.specialty_tokens: Tuple[str, ...] = (
+            tuple(SpecialtyIndexService.split_specialty(user.specialty)) if user.specialty else ()
+        )
+        self.workload_capacity = user.workload_capacity
+        self.assignment_score = user.assignment_score
+        self.availability_status = user.availability_status
+
+    def __repr__(self):
+        return f"<CandidateAgent {self.email} ({self.role})>"
+
+
+class DepartmentPool:
+    """Знімок активних AGENT/LEAD одного департаменту (None = всі департаменти)."""
+
+    __slots__ = ("department_id", "version", "agents")
+
+    def __init__(self, department_id: Optional[int], version: int, agents: Sequence[CandidateAgent]):
+        self.department_id = department_id
+        self.version = version
+        self.agents: Tuple[CandidateAgent, ...] = tuple(agents)
+
+    def select(
+        self,
+        roles: Sequence[RoleEnum],
+        exclude_availability: Sequence[str] = (),
+    ) -> Tuple[CandidateAgent, ...]:
+        """Агенти з потрібними ролями, без вказаних availability статусів."""
+        return tuple(
+            agent for agent in self.agents
+            if agent.role in roles and agent.availability_status not in exclude_availability
+        )
+
+
+class CandidatePoolService:
+    """
+    Сервіс для кешування пулів кандидатів на assignment.
+    """
+
+    VERSION_KEY = "candidate_pool"
+
+    # Ролі, з яких будується пул (споживачі фільтрують далі)
+    POOL_ROLES = (RoleEnum.AGENT, RoleEnum.LEAD)
+
+    def __init__(self):
+        self._pools: Dict[Optional[int], DepartmentPool] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get_pool(self, department_id: Optional[int], db: Session) -> DepartmentPool:
+        """
+        Повертає пул кандидатів департаменту, перебудовуючи його якщо версія змінилась.
+
+        Args:
+            department_id: ID департаменту (None = всі департаменти)
+            db: Database session
+        """
+        version = self._current_version(db)
+
+        with self._lock:
+            if version != self._version:
+                self._pools = {}
+                self._version = version
+            pool = self._pools.get(department_id)
+
+        if pool is not None:
+            return pool
+
+        query = db.query(User).filter(
+            User.role.in_(CandidatePoolService.POOL_ROLES),
+            User.is_active == True
+        )
+        if department_id:
+            query = query.filter(User.department_id == department_id)
+
+        pool = DepartmentPool(
+            department_id=department_id,
+            version=version,
+            agents=[CandidateAgent(user) for user in query.order_by(User.id).all()],
+        )
+
+        with self._lock:
+            if self._version == version:
+                self._pools[department_id] = pool
+
+        return pool
+
+    def mark_changed(self, db: Session) -> None:
+        """
+        Збільшує версію пулів; викликається writer-ом до db.commit().
+
+        Локальні знімки скидаються одразу, інші workers побачать нову
+        версію після коміту. Якщо рядка версії ще немає і паралельна
+        транзакція створила його першою (конфлікт PK), повторюємо UPDATE.
+        """
+        if not CandidatePoolService._increment_version(db):
+            try:
+                # Savepoint: конфлікт не відкочує зміни writer-а в зовнішній транзакції
+                with db.begin_nested():
+                    db.add(CacheVersion(name=CandidatePoolService.VERSION_KEY, version=1))
+            except IntegrityError:
+                CandidatePoolService._increment_version(db)
+
+        self.invalidate()
+
+    @staticmethod
+    def _increment_version(db: Session) -> bool:
+        updated = (
+            db.query(CacheVersion)
+            .filter(CacheVersion.name == CandidatePoolService.VERSION_KEY)
+            .update(
+                {
+                    CacheVersion.version: CacheVersion.version + 1,
+                    CacheVersion.updated_at: datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+        return bool(updated)
+
+    def invalidate(self) -> None:
+        """Скидає знімки поточного worker-а."""
+        with self._lock:
+            self._pools = {}
+            self._version = None
+
+    @staticmethod
+    def _current_version(db: Session) -> int:
+        version = (
+            db.query(CacheVersion.version)
+            .filter(CacheVersion.name == CandidatePoolService.VERSION_KEY)
+            .scalar()
+        )
+        return version or 0
+
+
+candidate_pool_service = CandidatePoolService()
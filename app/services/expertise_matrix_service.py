@@ -0,0 +1,310 @@
+"""
+Expertise Matrix Service - BM25 ранжування агентів за профілями експертизи.
+
+Поверх agent_keyword_counts будується sparse матриця агенти x ключові слова:
+1. Ключові слова інтернуються в term id (словник terms -> id)
+2. Значення - BM25 вага з count, що затухає з часом (HALF_LIFE_DAYS)
+3. Матриця зберігається в artifacts/expertise_matrix/<stamp>/*.npy і
+   відкривається через np.load(mmap_mode="r"); current.json вказує на
+   актуальну версію, тому всі workers читають один файл без копій у пам'яті
+4. Ключові слова тікета оцінюють всіх агентів одним sparse matrix-vector product
+
+Scheduler періодично перебудовує матрицю (REFRESH_INTERVAL_MINUTES).
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.agent_keyword_count import AgentKeywordCount
+
+
+class _ExpertiseMatrix:
+    """Незмінний знімок BM25 матриці (масиви можуть бути memory-mapped)."""
+
+    __slots__ = ("stamp", "terms", "term_ids", "agent_ids", "row_by_agent", "weights", "built_at")
+
+    def __init__(
+        self,
+        stamp: str,
+        terms: List[str],
+        agent_ids: np.ndarray,
+        weights: sparse.csr_matrix,
+        built_at: datetime,
+    ):
+        self.stamp = stamp
+        self.terms = terms
+        self.term_ids = {term: idx for idx, term in enumerate(terms)}
+        self.agent_ids = agent_ids
+        self.row_by_agent = {int(agent_id): row for row, agent_id in enumerate(agent_ids)}
+        self.weights = weights
+        self.built_at = built_at
+
+
+class ExpertiseMatrixService:
+    """
+    Сервіс для BM25 скорингу агентів за ключовими словами тікета.
+    """
+
+    MATRIX_DIR_NAME = "expertise_matrix"
+    POINTER_NAME = "current.json"
+
+    # BM25 параметри (агент = документ, його ключові слова = терміни)
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    # За скільки днів внесок вирішеного тікета зменшується вдвічі
+    HALF_LIFE_DAYS = 180
+
+    # Як часто scheduler перебудовує матрицю
+    REFRESH_INTERVAL_MINUTES = 10
+
+    # Скільки попередніх версій матриці лишати на диску
+    KEEP_VERSIONS = 2
+
+    BATCH_SIZE = 5000
+
+    def __init__(self):
+        self.matrix_dir = settings.ARTIFACTS_DIR / self.MATRIX_DIR_NAME
+        self._matrix: Optional[_ExpertiseMatrix] = None
+        self._pointer_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def decay(value: float, since: Optional[datetime], now: datetime) -> float:
+        """Значення value станом на since, перераховане на момент now."""
+        if since is None or now <= since:
+            return value
+        age_days = (now - since).total_seconds() / 86400
+        return value * 0.5 ** (age_days / ExpertiseMatrixService.HALF_LIFE_DAYS)
+
+    def score(self, keyword_counts: Dict[str, int], agent_ids: Sequence[int]) -> Optional[Dict[int, float]]:
+        """
+        BM25 score агентів для ключових слів тікета.
+
+        Args:
+            keyword_counts: Ключове слово -> кількість входжень у тікеті
+            agent_ids: Агенти, яких оцінюємо
+
+        Returns:
+            Dict[agent_id, score] (агенти без збігів відсутні)
+            або None, якщо матриця ще не побудована
+        """
+        matrix = self._get_matrix()
+        if matrix is None:
+            return None
+
+        rows, term_ids, query = self._select(matrix, keyword_counts, agent_ids)
+        if not len(rows) or not len(term_ids):
+            return {}
+
+        scores = matrix.weights[rows][:, term_ids] @ query
+        return {
+            int(matrix.agent_ids[row]): float(score)
+            for row, score in zip(rows, scores)
+            if score > 0
+        }
+
+    def top_agents(
+        self,
+        keyword_counts: Dict[str, int],
+        agent_ids: Optional[Sequence[int]] = None,
+        k: int = 5,
+    ) -> List[Dict]:
+        """
+        Топ-k агентів за BM25 з внеском кожного ключового слова.
+
+        Returns:
+            List[Dict]: agent_id, score, contributions {keyword: score}
+        """
+        matrix = self._get_matrix()
+        if matrix is None:
+            return []
+
+        if agent_ids is None:
+            agent_ids = [int(agent_id) for agent_id in matrix.agent_ids]
+
+        rows, term_ids, query = self._select(matrix, keyword_counts, agent_ids)
+        if not len(rows) or not len(term_ids):
+            return []
+
+        contributions = matrix.weights[rows][:, term_ids].toarray() * query
+        scores = contributions.sum(axis=1)
+
+        k = min(k, len(rows))
+        top = np.argsort(-scores, kind="stable")[:k]
+
+        return [
+            {
+                "agent_id": int(matrix.agent_ids[rows[i]]),
+                "score": round(float(scores[i]), 4),
+                "contributions": {
+                    matrix.terms[term_id]: round(float(value), 4)
+                    for term_id, value in zip(term_ids, contributions[i])
+                    if value > 0
+                },
+            }
+            for i in top
+            if scores[i] > 0
+        ]
+
+    def rebuild(self, db: Session) -> None:
+        """Будує матрицю з agent_keyword_counts і публікує нову версію на диску."""
+        built_at = datetime.utcnow()
+
+        term_ids: Dict[str, int] = {}
+        agent_ids: List[int] = []
+        row_by_agent: Dict[int, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        values: List[float] = []
+
+        query = db.query(
+            AgentKeywordCount.user_id,
+            AgentKeywordCount.keyword,
+            AgentKeywordCount.decayed_count,
+            AgentKeywordCount.decayed_at,
+        ).yield_per(ExpertiseMatrixService.BATCH_SIZE)
+
+        for user_id, keyword, decayed_count, decayed_at in query:
+            value = ExpertiseMatrixService.decay(decayed_count, decayed_at, built_at)
+            if value <= 0:
+                continue
+            if user_id not in row_by_agent:
+                row_by_agent[user_id] = len(agent_ids)
+                agent_ids.append(user_id)
+            rows.append(row_by_agent[user_id])
+            cols.append(term_ids.setdefault(keyword, len(term_ids)))
+            values.append(value)
+
+        tf = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (rows, cols)),
+            shape=(len(agent_ids), len(term_ids)),
+        )
+        weights = self._bm25_weights(tf)
+
+        terms = [None] * len(term_ids)
+        for term, idx in term_ids.items():
+            terms[idx] = term
+
+        stamp = built_at.strftime("%Y%m%d_%H%M%S_%f")
+        self._publish(stamp, terms, np.array(agent_ids, dtype=np.int64), weights, built_at)
+
+        print(f"[EXPERTISE] Rebuilt BM25 matrix: {len(agent_ids)} agents x {len(terms)} terms")
+
+    def _bm25_weights(self, tf: sparse.csr_matrix) -> sparse.csr_matrix:
+        """
+        BM25 вага кожної пари (агент, термін); score = сума ваг термінів тікета.
+        """
+        n_agents = tf.shape[0]
+        if n_agents == 0 or tf.nnz == 0:
+            return tf.astype(np.float32)
+
+        k1 = ExpertiseMatrixService.BM25_K1
+        b = ExpertiseMatrixService.BM25_B
+
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() or 1.0
+        df = np.bincount(tf.indices, minlength=tf.shape[1])
+        idf = np.log1p((n_agents - df + 0.5) / (df + 0.5))
+
+        # Нормалізація довжини для кожного ненульового елемента (рядок = агент)
+        row_of_value = np.repeat(np.arange(n_agents), np.diff(tf.indptr))
+        norm = k1 * (1 - b + b * doc_len[row_of_value] / avg_len)
+
+        data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+        return sparse.csr_matrix(
+            (data.astype(np.float32), tf.indices.copy(), tf.indptr.copy()),
+            shape=tf.shape,
+        )
+
+    def _select(self, matrix: _ExpertiseMatrix, keyword_counts: Dict[str, int], agent_ids: Sequence[int]):
+        rows = np.array(
+            [matrix.row_by_agent[agent_id] for agent_id in agent_ids if agent_id in matrix.row_by_agent],
+            dtype=np.int64,
+        )
+        known_terms = [(matrix.term_ids[kw], count) for kw, count in keyword_counts.items() if kw in matrix.term_ids]
+        term_ids = np.array([term_id for term_id, _ in known_terms], dtype=np.int64)
+        query = np.array([count for _, count in known_terms], dtype=np.float32)
+        return rows, term_ids, query
+
+    def _publish(self, stamp: str, terms: List[str], agent_ids: np.ndarray, weights: sparse.csr_matrix, built_at: datetime) -> None:
+        """Пише версію матриці в окрему папку і атомарно перемикає current.json."""
+        version_dir = self.matrix_dir / stamp
+        version_dir.mkdir(parents=True, exist_ok=True)
+
+        np.save(version_dir / "data.npy", weights.data)
+        np.save(version_dir / "indices.npy", weights.indices)
+        np.save(version_dir / "indptr.npy", weights.indptr)
+        np.save(version_dir / "agent_ids.npy", agent_ids)
+        (version_dir / "terms.json").write_text(json.dumps(terms, ensure_ascii=False), encoding="utf-8")
+
+        pointer = self.matrix_dir / self.POINTER_NAME
+        tmp_pointer = pointer.with_suffix(f".{os.getpid()}.tmp")
+        tmp_pointer.write_text(
+            json.dumps({
+                "stamp": stamp,
+                "shape": list(weights.shape),
+                "built_at": built_at.isoformat(),
+            }),
+            encoding="utf-8",
+        )
+        os.replace(tmp_pointer, pointer)
+
+        self._cleanup(keep=stamp)
+
+    def _cleanup(self, keep: str) -> None:
+        """Видаляє старі версії (читачі, що ще тримають mmap, не страждають на POSIX)."""
+        previous = sorted(
+            path for path in self.matrix_dir.iterdir()
+            if path.is_dir() and path.name != keep
+        )
+        stale_count = max(len(previous) - (self.KEEP_VERSIONS - 1), 0)
+        for path in previous[:stale_count]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _get_matrix(self) -> Optional[_ExpertiseMatrix]:
+        """Поточна матриця; перевідкриває файли, якщо current.json змінився."""
+        pointer = self.matrix_dir / self.POINTER_NAME
+        try:
+            mtime = pointer.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        if self._matrix is not None and mtime == self._pointer_mtime:
+            return self._matrix
+
+        with self._lock:
+            try:
+                meta = json.loads(pointer.read_text(encoding="utf-8"))
+                version_dir = self.matrix_dir / meta["stamp"]
+                weights = sparse.csr_matrix(
+                    (
+                        np.load(version_dir / "data.npy", mmap_mode="r"),
+                        np.load(version_dir / "indices.npy", mmap_mode="r"),
+                        np.load(version_dir / "indptr.npy", mmap_mode="r"),
+                    ),
+                    shape=tuple(meta["shape"]),
+                )
+                self._matrix = _ExpertiseMatrix(
+                    stamp=meta["stamp"],
+                    terms=json.loads((version_dir / "terms.json").read_text(encoding="utf-8")),
+                    agent_ids=np.load(version_dir / "agent_ids.npy"),
+                    weights=weights,
+                    built_at=datetime.fromisoformat(meta["built_at"]),
+                )
+                self._pointer_mtime = mtime
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[EXPERTISE] WARNING: Не вдалося відкрити матрицю: {e}")
+
+        return self._matrix
+
+
+expertise_matrix_service = ExpertiseMatrixService()
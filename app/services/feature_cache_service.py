@@ -0,0 +1,121 @@
+"""
+Feature Cache Service - збережена матриця ознак тренувального корпусу.
+
+Повне перенавчання не векторизує всю історію заново:
+1. Векторизований корпус зберігається в artifacts/training_features.npz
+   (CSR масиви + ID ML логів + мітки + fingerprint векторизатора + watermark)
+2. Наступне навчання векторизує тільки логи з новим feedback і дописує їх
+3. Кеш ігнорується цілком, якщо змінилась конфігурація векторизатора
+
+Файл пишеться через tmp + os.replace, тому читач ніколи не бачить частковий запис.
+"""
+import os
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+
+from app.config import settings
+
+
+class FeatureCache:
+    """Завантажений кеш: рядок i матриці відповідає логу log_ids[i] з міткою labels[i]."""
+
+    __slots__ = ("fingerprint", "features", "labels", "log_ids", "watermark")
+
+    def __init__(
+        self,
+        fingerprint: str,
+        features: sparse.csr_matrix,
+        labels: np.ndarray,
+        log_ids: np.ndarray,
+        watermark: datetime,
+    ):
+        self.fingerprint = fingerprint
+        self.features = features
+        self.labels = labels
+        self.log_ids = log_ids
+        self.watermark = watermark
+
+    @property
+    def n_rows(self) -> int:
+        return self.features.shape[0]
+
+
+class FeatureCacheService:
+    """
+    Сервіс для збереження/завантаження матриці ознак тренувального корпусу.
+    """
+
+    CACHE_NAME = "training_features.npz"
+
+    def __init__(self):
+        self.cache_path = settings.ARTIFACTS_DIR / self.CACHE_NAME
+
+    def load(self, fingerprint: Optional[str]) -> Optional[FeatureCache]:
+        """
+        Повертає кеш, якщо він є і побудований тим самим векторизатором.
+        """
+        if fingerprint is None or not self.cache_path.exists():
+            return None
+
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    print("[FEATURE CACHE] Vectorizer changed, cache invalidated")
+                    return None
+
+                features = sparse.csr_matrix(
+                    (data["data"], data["indices"], data["indptr"]),
+                    shape=tuple(data["shape"]),
+                )
+                return FeatureCache(
+                    fingerprint=fingerprint,
+                    features=features,
+                    labels=data["labels"],
+                    log_ids=data["log_ids"],
+                    watermark=datetime.fromisoformat(str(data["watermark"])),
+                )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[FEATURE CACHE] WARNING: Не вдалося прочитати кеш: {e}")
+            return None
+
+    def save(
+        self,
+        fingerprint: Optional[str],
+        features: sparse.csr_matrix,
+        labels: np.ndarray,
+        log_ids: np.ndarray,
+        watermark: datetime,
+    ) -> None:
+        """Атомарно перезаписує кеш."""
+        if fingerprint is None:
+            return
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.stem}.{os.getpid()}.tmp.npz")
+
+        features = features.tocsr()
+        np.savez(
+            tmp_path,
+            data=features.data,
+            indices=features.indices,
+            indptr=features.indptr,
+            shape=np.array(features.shape, dtype=np.int64),
+            labels=labels.astype(str),
+            log_ids=log_ids.astype(np.int64),
+            fingerprint=np.array(fingerprint),
+            watermark=np.array(watermark.isoformat()),
+        )
+        os.replace(tmp_path, self.cache_path)
+
+    def invalidate(self) -> None:
+        """Видаляє кеш (наступне навчання векторизує весь корпус)."""
+        try:
+            self.cache_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+feature_cache_service = FeatureCacheService()
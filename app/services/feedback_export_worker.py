@@ -0,0 +1,141 @@
+"""
+Feedback Export Worker - фоновий експорт training feedback з debounce.
+
+Замість експорту priority_feedback.csv прямо в запиті:
+1. TicketService після коміту викликає notify() - це лише позначка в пам'яті
+2. Один фоновий потік на процес чекає на сигнал, потім ще
+   FEEDBACK_EXPORT_DEBOUNCE_SECONDS збирає наступні сигнали
+3. Після вікна виконується один експорт на всі сигнали вікна - CSV
+   (training_feedback_service) або Parquet партиції
+   (prediction_log_export_service) за TRAINING_EXPORT_FORMAT; метрики
+   показують, скільки сигналів об'єднано
+4. Якщо експорт впав, сигнали вікна повертаються в чергу і експорт
+   повторюється після наступного вікна debounce
+
+Потік, вікно і метрики - окремі в кожному uvicorn процесі: сигнали різних
+процесів не об'єднуються, і кожен процес експортує після своїх комітів.
+Кожен експорт - повний знімок стану БД, тому повторний експорт безпечний:
+CSV серіалізується між процесами flock-ом training_feedback_service,
+Parquet партиції і стан записуються атомарно (tmp файл + rename).
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.prediction_log_export_service import prediction_log_export_service
+from app.services.training_feedback_service import training_feedback_service
+
+
+class FeedbackExportWorker:
+    """
+    Потік, що об'єднує сигнали "feedback змінився" в один експорт за вікно.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signal = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending = 0
+
+        # Метрики
+        self._signals = 0
+        self._exports = 0
+        self._coalesced = 0
+        self._failures = 0
+        self._last_export_at: Optional[datetime] = None
+        self._last_export_ms: Optional[float] = None
+        self._last_batch_signals = 0
+        self._last_error: Optional[str] = None
+
+    def notify(self) -> None:
+        """Сигнал, що feedback змінився (після db.commit()); не блокує запит."""
+        with self._lock:
+            self._pending += 1
+            self._signals += 1
+            self._ensure_started()
+        self._signal.set()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "signals": self._signals,
+                "exports": self._exports,
+                "coalesced_signals": self._coalesced,
+                "pending_signals": self._pending,
+                "failures": self._failures,
+                "last_export_at": self._last_export_at,
+                "last_export_ms": self._last_export_ms,
+                "last_batch_signals": self._last_batch_signals,
+                "last_error": self._last_error,
+                "debounce_seconds": settings.FEEDBACK_EXPORT_DEBOUNCE_SECONDS,
+            }
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Зупиняє потік; сигнали, що ще чекають, експортуються одразу."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        self._signal.set()
+        thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="feedback-export", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._signal.wait()
+            if not self._stopping.is_set():
+                # Debounce: сигнали, що прийдуть за вікно, увійдуть у цей самий експорт
+                self._stopping.wait(settings.FEEDBACK_EXPORT_DEBOUNCE_SECONDS)
+
+            with self._lock:
+                self._signal.clear()
+                batch, self._pending = self._pending, 0
+
+            if batch:
+                self._export(batch)
+
+            if self._stopping.is_set():
+                return
+
+    def _export(self, batch: int) -> None:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            if settings.TRAINING_EXPORT_FORMAT == "parquet":
+                prediction_log_export_service.export(db)
+            else:
+                training_feedback_service.export_priority_feedback_dataset(db)
+        except Exception as exc:
+            with self._lock:
+                self._failures += 1
+                self._last_error = str(exc)
+                # Сигнали не губляться: повтор після наступного вікна debounce
+                self._pending += batch
+            self._signal.set()
+            print(f"[TRAINING_FEEDBACK] Failed to export dataset: {exc}")
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self._exports += 1
+            # Сигнали, для яких окремий експорт не знадобився
+            self._coalesced += max(batch - 1, 0)
+            self._last_export_at = datetime.utcnow()
+            self._last_export_ms = round((time.perf_counter() - started) * 1000, 1)
+            self._last_batch_signals = batch
+            self._last_error = None
+
+
+feedback_export_worker = FeedbackExportWorker()
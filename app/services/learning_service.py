@@ -3,12 +3,19 @@
 Аналізує вирішені тікети та будує профілі експертизи спеціалістів
 """
 from typing import Dict, List, Tuple, Optional
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from collections import defaultdict
+from collections import defaultdict, Counter
+from datetime import datetime, timedelta
 import re
+import threading
 
-from app.models import Ticket, User
+from app.models import Ticket, User, AgentKeywordCount
 from app.core.enums import StatusEnum, CategoryEnum, RoleEnum
+from app.services.workload_service import workload_service
+from app.services.candidate_pool_service import candidate_pool_service, CandidateAgent
+from app.services.expertise_matrix_service import expertise_matrix_service
 
 
 class LearningService:
@@ -18,8 +25,33 @@ class LearningService:
     - Кількості вирішених тікетів
     - Ключових слів з описів тікетів
     - Категорій тікетів
+
+    Профілі зберігаються в agent_keyword_counts і оновлюються інкрементально
+    (on_ticket_changed), тому підбір спеціаліста не перечитує всю історію.
+    Ранжування агентів - BM25 по sparse матриці з expertise_matrix_service.
     """
 
+    # Статуси тікетів, що входять у профіль експертизи
+    EXPERTISE_STATUSES = (StatusEnum.RESOLVED, StatusEnum.CLOSED)
+
+    # Довші токени (хеші, URL без пробілів) у профіль не потрапляють
+    MAX_KEYWORD_LENGTH = 100
+
+    # Шкала score підбору спеціаліста: релевантність експертизи нормалізована
+    # до [0, 1] (найкращий агент запиту = 1), бонус за specialty і штраф за
+    # навантаження - в тих самих одиницях (співвідношення 5 активних тікетів
+    # на один збіг specialty, як і раніше)
+    SPECIALTY_MATCH_BONUS = 0.25  # за кожне ключове слово тікета зі specialty агента
+    ACTIVE_TICKET_PENALTY = 0.05  # за кожен активний тікет агента
+
+    # Скільки живе кеш get_specialist_stats. Локально кеш скидається після
+    # commit змін з on_ticket_changed; TTL обмежує застарілість для інших workers.
+    STATS_CACHE_TTL_SECONDS = 60
+
+    def __init__(self):
+        self._stats_cache: Dict[int, Tuple[datetime, Dict]] = {}
+        self._stats_lock = threading.Lock()
+
     @staticmethod
     def extract_keywords(text: str) -> List[str]:
         """
@@ -54,76 +86,187 @@ class LearningService:
         return keywords
 
     @staticmethod
-    def build_expertise_profiles(db: Session) -> Dict[int, Dict[str, int]]:
+    def is_expertise_ticket(ticket: Ticket) -> bool:
         """
-        Будує профілі експертизи для всіх спеціалістів на основі вирішених тікетів.
+        Чи враховується тікет у профілі експертизи виконавця.
 
-        Returns:
-            Dict[agent_id, Dict[keyword, count]]
-            Приклад:
-            {
-                10: {"vpn": 15, "cisco": 12, "anyconnect": 10, ...},
-                11: {"switch": 20, "vlan": 18, "router": 15, ...},
-            }
-        """
-        # Отримуємо всі вирішені/закриті тікети
-        # Враховуємо тільки ті, що:
-        # 1. Вирішені/закриті
-        # 2. Призначені комусь
-        # 3. Якщо це auto_assigned - то тільки з assignment_confirmed=True (підтверджені спеціалістом)
-        resolved_tickets = db.query(Ticket).filter(
-            Ticket.status.in_([StatusEnum.RESOLVED, StatusEnum.CLOSED]),
-            Ticket.assigned_to_user_id.isnot(None)
-        ).all()
-
-        # Фільтруємо: якщо auto_assigned=True, беремо тільки підтверджені (assignment_confirmed=True)
-        # або ті, що не були auto_assigned (ручне призначення завжди вважається правильним)
-        valid_tickets = []
-        for ticket in resolved_tickets:
-            if ticket.auto_assigned:
-                # Якщо автоматично призначено - беремо тільки підтверджені
-                if ticket.assignment_confirmed is True:
-                    valid_tickets.append(ticket)
-                # Якщо відхилено (False) або не підтверджено (None) - пропускаємо
-            else:
-                # Ручне призначення завжди правильне
-                valid_tickets.append(ticket)
-
-        resolved_tickets = valid_tickets
-
-        # Словник: agent_id -> {keyword: count}
-        expertise: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-
-        for ticket in resolved_tickets:
-            agent_id = ticket.assigned_to_user_id
-            if not agent_id:
-                continue
-
-            # Об'єднуємо назву та опис
-            full_text = f"{ticket.title or ''}\n{ticket.description or ''}"
-            keywords = LearningService.extract_keywords(full_text)
-
-            # Збільшуємо лічильник для кожного ключового слова
-            for kw in keywords:
-                expertise[agent_id][kw] += 1
-
-        return dict(expertise)
+        Враховуємо тільки тікети, що:
+        1. Вирішені/закриті
+        2. Призначені комусь
+        3. Якщо це auto_assigned - то тільки з assignment_confirmed=True (підтверджені спеціалістом);
+           ручне призначення завжди вважається правильним
+        """
+        if ticket.status not in LearningService.EXPERTISE_STATUSES or not ticket.assigned_to_user_id:
+            return False
+        if ticket.auto_assigned:
+            return ticket.assignment_confirmed is True
+        return True
+
+    @staticmethod
+    def ticket_keyword_counts(title: Optional[str], description: Optional[str]) -> Counter:
+        """Ключові слова тікета з кількістю входжень (для agent_keyword_counts)."""
+        full_text = f"{title or ''}\n{description or ''}"
+        return Counter(
+            kw for kw in LearningService.extract_keywords(full_text)
+            if len(kw) <= LearningService.MAX_KEYWORD_LENGTH
+        )
+
+    @staticmethod
+    def on_ticket_changed(
+        db: Session,
+        ticket: Ticket,
+        previous_assignee_id: Optional[int] = None,
+    ) -> None:
+        """
+        Синхронізує agent_keyword_counts зі станом тікета.
+
+        Викликається до db.commit() поруч з workload_service.on_ticket_changed:
+        коли тікет стає RESOLVED/CLOSED (або автопризначення підтверджено) -
+        ключові слова зараховуються виконавцю; при reopen/переназначенні -
+        списуються з попереднього агента.
+
+        Кеш статистики агентів (поточного, попереднього і того, кому
+        зараховано тікет) скидається лише після commit - інакше паралельний
+        запит встиг би закешувати незакомічений стан.
+
+        Args:
+            previous_assignee_id: Виконавець до зміни (зчитаний до будь-якого flush)
+        """
+        target_id = ticket.assigned_to_user_id if LearningService.is_expertise_ticket(ticket) else None
+        credited_id = ticket.expertise_user_id
+
+        pending = db.info.setdefault(_PENDING_STATS_KEY, set())
+        pending.update(
+            agent_id
+            for agent_id in (ticket.assigned_to_user_id, previous_assignee_id, credited_id)
+            if agent_id is not None
+        )
+
+        if target_id == credited_id:
+            return
+
+        counts = LearningService.ticket_keyword_counts(ticket.title, ticket.description)
+
+        if credited_id is not None:
+            # Внесок тікета затухав з моменту вирішення - списуємо саме його
+            credited_at = ticket.resolved_at or ticket.closed_at
+            LearningService._adjust_keyword_counts(db, credited_id, counts, -1, credited_at)
+        if target_id is not None:
+            LearningService._adjust_keyword_counts(db, target_id, counts, 1)
+
+        ticket.expertise_user_id = target_id
+
+    @staticmethod
+    def _adjust_keyword_counts(
+        db: Session,
+        agent_id: int,
+        counts: Counter,
+        sign: int,
+        credited_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Додає (sign=1) або віднімає (sign=-1) лічильники ключових слів агента.
+
+        credited_at - коли внесок було зараховано: decayed_count зменшується
+        на внесок, що затух з того часу, а не на повний count.
+        Новий рядок вставляється в savepoint: якщо паралельна транзакція
+        створила його першою (конфлікт PK), внесок додається до її рядка.
+        """
+        if not counts:
+            return
+
+        rows = {
+            row.keyword: row
+            for row in db.query(AgentKeywordCount).filter(
+                AgentKeywordCount.user_id == agent_id,
+                AgentKeywordCount.keyword.in_(list(counts))
+            )
+        }
+
+        now = datetime.utcnow()
+
+        for keyword, count in counts.items():
+            row = rows.get(keyword)
+            if row is None:
+                if sign > 0:
+                    row = LearningService._insert_keyword_count(db, agent_id, keyword, count, now)
+                if row is None:
+                    continue
+
+            LearningService._apply_keyword_delta(db, row, count, sign, credited_at, now)
+
+    @staticmethod
+    def _insert_keyword_count(
+        db: Session,
+        agent_id: int,
+        keyword: str,
+        count: int,
+        now: datetime,
+    ) -> Optional[AgentKeywordCount]:
+        """
+        Вставляє новий лічильник; повертає рядок конкурента, якщо той вставив першим.
+        """
+        try:
+            # Savepoint: конфлікт не відкочує зміну тікета в зовнішній транзакції
+            with db.begin_nested():
+                db.add(AgentKeywordCount(
+                    user_id=agent_id,
+                    keyword=keyword,
+                    count=count,
+                    decayed_count=float(count),
+                    decayed_at=now,
+                ))
+        except IntegrityError:
+            return db.query(AgentKeywordCount).filter(
+                AgentKeywordCount.user_id == agent_id,
+                AgentKeywordCount.keyword == keyword
+            ).with_for_update().first()
+        return None
+
+    @staticmethod
+    def _apply_keyword_delta(
+        db: Session,
+        row: AgentKeywordCount,
+        count: int,
+        sign: int,
+        credited_at: Optional[datetime],
+        now: datetime,
+    ) -> None:
+        row.count += sign * count
+        if row.count <= 0:
+            db.delete(row)
+            return
+
+        # Затухання накопиченого значення до now, потім додаємо/віднімаємо внесок тікета
+        decayed = expertise_matrix_service.decay(row.decayed_count, row.decayed_at, now)
+        contribution = count if sign > 0 else expertise_matrix_service.decay(count, credited_at, now)
+        row.decayed_count = max(decayed + sign * contribution, 0.0)
+        row.decayed_at = now
 
     @staticmethod
     def match_ticket_to_specialist_by_expertise(
         ticket_text: str,
         category: Optional[CategoryEnum],
         department_id: Optional[int],
-        db: Session
+        db: Session,
+        active_counts: Optional[Dict[int, int]] = None
     ) -> Optional[User]:
         """
         Підбирає спеціаліста на основі збігу ключових слів тікету з профілем експертизи.
 
+        Score агента = релевантність експертизи (0..1, нормалізована по
+        найкращому агенту запиту) + SPECIALTY_MATCH_BONUS за кожне ключове
+        слово зі specialty - ACTIVE_TICKET_PENALTY за кожен активний тікет.
+        Якщо жоден агент не має score > 0 (немає збігів або їх переважує
+        навантаження) - спеціаліста не знайдено.
+
         Args:
             ticket_text: Текст тікету (title + description)
             category: ML-передбачена категорія
             department_id: ID департаменту
             db: Database session
+            active_counts: Активні тікети агентів, вже прочитані викликачем
+                (AgentCategorySnapshot); якщо не передано - з agent_workload
 
         Returns:
             User або None якщо не знайдено відповідного спеціаліста
@@ -133,45 +276,43 @@ class LearningService:
         if not ticket_keywords:
             return None
 
-        # 2. Отримуємо всіх агентів департаменту
-        agents = db.query(User).filter(
-            User.role == RoleEnum.AGENT,
-            User.department_id == department_id,
-            User.is_active == True
-        ).all()
+        # 2. Отримуємо всіх агентів департаменту (кешований пул)
+        agents = candidate_pool_service.get_pool(department_id, db).select(roles=(RoleEnum.AGENT,))
 
         if not agents:
             return None
 
-        # 3. Будуємо профілі експертизи
-        expertise_profiles = LearningService.build_expertise_profiles(db)
+        # 3. BM25 score всіх агентів одним проходом по матриці експертизи
+        ticket_keyword_counts = Counter(ticket_keywords)
+        agent_ids = [agent.id for agent in agents]
+        expertise_scores = expertise_matrix_service.score(ticket_keyword_counts, agent_ids)
+
+        if expertise_scores is None:
+            # Матриця ще не побудована - сума частот з agent_keyword_counts
+            expertise_scores = LearningService._keyword_count_scores(ticket_keyword_counts, agent_ids, db)
+
+        # BM25 і сума частот мають різні шкали - обидві зводимо до [0, 1]
+        expertise_scores = LearningService._normalize_scores(expertise_scores)
 
         # 4. Рахуємо score для кожного спеціаліста
-        agent_scores: List[Tuple[User, float]] = []
+        if active_counts is None:
+            active_counts = workload_service.get_active_counts(agent_ids, db)
+        agent_scores: List[Tuple[CandidateAgent, float]] = []
 
         for agent in agents:
-            agent_expertise = expertise_profiles.get(agent.id, {})
-
-            # Score = сума частот всіх збігаючихся ключових слів
-            score = sum(agent_expertise.get(kw, 0) for kw in ticket_keywords)
+            # Score = релевантність профілю експертизи ключовим словам тікета
+            score = expertise_scores.get(agent.id, 0.0)
 
             # Додаємо бонус за збіг зі спеціалізацією (specialty field)
-            if agent.specialty:
-                specialty_keywords = [
-                    s.strip().lower() for s in agent.specialty.split(',')
-                ]
+            if agent.specialty_tokens:
                 for ticket_kw in ticket_keywords:
-                    if ticket_kw in specialty_keywords:
-                        score += 10  # Бонус за збіг зі спеціалізацією
+                    if ticket_kw in agent.specialty_tokens:
+                        score += LearningService.SPECIALTY_MATCH_BONUS
 
             # Враховуємо поточне навантаження (віднімаємо активні тікети)
-            active_count = db.query(Ticket).filter(
-                Ticket.assigned_to_user_id == agent.id,
-                Ticket.status.in_([StatusEnum.NEW, StatusEnum.TRIAGE, StatusEnum.IN_PROGRESS])
-            ).count()
+            active_count = active_counts.get(agent.id, 0)
 
-            # Фінальний score: expertise_score - active_tickets * 2
-            final_score = score - (active_count * 2)
+            final_score = score - active_count * LearningService.ACTIVE_TICKET_PENALTY
 
             agent_scores.append((agent, final_score))
 
@@ -182,47 +323,144 @@ class LearningService:
 
             # Якщо score позитивний, повертаємо спеціаліста
             if best_score > 0:
-                return best_agent
+                return db.get(User, best_agent.id)
 
         return None
 
     @staticmethod
-    def get_specialist_stats(agent_id: int, db: Session) -> Dict:
+    def _normalize_scores(scores: Dict[int, float]) -> Dict[int, float]:
+        """Ділить scores на найбільший (найкращий агент = 1.0)."""
+        best = max(scores.values(), default=0.0)
+        if best <= 0:
+            return {}
+        return {agent_id: score / best for agent_id, score in scores.items()}
+
+    @staticmethod
+    def explain_expertise_match(
+        ticket_text: str,
+        department_id: Optional[int],
+        db: Session,
+        k: int = 5,
+    ) -> List[Dict]:
+        """
+        Топ-k агентів департаменту за BM25 з внеском кожного ключового слова тікета.
+
+        Returns:
+            List[Dict]: agent_id, full_name, score, contributions {keyword: score};
+            порожній список, поки матриця експертизи не побудована
+        """
+        ticket_keywords = LearningService.extract_keywords(ticket_text)
+        if not ticket_keywords:
+            return []
+
+        agents = candidate_pool_service.get_pool(department_id, db).select(roles=(RoleEnum.AGENT,))
+        names = {agent.id: agent.full_name for agent in agents}
+
+        top = expertise_matrix_service.top_agents(Counter(ticket_keywords), list(names), k=k)
+        for item in top:
+            item["full_name"] = names.get(item["agent_id"])
+        return top
+
+    @staticmethod
+    def _keyword_count_scores(
+        ticket_keyword_counts: Counter,
+        agent_ids: List[int],
+        db: Session,
+    ) -> Dict[int, float]:
+        """Сума частот ключових слів тікета в профілях агентів (читає тільки потрібні рядки)."""
+        expertise_scores: Dict[int, float] = defaultdict(float)
+        rows = db.query(
+            AgentKeywordCount.user_id,
+            AgentKeywordCount.keyword,
+            AgentKeywordCount.count,
+        ).filter(
+            AgentKeywordCount.keyword.in_(list(ticket_keyword_counts)),
+            AgentKeywordCount.user_id.in_(agent_ids)
+        )
+        for agent_id, keyword, count in rows:
+            expertise_scores[agent_id] += count * ticket_keyword_counts[keyword]
+        return expertise_scores
+
+    def get_specialist_stats(self, agent_id: int, db: Session) -> Dict:
         """
         Повертає статистику для спеціаліста:
         - Кількість вирішених тікетів загалом
         - Кількість вирішених тікетів по категоріях
         - Топ-10 ключових слів експертизи
-        """
-        # Вирішені тікети
-        resolved_tickets = db.query(Ticket).filter(
-            Ticket.assigned_to_user_id == agent_id,
-            Ticket.status.in_([StatusEnum.RESOLVED, StatusEnum.CLOSED])
-        ).all()
 
-        total_resolved = len(resolved_tickets)
-
-        # По категоріях
-        by_category = defaultdict(int)
-        for ticket in resolved_tickets:
-            if ticket.category:
-                by_category[ticket.category.value] += 1
-
-        # Топ-10 ключових слів
-        expertise_profiles = LearningService.build_expertise_profiles(db)
-        agent_expertise = expertise_profiles.get(agent_id, {})
+        Результат кешується на STATS_CACHE_TTL_SECONDS.
+        """
+        now = datetime.utcnow()
+        with self._stats_lock:
+            cached = self._stats_cache.get(agent_id)
+        if cached is not None and now - cached[0] < timedelta(seconds=LearningService.STATS_CACHE_TTL_SECONDS):
+            return cached[1]
+
+        # Вирішені тікети по категоріях (один GROUP BY замість завантаження тікетів)
+        category_rows = (
+            db.query(Ticket.category, func.count(Ticket.id))
+            .filter(
+                Ticket.assigned_to_user_id == agent_id,
+                Ticket.status.in_(LearningService.EXPERTISE_STATUSES)
+            )
+            .group_by(Ticket.category)
+            .all()
+        )
+
+        total_resolved = sum(count for _, count in category_rows)
+        by_category = {
+            category.value: count
+            for category, count in category_rows
+            if category
+        }
 
-        top_keywords = sorted(
-            agent_expertise.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
+        # Топ-10 ключових слів (з профілю експертизи)
+        top_keywords = (
+            db.query(AgentKeywordCount.keyword, AgentKeywordCount.count)
+            .filter(AgentKeywordCount.user_id == agent_id)
+            .order_by(AgentKeywordCount.count.desc(), AgentKeywordCount.keyword)
+            .limit(10)
+            .all()
+        )
 
-        return {
+        stats = {
             "total_resolved": total_resolved,
-            "by_category": dict(by_category),
+            "by_category": by_category,
             "top_keywords": [{"keyword": kw, "count": cnt} for kw, cnt in top_keywords]
         }
 
+        with self._stats_lock:
+            self._stats_cache[agent_id] = (now, stats)
+
+        return stats
+
+    def invalidate_specialist_stats(self, *agent_ids: Optional[int]) -> None:
+        """Скидає закешовану статистику агентів (None ігнорується)."""
+        with self._stats_lock:
+            for agent_id in agent_ids:
+                if agent_id is not None:
+                    self._stats_cache.pop(agent_id, None)
+
 
 learning_service = LearningService()
+
+
+# Агенти, чию статистику треба скинути після commit поточної транзакції сесії
+_PENDING_STATS_KEY = "learning_service.pending_stats_invalidation"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_stats(session: Session) -> None:
+    # Події savepoint-ів (begin_nested) не завершують зовнішню транзакцію
+    if session.in_nested_transaction():
+        return
+    agent_ids = session.info.pop(_PENDING_STATS_KEY, None)
+    if agent_ids:
+        learning_service.invalidate_specialist_stats(*agent_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_stats(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_STATS_KEY, None)
@@ -1,12 +1,30 @@
 """
-ML Scheduler - періодично перевіряє чи потрібно перенавчувати ML модель.
+ML Scheduler - фонові задачі ML: перенавчання за лічильником feedback,
+reconcile лічильників, оновлення профілів агентів, GC артефактів.
+
+Scheduler стартує в кожному uvicorn worker-і, але задачі, що пишуть в БД
+чи artifacts/, виконує лише лідер (lease в scheduler_leases з heartbeat).
+Задачі, що оновлюють стан в пам'яті процесу (профілі агентів, модель),
+виконуються в кожному процесі.
 """
+import functools
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 
+from app.config import settings
 from app.database import SessionLocal
 from app.services.active_learning_service import active_learning_service
+from app.services.training_worker_service import training_worker_service
+from app.services.workload_service import workload_service
+from app.services.skill_vector_service import skill_vector_service
+from app.services.expertise_matrix_service import expertise_matrix_service
+from app.services.model_artifact_service import model_artifact_service
+from app.services.retrain_trigger_service import retrain_trigger_service
+from app.services.scheduler_lease_service import scheduler_lease_service
+from app.services.prediction_log_export_service import prediction_log_export_service
+from app.services.training_feedback_service import training_feedback_service
+from app.ml_model import ml_model
 
 
 class MLScheduler:
@@ -14,25 +32,73 @@ class MLScheduler:
     Background scheduler для автоматичного перенавчання ML моделі.
     """
 
+    LEASE_NAME = "ml_scheduler"
+
+    # Як часто процес перевіряє, чи змінилась активна модель
+    MODEL_RELOAD_INTERVAL_SECONDS = 60
+
     def __init__(self):
         self.scheduler = BackgroundScheduler()
         self.is_running = False
+        self.is_leader = False
+
+    def heartbeat(self):
+        """
+        Periodic task (кожен процес): захоплює або продовжує lease лідера.
+        Помилка БД = втрата лідерства, поки lease не вдасться продовжити.
+        """
+        db = SessionLocal()
+        try:
+            is_leader = scheduler_lease_service.try_acquire(db, self.LEASE_NAME)
+        except Exception as e:
+            db.rollback()
+            print(f"[MLScheduler] Error during leader heartbeat: {e}")
+            is_leader = False
+        finally:
+            db.close()
+
+        if is_leader != self.is_leader:
+            state = "acquired" if is_leader else "lost"
+            print(f"[MLScheduler] Leadership {state} by {scheduler_lease_service.process_id()}")
+        self.is_leader = is_leader
+
+    def reload_model(self):
+        """
+        Periodic task (кожен процес): перезавантажує ml_model, якщо інший
+        процес активував нову версію (pointer current_model.json змінився).
+        """
+        try:
+            ml_model.reload_if_changed()
+        except Exception as e:
+            print(f"[MLScheduler] Error during model reload: {e}")
+
+    def _leader_only(self, func):
+        """Обгортка задачі, яку виконує лише процес-лідер."""
+        @functools.wraps(func)
+        def job():
+            if self.is_leader:
+                func()
+        return job
 
     def check_and_retrain(self):
         """
-        Periodic task що перевіряє чи потрібно перенавчувати модель.
-        Запускається автоматично кожні 6 годин.
+        Точна перевірка (COUNT по ml_prediction_logs) чи потрібно перенавчувати
+        модель; запускається вручну (trigger_immediate_check). Саме навчання
+        виконується в окремому процесі (training_worker_service).
         """
-        print(f"[MLScheduler] Running periodic retrain check at {datetime.utcnow()}")
+        print(f"[MLScheduler] Running retrain check at {datetime.utcnow()}")
 
         db = SessionLocal()
         try:
-            job = active_learning_service.auto_retrain_if_needed(db)
+            should_train, new_count, reason = active_learning_service.should_retrain(db)
+            print(f"[MLScheduler] Retrain check: {reason}")
 
-            if job:
-                print(
-                    f"[MLScheduler] Retraining completed! Job ID: {job.id}, Status: {job.status}"
-                )
+            if should_train:
+                job, created = training_worker_service.submit(db, training_type="INCREMENTAL")
+                if created:
+                    print(f"[MLScheduler] Retraining queued! Job ID: {job.id}")
+                else:
+                    print(f"[MLScheduler] Training job {job.id} already {job.status}")
             else:
                 print(f"[MLScheduler] No retraining needed")
 
@@ -41,27 +107,209 @@ class MLScheduler:
         finally:
             db.close()
 
+    def check_feedback_trigger(self):
+        """
+        Periodic task (кожну хвилину): ставить навчання в чергу, коли лічильник
+        нових feedback досяг порогу і минув quiet period (retrain_trigger_service).
+        Читає лише два рядки cache_versions, без COUNT по ml_prediction_logs.
+        """
+        db = SessionLocal()
+        try:
+            due, new_count, reason = retrain_trigger_service.check(
+                db, min_feedback=active_learning_service.MIN_NEW_FEEDBACK_FOR_RETRAIN
+            )
+            if not due:
+                return
+
+            print(f"[MLScheduler] Retrain trigger: {reason}")
+            job, created = training_worker_service.submit(db, training_type="INCREMENTAL")
+            if created:
+                print(f"[MLScheduler] Retraining queued! Job ID: {job.id}")
+            else:
+                print(f"[MLScheduler] Training job {job.id} already {job.status}")
+
+        except Exception as e:
+            print(f"[MLScheduler] Error during retrain trigger check: {e}")
+        finally:
+            db.close()
+
+    def reconcile_workload(self):
+        """
+        Periodic task що виправляє дрейф лічильників agent_workload.
+        """
+        db = SessionLocal()
+        try:
+            workload_service.reconcile(db)
+        except Exception as e:
+            print(f"[MLScheduler] Error during workload reconciliation: {e}")
+        finally:
+            db.close()
+
+    def refresh_skill_vectors(self):
+        """
+        Periodic task (кожен процес): лідер додає нові вирішені тікети до
+        TF-IDF профілів агентів і записує artifacts/; інші процеси лише
+        перечитують записаний лідером файл.
+        """
+        if not self.is_leader:
+            try:
+                skill_vector_service.reload_if_changed()
+            except Exception as e:
+                print(f"[MLScheduler] Error during skill vectors reload: {e}")
+            return
+
+        db = SessionLocal()
+        try:
+            skill_vector_service.refresh(db)
+        except Exception as e:
+            print(f"[MLScheduler] Error during skill vectors refresh: {e}")
+        finally:
+            db.close()
+
+    def rebuild_expertise_matrix(self):
+        """
+        Periodic task що перебудовує BM25 матрицю експертизи агентів.
+        """
+        db = SessionLocal()
+        try:
+            expertise_matrix_service.rebuild(db)
+        except Exception as e:
+            print(f"[MLScheduler] Error during expertise matrix rebuild: {e}")
+        finally:
+            db.close()
+
+    def collect_model_artifacts(self):
+        """
+        Periodic task що видаляє старі версії ML моделі за retention policy.
+        """
+        db = SessionLocal()
+        try:
+            model_artifact_service.garbage_collect(db)
+        except Exception as e:
+            db.rollback()
+            print(f"[MLScheduler] Error during model artifacts GC: {e}")
+        finally:
+            db.close()
+
+    def compact_feedback_dataset(self):
+        """
+        Periodic task що переписує append-only priority_feedback.csv з БД
+        (по одному рядку на feedback).
+        """
+        db = SessionLocal()
+        try:
+            training_feedback_service.compact_priority_feedback_dataset(db)
+        except Exception as e:
+            print(f"[MLScheduler] Error during feedback dataset compaction: {e}")
+        finally:
+            db.close()
+
+    def export_prediction_logs(self):
+        """
+        Periodic task що оновлює Parquet партиції ML логів (змінені місяці).
+        """
+        db = SessionLocal()
+        try:
+            prediction_log_export_service.export(db)
+        except Exception as e:
+            print(f"[MLScheduler] Error during prediction log export: {e}")
+        finally:
+            db.close()
+
     def start(self):
         """
         Запускає scheduler.
-        Перевірка відбувається кожні 6 годин.
+        Лічильник feedback перевіряється щохвилини.
         """
         if self.is_running:
             print("[MLScheduler] Already running")
             return
 
-        # Додаємо periodic task
+        # Лідерство визначаємо до старту, щоб задачі з next_run_time=now не пропустились
+        self.heartbeat()
         self.scheduler.add_job(
-            func=self.check_and_retrain,
-            trigger=IntervalTrigger(hours=6),
-            id="ml_retrain_check",
-            name="Check if ML model needs retraining",
+            func=self.heartbeat,
+            trigger=IntervalTrigger(seconds=scheduler_lease_service.HEARTBEAT_SECONDS),
+            id="scheduler_leader_heartbeat",
+            name="Renew scheduler leader lease",
             replace_existing=True,
         )
 
+        self.scheduler.add_job(
+            func=self.reload_model,
+            trigger=IntervalTrigger(seconds=self.MODEL_RELOAD_INTERVAL_SECONDS),
+            id="ml_model_reload",
+            name="Reload ML model after activation in another process",
+            replace_existing=True,
+        )
+
+        # Перенавчання за лічильником feedback (debounce)
+        self.scheduler.add_job(
+            func=self._leader_only(self.check_feedback_trigger),
+            trigger=IntervalTrigger(seconds=retrain_trigger_service.CHECK_INTERVAL_SECONDS),
+            id="ml_retrain_trigger",
+            name="Queue ML retraining when enough feedback accumulated",
+            replace_existing=True,
+        )
+
+        self.scheduler.add_job(
+            func=self._leader_only(self.reconcile_workload),
+            trigger=IntervalTrigger(minutes=workload_service.RECONCILE_INTERVAL_MINUTES),
+            id="agent_workload_reconcile",
+            name="Reconcile agent workload counters",
+            replace_existing=True,
+        )
+
+        self.scheduler.add_job(
+            func=self.refresh_skill_vectors,
+            trigger=IntervalTrigger(minutes=skill_vector_service.REFRESH_INTERVAL_MINUTES),
+            id="skill_vectors_refresh",
+            name="Refresh (leader) or reload agent TF-IDF skill profiles",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+
+        self.scheduler.add_job(
+            func=self._leader_only(self.rebuild_expertise_matrix),
+            trigger=IntervalTrigger(minutes=expertise_matrix_service.REFRESH_INTERVAL_MINUTES),
+            id="expertise_matrix_rebuild",
+            name="Rebuild agent expertise BM25 matrix",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+
+        self.scheduler.add_job(
+            func=self._leader_only(self.collect_model_artifacts),
+            trigger=IntervalTrigger(hours=model_artifact_service.GC_INTERVAL_HOURS),
+            id="model_artifacts_gc",
+            name="Garbage collect old ML model artifacts",
+            replace_existing=True,
+        )
+
+        if settings.TRAINING_EXPORT_FORMAT == "parquet":
+            self.scheduler.add_job(
+                func=self._leader_only(self.export_prediction_logs),
+                trigger=IntervalTrigger(minutes=prediction_log_export_service.EXPORT_INTERVAL_MINUTES),
+                id="prediction_logs_export",
+                name="Export ML prediction logs to monthly Parquet partitions",
+                replace_existing=True,
+                next_run_time=datetime.now(),
+            )
+        else:
+            self.scheduler.add_job(
+                func=self._leader_only(self.compact_feedback_dataset),
+                trigger=IntervalTrigger(hours=training_feedback_service.COMPACT_INTERVAL_HOURS),
+                id="feedback_dataset_compact",
+                name="Compact append-only priority feedback dataset",
+                replace_existing=True,
+            )
+
         self.scheduler.start()
         self.is_running = True
-        print("[MLScheduler] Started - will check for retraining every 6 hours")
+        print(
+            f"[MLScheduler] Started ({'leader' if self.is_leader else 'follower'}) - "
+            f"retraining is triggered by accumulated feedback"
+        )
 
     def stop(self):
         """
@@ -72,6 +320,17 @@ class MLScheduler:
             self.is_running = False
             print("[MLScheduler] Stopped")
 
+        if self.is_leader:
+            # Звільняємо lease, щоб інший процес не чекав TTL
+            db = SessionLocal()
+            try:
+                scheduler_lease_service.release(db, self.LEASE_NAME)
+            except Exception as e:
+                print(f"[MLScheduler] Error releasing leader lease: {e}")
+            finally:
+                db.close()
+            self.is_leader = False
+
     def trigger_immediate_check(self):
         """
         Запускає перевірку одразу (не чекаючи на scheduled time).
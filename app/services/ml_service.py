@@ -79,11 +79,15 @@ class MLService:
         priority_ml = None
         priority_conf = None
         ml_model_version = None
+        text_vector = None
+        skill_vector = None
 
         full_text = f"{title}\n{description}".strip()
         if full_text and ml_model.model is not None:
             try:
-                ml_label, ml_conf = ml_model.predict_priority(full_text)
+                # Skill matching порівнює тексти без перекладу (як профілі агентів)
+                skill_vector, text_vector = ml_model.transform_with_source(full_text)
+                ml_label, ml_conf = ml_model.predict_priority_vector(text_vector)
                 # ml_label: "high", "medium", "low"
                 priority_ml = MLService._map_priority(ml_label)
                 priority_conf = float(ml_conf)
@@ -180,6 +184,7 @@ class MLService:
             # Other
             "ml_model_version": ml_model_version,
             "llm_result": llm_result,  # Додаткові дані (team, assignee тощо)
+            "skill_vector": skill_vector,  # TF-IDF вектор тексту без перекладу (для smart assignment)
         }
 
     @staticmethod
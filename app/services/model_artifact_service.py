@@ -0,0 +1,171 @@
+"""
+Model Artifact Service - зберігання, активація і прибирання артефактів ML моделі.
+
+1. Кожна версія зберігається в artifacts/model_pri_text_<version>.joblib
+   (стиснений joblib, запис через тимчасовий файл + os.replace)
+2. Активація не копіює файл, а атомарно перемикає artifacts/current_model.json
+   на файл версії; MLClassifier читає модель через цей pointer
+3. Garbage collection лишає активну модель, ML_ARTIFACT_KEEP_LAST останніх і
+   ML_ARTIFACT_KEEP_BEST найкращих за F1; решта версій (файл + metadata),
+   файли без metadata, metadata без файлу і недописані .tmp видаляються
+
+Якщо pointer ще не створено, використовується artifacts/model_pri_text.joblib
+(базова модель з training/train_hf_tickets.py), яку GC ніколи не видаляє.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import joblib
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.ml_model_metadata import MLModelMetadata
+
+
+class ModelArtifactService:
+    """
+    Сервіс для артефактів версій ML моделі пріоритету.
+    """
+
+    POINTER_NAME = "current_model.json"
+    BASE_MODEL_NAME = "model_pri_text.joblib"
+    VERSION_PREFIX = "model_pri_text_"
+    VERSION_SUFFIX = ".joblib"
+
+    # zlib швидко розпаковується; коефіцієнти hashing моделі здебільшого нулі
+    COMPRESS = ("zlib", 3)
+
+    # Як часто scheduler запускає garbage collection
+    GC_INTERVAL_HOURS = 24
+
+    # Файли без metadata (і .tmp), старші за це, лишилися від перерваного навчання
+    ORPHAN_MIN_AGE_HOURS = 1
+
+    def __init__(self):
+        self.artifacts_dir = settings.ARTIFACTS_DIR
+
+    def version_path(self, version: str) -> Path:
+        return self.artifacts_dir / f"{self.VERSION_PREFIX}{version}{self.VERSION_SUFFIX}"
+
+    def save(self, version: str, artifact: Dict) -> Path:
+        """Стиснено зберігає артефакт версії і повертає шлях до файлу."""
+        path = self.version_path(version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        joblib.dump(artifact, tmp_path, compress=self.COMPRESS)
+        os.replace(tmp_path, path)
+        return path
+
+    def activate(self, version: str, path: str) -> None:
+        """Атомарно перемикає pointer на файл версії (без копіювання моделі)."""
+        pointer = self.artifacts_dir / self.POINTER_NAME
+        tmp_pointer = pointer.with_suffix(f".{os.getpid()}.tmp")
+        tmp_pointer.write_text(
+            json.dumps({
+                "version": version,
+                "file": Path(path).name,
+                "activated_at": datetime.utcnow().isoformat(),
+            }),
+            encoding="utf-8",
+        )
+        os.replace(tmp_pointer, pointer)
+
+    def current_version(self) -> Optional[str]:
+        pointer = self._read_pointer()
+        return pointer["version"] if pointer else None
+
+    def current_path(self) -> Path:
+        """Файл активної моделі: за pointer-ом, інакше базова модель."""
+        pointer = self._read_pointer()
+        if pointer:
+            path = self.artifacts_dir / pointer["file"]
+            if path.exists():
+                return path
+            print(f"[ARTIFACTS] WARNING: {path} з pointer-а не існує, використовується базова модель")
+        return self.artifacts_dir / self.BASE_MODEL_NAME
+
+    def garbage_collect(self, db: Session) -> Dict[str, int]:
+        """
+        Видаляє версії поза retention policy, осиротілі файли і metadata.
+
+        Returns:
+            Dict: кількість видалених версій, файлів, записів і звільнені байти
+        """
+        stats = {"versions": 0, "orphan_files": 0, "orphan_rows": 0, "bytes_freed": 0}
+
+        pointer_file = (self._read_pointer() or {}).get("file")
+        models = []
+        for model in db.query(MLModelMetadata).order_by(MLModelMetadata.created_at.desc()):
+            path = Path(model.model_file_path) if model.model_file_path else None
+            if path is not None and path.exists():
+                models.append(model)
+            elif not model.is_active:
+                # Активний запис лишаємо навіть без файлу - це видно в API
+                stats["orphan_rows"] += 1
+                db.delete(model)
+
+        keep = self._retained_ids(models)
+        known_files = set()
+        for model in models:
+            path = Path(model.model_file_path)
+            if model.id in keep or path.name == pointer_file:
+                known_files.add(path.name)
+                continue
+            stats["versions"] += 1
+            stats["bytes_freed"] += self._remove(path)
+            db.delete(model)
+
+        db.commit()
+
+        for path in self.artifacts_dir.glob(f"{self.VERSION_PREFIX}*"):
+            if path.name in known_files or path.name == self.BASE_MODEL_NAME or path.name == pointer_file:
+                continue
+            if path.suffix != ".tmp" and not path.name.endswith(self.VERSION_SUFFIX):
+                continue
+            if time.time() - path.stat().st_mtime < self.ORPHAN_MIN_AGE_HOURS * 3600:
+                continue  # можливо, training job ще не записав metadata
+            stats["orphan_files"] += 1
+            stats["bytes_freed"] += self._remove(path)
+
+        print(
+            f"[ARTIFACTS] GC: removed {stats['versions']} versions, {stats['orphan_files']} orphan files, "
+            f"{stats['orphan_rows']} orphan rows, freed {stats['bytes_freed'] / 1e6:.1f}MB"
+        )
+        return stats
+
+    @staticmethod
+    def _retained_ids(models) -> set:
+        """Активна модель + KEEP_LAST останніх + KEEP_BEST найкращих за F1."""
+        keep = {model.id for model in models if model.is_active}
+        keep.update(model.id for model in models[:settings.ML_ARTIFACT_KEEP_LAST])
+
+        scored = [model for model in models if model.f1_score is not None]
+        scored.sort(key=lambda model: model.f1_score, reverse=True)
+        keep.update(model.id for model in scored[:settings.ML_ARTIFACT_KEEP_BEST])
+        return keep
+
+    def _read_pointer(self) -> Optional[Dict]:
+        pointer = self.artifacts_dir / self.POINTER_NAME
+        try:
+            return json.loads(pointer.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[ARTIFACTS] WARNING: Не вдалося прочитати {pointer}: {e}")
+            return None
+
+    @staticmethod
+    def _remove(path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            return size
+        except FileNotFoundError:
+            return 0
+
+
+model_artifact_service = ModelArtifactService()
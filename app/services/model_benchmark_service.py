@@ -0,0 +1,190 @@
+"""
+Model Benchmark Service - вимірювання швидкодії версій ML моделі.
+
+Для кожної версії на фіксованому benchmark корпусі вимірюються:
+1. Латентність одного прогнозу (p50/p99, vectorize + predict_proba)
+2. Throughput для кількох розмірів батчу
+3. Час завантаження артефакту, розмір файлу, приріст resident memory
+
+Корпус один раз формується з ML логів і зберігається в
+artifacts/benchmark_corpus.json, тому результати різних версій порівнювані.
+Переклад у benchmark не входить (це мережевий виклик, однаковий для всіх версій).
+"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import joblib
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.ml_log import MLPredictionLog
+from app.models.ml_model_metadata import MLModelMetadata
+
+
+class LatencyBudgetExceeded(Exception):
+    """Модель повільніша за ML_LATENCY_BUDGET_P99_MS і не може бути активована."""
+
+
+class ModelBenchmarkService:
+    """
+    Сервіс для benchmark-у версій ML моделі.
+    """
+
+    CORPUS_NAME = "benchmark_corpus.json"
+    CORPUS_SIZE = 500
+
+    # Скільки текстів корпусу використовується для вимірювання латентності
+    LATENCY_SAMPLES = 200
+    WARMUP_SAMPLES = 10
+
+    BATCH_SIZES = (1, 32, 256)
+
+    # Запасний корпус, якщо ML логів ще немає
+    FALLBACK_TEXTS = (
+        "VPN connection drops every few minutes for the whole office",
+        "Cannot open the CRM reports, database error on load",
+        "Printer on the second floor is jammed",
+        "Email is not syncing on the work laptop",
+        "Request access to the shared finance folder",
+        "Wi-Fi in the conference room is very slow",
+        "Server is down, production site unavailable",
+        "Need a new keyboard and mouse",
+    )
+
+    def __init__(self):
+        self.corpus_path = settings.ARTIFACTS_DIR / self.CORPUS_NAME
+
+    def benchmark_version(self, db: Session, version: str) -> MLModelMetadata:
+        """
+        Запускає benchmark для версії моделі і зберігає результати в metadata.
+
+        Raises:
+            ValueError: якщо версії або файлу моделі немає
+        """
+        model_meta = db.query(MLModelMetadata).filter(MLModelMetadata.version == version).first()
+        if not model_meta:
+            raise ValueError(f"Model version {version} not found")
+        if not model_meta.model_file_path or not os.path.exists(model_meta.model_file_path):
+            raise ValueError(f"Model file for version {version} not found")
+
+        results = self.run(model_meta.model_file_path, self.get_corpus(db))
+
+        model_meta.benchmark_p50_ms = results["p50_ms"]
+        model_meta.benchmark_p99_ms = results["p99_ms"]
+        model_meta.benchmark_throughput = results["throughput"]
+        model_meta.benchmark_load_ms = results["load_ms"]
+        model_meta.benchmark_artifact_bytes = results["artifact_bytes"]
+        model_meta.benchmark_rss_mb = results["rss_mb"]
+        model_meta.benchmarked_at = datetime.utcnow()
+        db.commit()
+
+        print(
+            f"[BENCHMARK] {version}: p50={results['p50_ms']:.2f}ms p99={results['p99_ms']:.2f}ms "
+            f"load={results['load_ms']:.0f}ms size={results['artifact_bytes'] / 1e6:.1f}MB "
+            f"rss=+{results['rss_mb']:.1f}MB"
+        )
+        return model_meta
+
+    def run(self, model_path: str, corpus: List[str]) -> Dict:
+        """Вимірює швидкодію артефакту на корпусі (без запису в БД)."""
+        rss_before = self._rss_bytes()
+        started = time.perf_counter()
+        artifact = joblib.load(model_path)
+        load_ms = (time.perf_counter() - started) * 1000
+        rss_mb = max(self._rss_bytes() - rss_before, 0) / (1024 * 1024)
+
+        if isinstance(artifact, dict):
+            vectorizer, classifier = artifact["vectorizer"], artifact["model"]
+        else:
+            vectorizer, classifier = artifact[:-1], artifact[-1]
+
+        def predict(texts: List[str]):
+            return classifier.predict_proba(vectorizer.transform(texts))
+
+        for text in corpus[:self.WARMUP_SAMPLES]:
+            predict([text])
+
+        latencies = []
+        for text in corpus[:self.LATENCY_SAMPLES]:
+            started = time.perf_counter()
+            predict([text])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        throughput = {}
+        for batch_size in self.BATCH_SIZES:
+            started = time.perf_counter()
+            for start in range(0, len(corpus), batch_size):
+                predict(corpus[start:start + batch_size])
+            elapsed = time.perf_counter() - started
+            throughput[str(batch_size)] = round(len(corpus) / elapsed, 1) if elapsed > 0 else None
+
+        return {
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "throughput": throughput,
+            "load_ms": round(load_ms, 1),
+            "artifact_bytes": os.path.getsize(model_path),
+            "rss_mb": round(rss_mb, 2),
+        }
+
+    def check_latency_budget(self, model_meta: MLModelMetadata) -> None:
+        """
+        Raises:
+            LatencyBudgetExceeded: якщо p99 моделі перевищує ML_LATENCY_BUDGET_P99_MS
+        """
+        budget = settings.ML_LATENCY_BUDGET_P99_MS
+        if not budget or model_meta.benchmark_p99_ms is None:
+            return
+        if model_meta.benchmark_p99_ms > budget:
+            raise LatencyBudgetExceeded(
+                f"Model {model_meta.version} p99 latency {model_meta.benchmark_p99_ms:.2f}ms "
+                f"exceeds budget {budget:.2f}ms"
+            )
+
+    def get_corpus(self, db: Session) -> List[str]:
+        """
+        Фіксований benchmark корпус; при першому виклику формується з ML логів
+        (перші CORPUS_SIZE непорожніх input_text) і зберігається на диск.
+        """
+        if self.corpus_path.exists():
+            return json.loads(self.corpus_path.read_text(encoding="utf-8"))
+
+        texts = [
+            text.strip()
+            for (text,) in db.query(MLPredictionLog.input_text)
+            .filter(MLPredictionLog.input_text.isnot(None), MLPredictionLog.input_text != "")
+            .order_by(MLPredictionLog.id)
+            .limit(self.CORPUS_SIZE)
+        ]
+        if not texts:
+            texts = list(self.FALLBACK_TEXTS)
+
+        # Доповнюємо до CORPUS_SIZE, щоб throughput міряв однакову кількість прогнозів
+        corpus = [texts[i % len(texts)] for i in range(self.CORPUS_SIZE)]
+
+        self.corpus_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.corpus_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(corpus, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.corpus_path)
+
+        return corpus
+
+    @staticmethod
+    def _rss_bytes() -> int:
+        """Поточна resident memory процесу (Linux /proc, інакше пікова з getrusage)."""
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError, AttributeError):
+            try:
+                import resource
+            except ImportError:  # Windows
+                return 0
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+model_benchmark_service = ModelBenchmarkService()
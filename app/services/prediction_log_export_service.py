@@ -0,0 +1,265 @@
+"""
+Prediction Log Export Service - колонковий експорт ML логів по місяцях.
+
+ML/LLM/ensemble прогнози і фінальні мітки з ml_prediction_logs пишуться в
+Parquet (pyarrow), розбитий на партиції за місяцем створення лога:
+training/data/prediction_logs/month=YYYY-MM/part-0.parquet
+
+1. Експорт інкрементальний: переписуються лише місяці, в яких з минулого
+   експорту з'явились нові логи або змінився feedback (watermark у
+   _export_state.json, з перекриттям EXPORT_OVERLAP_SECONDS)
+2. Партиція пишеться у тимчасовий файл і атомарно підміняється
+3. Enum колонки зберігаються як dictionary-encoded рядки
+4. iter_feedback_batches читає партиції батчами з фільтрами (predicate
+   pushdown) - так ActiveLearningService навчається без запитів до OLTP БД
+
+pyarrow імпортується лише при використанні експорту.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.ml_log import MLPredictionLog
+
+
+# (колонка в Parquet, колонка ml_prediction_logs, тип: int/float/str/enum/datetime)
+EXPORT_COLUMNS = (
+    ("log_id", MLPredictionLog.id, "int"),
+    ("ticket_id", MLPredictionLog.ticket_id, "int"),
+    ("created_at", MLPredictionLog.created_at, "datetime"),
+    ("model_version", MLPredictionLog.model_version, "enum"),
+    ("input_text", MLPredictionLog.input_text, "str"),
+    ("priority_ml", MLPredictionLog.priority_predicted, "enum"),
+    ("priority_ml_confidence", MLPredictionLog.priority_confidence, "float"),
+    ("priority_llm", MLPredictionLog.priority_llm_predicted, "enum"),
+    ("priority_llm_confidence", MLPredictionLog.priority_llm_confidence, "float"),
+    ("priority_ensemble", MLPredictionLog.ensemble_priority, "enum"),
+    ("priority_ensemble_confidence", MLPredictionLog.ensemble_confidence, "float"),
+    ("ensemble_strategy", MLPredictionLog.ensemble_strategy, "enum"),
+    ("category_ml", MLPredictionLog.category_predicted, "enum"),
+    ("category_ml_confidence", MLPredictionLog.category_confidence, "float"),
+    ("priority_final", MLPredictionLog.priority_final, "enum"),
+    ("category_final", MLPredictionLog.category_final, "enum"),
+    ("priority_feedback_previous", MLPredictionLog.priority_feedback_previous, "enum"),
+    ("priority_feedback_recorded_at", MLPredictionLog.priority_feedback_recorded_at, "datetime"),
+    ("triage_reason", MLPredictionLog.triage_reason, "enum"),
+    ("prediction_time_ms", MLPredictionLog.prediction_time_ms, "float"),
+)
+
+
+class PredictionLogExportService:
+    """
+    Сервіс для колонкового (Parquet) експорту ML логів, партиціонованого по місяцях.
+    """
+
+    DIR_NAME = "prediction_logs"
+    STATE_NAME = "_export_state.json"
+    PART_NAME = "part-0.parquet"
+
+    # Лог, закомічений до стількох секунд після watermark, ще потрапить в експорт
+    EXPORT_OVERLAP_SECONDS = 300
+
+    # Як часто scheduler оновлює партиції
+    EXPORT_INTERVAL_MINUTES = 60
+
+    BATCH_SIZE = 5000
+
+    def __init__(self):
+        self.export_dir = settings.TRAINING_DATA_DIR / self.DIR_NAME
+        self._lock = threading.Lock()
+
+    def export(self, db: Session, full: bool = False) -> Dict[str, int]:
+        """
+        Оновлює партиції, що змінились з минулого експорту (full=True - всі).
+
+        Returns:
+            Dict[month, кількість рядків] для переписаних партицій
+        """
+        with self._lock:
+            state = None if full else self._load_state()
+            started_at = datetime.utcnow()
+
+            if state is None or state.get("watermark") is None:
+                months = self._all_months(db)
+            else:
+                months = self._changed_months(db, datetime.fromisoformat(state["watermark"]))
+
+            written = {month: self._write_month(db, month) for month in sorted(months)}
+
+            partitions = dict((state or {}).get("partitions", {}))
+            partitions.update(written)
+            self._save_state({
+                # Наступний експорт перевіряє зміни з перекриттям (пізні коміти)
+                "watermark": (started_at - timedelta(seconds=self.EXPORT_OVERLAP_SECONDS)).isoformat(),
+                "exported_at": started_at.isoformat(),
+                "partitions": {month: rows for month, rows in partitions.items() if rows},
+            })
+
+        if written:
+            print(f"[LOG_EXPORT] Rewrote {len(written)} month partitions: {sorted(written)}")
+        return written
+
+    def iter_feedback_batches(
+        self,
+        since_date: Optional[datetime] = None,
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterator[Tuple[List[int], List[str], List[str]]]:
+        """
+        Потоково читає з партицій логи з feedback (непорожній текст і priority_final).
+
+        Yields:
+            (log_ids, texts, priorities) - priorities як значення PriorityEnum ("P1"...)
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if not self.export_dir.exists():
+            return
+
+        dataset = ds.dataset(
+            self.export_dir,
+            format="parquet",
+            partitioning="hive",
+            exclude_invalid_files=True,
+        )
+        condition = (
+            ds.field("priority_final").is_valid()
+            & ds.field("input_text").is_valid()
+            & (ds.field("input_text") != "")
+        )
+        if since_date is not None:
+            condition = condition & (
+                ds.field("priority_feedback_recorded_at") > pa.scalar(since_date, type=pa.timestamp("us"))
+            )
+
+        for batch in dataset.to_batches(
+            columns=["log_id", "input_text", "priority_final"],
+            filter=condition,
+            batch_size=batch_size,
+        ):
+            if batch.num_rows == 0:
+                continue
+            columns = batch.to_pydict()
+            yield (
+                columns["log_id"],
+                [text.strip() for text in columns["input_text"]],
+                columns["priority_final"],
+            )
+
+    def _write_month(self, db: Session, month: str) -> int:
+        """Переписує партицію місяця; повертає кількість рядків (0 - партицію видалено)."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        start = datetime.strptime(month, "%Y-%m")
+        end = (start + timedelta(days=32)).replace(day=1)
+
+        stmt = (
+            select(*[column for _, column, _ in EXPORT_COLUMNS])
+            .where(MLPredictionLog.created_at >= start, MLPredictionLog.created_at < end)
+            .order_by(MLPredictionLog.id)
+            .execution_options(yield_per=self.BATCH_SIZE)
+        )
+
+        partition_dir = self.export_dir / f"month={month}"
+        tmp_path = partition_dir / f".{self.PART_NAME}.{os.getpid()}.tmp"
+        schema = self._schema()
+
+        rows = 0
+        writer = None
+        try:
+            for partition in db.execute(stmt).partitions():
+                if writer is None:
+                    partition_dir.mkdir(parents=True, exist_ok=True)
+                    writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                values = list(zip(*partition))
+                arrays = [
+                    self._to_array(pa, kind, values[idx], schema.field(idx).type)
+                    for idx, (_, _, kind) in enumerate(EXPORT_COLUMNS)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                rows += len(partition)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if rows:
+            os.replace(tmp_path, partition_dir / self.PART_NAME)
+        elif partition_dir.exists():
+            shutil.rmtree(partition_dir, ignore_errors=True)
+        return rows
+
+    @staticmethod
+    def _schema():
+        import pyarrow as pa
+
+        types = {
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "str": pa.string(),
+            "enum": pa.dictionary(pa.int32(), pa.string()),
+            "datetime": pa.timestamp("us"),
+        }
+        return pa.schema([(name, types[kind]) for name, _, kind in EXPORT_COLUMNS])
+
+    @staticmethod
+    def _to_array(pa, kind: str, values, arrow_type):
+        if kind == "enum":
+            strings = [value.value if isinstance(value, Enum) else value for value in values]
+            return pa.array(strings, type=pa.string()).dictionary_encode().cast(arrow_type)
+        return pa.array(values, type=arrow_type)
+
+    @staticmethod
+    def _all_months(db: Session) -> Set[str]:
+        first, last = db.query(
+            func.min(MLPredictionLog.created_at), func.max(MLPredictionLog.created_at)
+        ).one()
+        if first is None:
+            return set()
+
+        months = set()
+        current = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while current <= last:
+            months.add(current.strftime("%Y-%m"))
+            current = (current + timedelta(days=32)).replace(day=1)
+        return months
+
+    @staticmethod
+    def _changed_months(db: Session, watermark: datetime) -> Set[str]:
+        """Місяці логів, створених або з feedback після watermark."""
+        changed = (
+            select(MLPredictionLog.created_at)
+            .where(or_(
+                MLPredictionLog.created_at >= watermark,
+                MLPredictionLog.priority_feedback_recorded_at >= watermark,
+            ))
+            .execution_options(yield_per=PredictionLogExportService.BATCH_SIZE)
+        )
+        return {created_at.strftime("%Y-%m") for (created_at,) in db.execute(changed)}
+
+    def _load_state(self) -> Optional[Dict]:
+        try:
+            return json.loads((self.export_dir / self.STATE_NAME).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[LOG_EXPORT] WARNING: Не вдалося прочитати стан експорту: {e}")
+            return None
+
+    def _save_state(self, state: Dict) -> None:
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        path = self.export_dir / self.STATE_NAME
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+prediction_log_export_service = PredictionLogExportService()
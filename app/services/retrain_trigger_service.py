@@ -0,0 +1,137 @@
+"""
+Retrain Trigger Service - перенавчання ML моделі за подіями feedback.
+
+Замість періодичних COUNT по ml_prediction_logs:
+1. Запис feedback (TicketService) збільшує лічильник ml_feedback в
+   cache_versions в тій самій транзакції; updated_at - час останнього feedback
+2. ml_feedback_trained зберігає значення лічильника на момент останнього
+   запуску навчання, тому нових feedback = різниця двох рядків (запит по PK)
+3. Scheduler щохвилини перевіряє лічильник і ставить навчання в чергу, коли
+   нових feedback достатньо і настав quiet period після останнього (debounce);
+   якщо задано off-peak вікно - тільки в ньому
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.cache_version import CacheVersion
+
+
+class RetrainTriggerService:
+    """
+    Сервіс для лічильника feedback і debounce перенавчання.
+    """
+
+    FEEDBACK_KEY = "ml_feedback"
+    TRAINED_KEY = "ml_feedback_trained"
+
+    # Як часто scheduler перевіряє лічильник
+    CHECK_INTERVAL_SECONDS = 60
+
+    @staticmethod
+    def record_feedback(db: Session, count: int = 1) -> None:
+        """Збільшує лічильник feedback; викликається writer-ом до db.commit()."""
+        updated = (
+            db.query(CacheVersion)
+            .filter(CacheVersion.name == RetrainTriggerService.FEEDBACK_KEY)
+            .update(
+                {
+                    CacheVersion.version: CacheVersion.version + count,
+                    CacheVersion.updated_at: datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+
+        if not updated:
+            db.add(CacheVersion(name=RetrainTriggerService.FEEDBACK_KEY, version=count))
+
+    @staticmethod
+    def get_counters(db: Session) -> Tuple[int, int, Optional[datetime], Optional[datetime]]:
+        """
+        Returns:
+            (feedback_total, trained_total, last_feedback_at, last_triggered_at)
+        """
+        rows = {
+            name: (version, updated_at)
+            for name, version, updated_at in db.query(
+                CacheVersion.name, CacheVersion.version, CacheVersion.updated_at
+            ).filter(
+                CacheVersion.name.in_((RetrainTriggerService.FEEDBACK_KEY, RetrainTriggerService.TRAINED_KEY))
+            )
+        }
+        feedback_total, last_feedback_at = rows.get(RetrainTriggerService.FEEDBACK_KEY, (0, None))
+        trained_total, last_triggered_at = rows.get(RetrainTriggerService.TRAINED_KEY, (0, None))
+        return feedback_total, trained_total, last_feedback_at, last_triggered_at
+
+    def check(self, db: Session, min_feedback: int, now: Optional[datetime] = None) -> Tuple[bool, int, str]:
+        """
+        Чи час ставити навчання в чергу.
+
+        Returns:
+            (due: bool, new_feedback_count: int, reason: str)
+        """
+        now = now or datetime.utcnow()
+        feedback_total, trained_total, last_feedback_at, last_triggered_at = self.get_counters(db)
+        pending = max(feedback_total - trained_total, 0)
+
+        if pending < min_feedback:
+            return False, pending, f"Not enough new feedback ({pending}/{min_feedback})"
+
+        quiet = timedelta(minutes=settings.ML_RETRAIN_QUIET_MINUTES)
+        max_wait = timedelta(hours=settings.ML_RETRAIN_MAX_WAIT_HOURS)
+        waited_enough = last_triggered_at is not None and now - last_triggered_at >= max_wait
+        if last_feedback_at and now - last_feedback_at < quiet and not waited_enough:
+            return False, pending, f"{pending} new feedback, waiting for quiet period"
+
+        if not self.in_offpeak_window(datetime.now()):
+            return False, pending, f"{pending} new feedback, waiting for off-peak window"
+
+        return True, pending, f"Accumulated {pending} new feedback records"
+
+    @staticmethod
+    def mark_triggered(db: Session) -> None:
+        """
+        Скидає лічильник нових feedback (ml_feedback_trained = ml_feedback);
+        викликається при постановці навчання в чергу, до db.commit().
+        """
+        feedback_total = (
+            select(func.coalesce(func.max(CacheVersion.version), 0))
+            .where(CacheVersion.name == RetrainTriggerService.FEEDBACK_KEY)
+            .scalar_subquery()
+        )
+        updated = (
+            db.query(CacheVersion)
+            .filter(CacheVersion.name == RetrainTriggerService.TRAINED_KEY)
+            .update(
+                {
+                    CacheVersion.version: feedback_total,
+                    CacheVersion.updated_at: datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+
+        if not updated:
+            db.add(CacheVersion(
+                name=RetrainTriggerService.TRAINED_KEY,
+                version=db.execute(select(feedback_total)).scalar(),
+            ))
+
+    @staticmethod
+    def in_offpeak_window(local_now: datetime) -> bool:
+        """Чи зараз off-peak (локальний час сервера); без налаштувань - завжди."""
+        start = settings.ML_RETRAIN_OFFPEAK_START_HOUR
+        end = settings.ML_RETRAIN_OFFPEAK_END_HOUR
+        if start is None or end is None or start == end:
+            return True
+        if start < end:
+            return start <= local_now.hour < end
+        # Вікно через північ, наприклад 22 -> 6
+        return local_now.hour >= start or local_now.hour < end
+
+
+retrain_trigger_service = RetrainTriggerService()
@@ -0,0 +1,116 @@
+"""
+Scheduler Lease Service - вибір лідера між процесами через lease в БД.
+
+Кожен uvicorn worker запускає MLScheduler, але scheduled задачі, що пишуть в
+БД чи artifacts/, має виконувати лише один процес:
+1. Процес захоплює lease умовним UPDATE (власник - він сам, або lease спливла);
+   якщо рядка ще немає - INSERT, конфлікт PK означає, що інший процес встиг першим
+2. Лідер продовжує lease кожні HEARTBEAT_SECONDS (heartbeat)
+3. Якщо лідер впав, lease спливає через TTL_SECONDS і її перехоплює інший процес
+
+Працює однаково на SQLite і PostgreSQL (без advisory locks).
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.scheduler_lease import SchedulerLease
+
+
+class SchedulerLeaseService:
+    """
+    Сервіс для lease лідера фонових задач.
+    """
+
+    TTL_SECONDS = 60
+    HEARTBEAT_SECONDS = 15
+
+    def __init__(self):
+        self._process_id: Optional[str] = None
+        self._process_pid: Optional[int] = None
+
+    def process_id(self) -> str:
+        """
+        Ідентифікатор поточного процесу (host:pid:token).
+        Токен відрізняє процеси з тим самим pid після перезапуску контейнера.
+        """
+        pid = os.getpid()
+        if self._process_pid != pid:
+            # Після fork (uvicorn --workers) у дочірнього процесу новий id
+            self._process_id = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+            self._process_pid = pid
+        return self._process_id
+
+    def try_acquire(self, db: Session, name: str) -> bool:
+        """
+        Захоплює або продовжує lease.
+
+        Returns:
+            True, якщо поточний процес - лідер до now + TTL_SECONDS
+        """
+        now = datetime.utcnow()
+        holder = self.process_id()
+        expires_at = now + timedelta(seconds=self.TTL_SECONDS)
+
+        updated = (
+            db.query(SchedulerLease)
+            .filter(
+                SchedulerLease.name == name,
+                or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now),
+            )
+            .update(
+                {
+                    SchedulerLease.acquired_at: case(
+                        (SchedulerLease.holder == holder, SchedulerLease.acquired_at),
+                        else_=now,
+                    ),
+                    SchedulerLease.holder: holder,
+                    SchedulerLease.renewed_at: now,
+                    SchedulerLease.expires_at: expires_at,
+                },
+                synchronize_session=False,
+            )
+        )
+        if updated:
+            db.commit()
+            return True
+
+        if db.query(SchedulerLease.name).filter(SchedulerLease.name == name).first():
+            db.commit()
+            return False
+
+        try:
+            db.add(SchedulerLease(
+                name=name,
+                holder=holder,
+                acquired_at=now,
+                renewed_at=now,
+                expires_at=expires_at,
+            ))
+            db.commit()
+            return True
+        except IntegrityError:
+            # Інший процес створив lease одночасно з нами
+            db.rollback()
+            return False
+
+    def release(self, db: Session, name: str) -> None:
+        """Звільняє lease (при shutdown), щоб інший процес перехопив її одразу."""
+        db.query(SchedulerLease).filter(
+            SchedulerLease.name == name,
+            SchedulerLease.holder == self.process_id(),
+        ).update({SchedulerLease.expires_at: datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def get_lease(db: Session, name: str) -> Optional[SchedulerLease]:
+        return db.get(SchedulerLease, name)
+
+
+scheduler_lease_service = SchedulerLeaseService()
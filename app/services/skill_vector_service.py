@@ -0,0 +1,419 @@
+"""
+Skill Vector Service - TF-IDF профілі агентів для similarity-based skill matching.
+
+Профіль агента = TF-IDF вектор specialty + сума TF-IDF векторів його
+вирішених (RESOLVED/CLOSED) тікетів. Профілі зберігаються як sparse матриця
+агенти x терміни в artifacts/agent_skill_vectors.joblib:
+1. Векторизатор той самий, що у моделі пріоритету (ml_model.vectorize_texts);
+   тікети, specialty та історія векторизуються без перекладу, тому cosine
+   порівнює тексти з однаковою обробкою
+2. Scheduler лідера періодично додає тікети, вирішені після watermark
+   (інкрементально), і записує artifact; повна перебудова - тільки якщо
+   змінився словник моделі (fingerprint). Інші процеси перечитують artifact
+   після зміни файлу (reload_if_changed)
+3. Skill match для тікета - один sparse matrix-vector product (cosine) по всіх кандидатах
+
+Поки профілі не побудовані (немає моделі або словник змінився), а також
+коли тікет не має спільних термінів з жодним профілем, match_scores
+повертає None і SmartAssignmentService використовує keyword matching
+зі specialty_index_service.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.ml_model import ml_model
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.core.enums import StatusEnum, RoleEnum
+
+
+class _SkillMatrix:
+    """
+    Незмінний знімок профілів. Будь-яка зміна створює новий об'єкт,
+    тому читачі ніколи не бачать частково оновленого стану.
+    """
+
+    __slots__ = (
+        "fingerprint", "agent_ids", "row_by_agent", "specialties",
+        "specialty", "history", "profiles", "watermark",
+    )
+
+    def __init__(
+        self,
+        fingerprint: str,
+        agent_ids: Sequence[int],
+        specialties: Dict[int, Optional[str]],
+        specialty: sparse.csr_matrix,
+        history: sparse.csr_matrix,
+        watermark: Optional[datetime],
+    ):
+        self.fingerprint = fingerprint
+        self.agent_ids = tuple(agent_ids)
+        self.row_by_agent = {agent_id: row for row, agent_id in enumerate(self.agent_ids)}
+        self.specialties = specialties
+        self.specialty = specialty
+        self.history = history
+        self.watermark = watermark
+
+        # Specialty і історія мають однакову вагу незалежно від кількості тікетів
+        self.profiles = normalize(
+            SkillVectorService.SPECIALTY_WEIGHT * normalize(specialty)
+            + SkillVectorService.HISTORY_WEIGHT * normalize(history)
+        ).tocsr()
+
+
+class SkillVectorService:
+    """
+    Сервіс для TF-IDF skill matching агентів.
+    """
+
+    ARTIFACT_NAME = "agent_skill_vectors.joblib"
+
+    SPECIALTY_WEIGHT = 0.5
+    HISTORY_WEIGHT = 0.5
+
+    # Як часто scheduler додає нові вирішені тікети до профілів
+    REFRESH_INTERVAL_MINUTES = 10
+
+    # Розмір пачки тікетів при векторизації історії
+    BATCH_SIZE = 500
+
+    RESOLVED_STATUSES = (StatusEnum.RESOLVED, StatusEnum.CLOSED)
+
+    def __init__(self):
+        self.artifact_path = settings.ARTIFACTS_DIR / self.ARTIFACT_NAME
+        self._state: Optional[_SkillMatrix] = None
+        self._artifact_checked = False
+        self._artifact_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def match_scores(
+        self,
+        agents: Sequence,
+        ticket_text: Optional[str] = None,
+        ticket_vector=None,
+    ) -> Optional[Dict[int, float]]:
+        """
+        Cosine similarity тікета з профілями агентів.
+
+        Args:
+            agents: Кандидати (User або CandidateAgent)
+            ticket_text: Текст тікета (якщо немає готового вектора)
+            ticket_vector: TF-IDF вектор тікета з ml_model.vectorize_texts
+
+        Returns:
+            Dict[agent_id, score від 0 до 1] (агенти без збігів відсутні)
+            або None, якщо профілі недоступні чи similarity з усіма
+            кандидатами нульова (нульовий вектор тікета або профілів)
+        """
+        if ticket_vector is None:
+            if not ticket_text:
+                return None
+            ticket_vectors = self._vectorize([ticket_text])
+        else:
+            ticket_vectors = ticket_vector
+
+        similarity = self.similarity_matrix(ticket_vectors, agents)
+        if similarity is None or not similarity[0].any():
+            return None
+
+        return {
+            agent.id: float(score)
+            for agent, score in zip(agents, similarity[0])
+            if score > 0
+        }
+
+    def similarity_matrix(self, ticket_vectors, agents: Sequence) -> Optional[np.ndarray]:
+        """
+        Cosine similarity для набору тікетів (batch assignment).
+
+        Args:
+            ticket_vectors: Sparse матриця тікети x терміни (або None)
+            agents: Кандидати (стовпці результату в тому ж порядку)
+
+        Returns:
+            np.ndarray shape (тікети, агенти) або None, якщо профілі недоступні
+        """
+        if ticket_vectors is None:
+            return None
+
+        state = self._get_state(agents)
+        if state is None:
+            return None
+
+        rows = np.array([state.row_by_agent.get(agent.id, -1) for agent in agents])
+        known = rows >= 0
+
+        similarity = np.zeros((ticket_vectors.shape[0], len(agents)))
+        if known.any():
+            profiles = state.profiles[rows[known]]
+            similarity[:, known] = (normalize(ticket_vectors) @ profiles.T).toarray()
+
+        return np.clip(similarity, 0.0, 1.0)
+
+    def vectorize_tickets(self, tickets: Sequence[Ticket]):
+        """TF-IDF вектори тікетів (title + description) однією пачкою; None без моделі."""
+        return self._vectorize([f"{ticket.title}\n{ticket.description}" for ticket in tickets])
+
+    def refresh(self, db: Session) -> None:
+        """
+        Оновлює профілі: повна перебудова при зміні словника моделі,
+        інакше додає тікети, вирішені після watermark, і нові specialty.
+        Записує artifact, тому викликається лише процесом-лідером.
+        """
+        fingerprint = ml_model.vectorizer_fingerprint
+        if ml_model.vectorizer is None or fingerprint is None:
+            return
+
+        # Після зміни лідера продовжуємо з файлу попереднього лідера
+        self.reload_if_changed()
+
+        with self._lock:
+            self._load_artifact()
+            state = self._state
+
+            if state is None or state.fingerprint != fingerprint:
+                state = self._rebuild(db, fingerprint)
+                changed = True
+            else:
+                state, changed = self._apply_new_history(db, state)
+                specialties = dict(
+                    db.query(User.id, User.specialty)
+                    .filter(User.role.in_([RoleEnum.AGENT, RoleEnum.LEAD]))
+                    .all()
+                )
+                state, specialty_changed = self._with_specialties(state, specialties)
+                changed = changed or specialty_changed
+
+            self._state = state
+
+        if changed:
+            self._save(state)
+
+    def reload_if_changed(self) -> bool:
+        """Перечитує artifact, якщо його переписав інший процес (лідер)."""
+        try:
+            mtime = self.artifact_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._artifact_mtime:
+            return False
+
+        with self._lock:
+            self._artifact_checked = False
+            self._load_artifact()
+        return True
+
+    def _get_state(self, agents: Sequence) -> Optional[_SkillMatrix]:
+        """Поточний знімок; specialty кандидатів, що змінилась, довекторизовується одразу."""
+        if self._state is None and not self._artifact_checked:
+            with self._lock:
+                self._load_artifact()
+
+        state = self._state
+        if (
+            state is None
+            or ml_model.vectorizer is None
+            or state.fingerprint != ml_model.vectorizer_fingerprint
+        ):
+            return None
+
+        if any(
+            agent.id not in state.row_by_agent
+            or state.specialties.get(agent.id) != (agent.specialty or None)
+            for agent in agents
+        ):
+            with self._lock:
+                state, _ = self._with_specialties(
+                    self._state, {agent.id: agent.specialty for agent in agents}
+                )
+                self._state = state
+
+        return state
+
+    def _vectorize(self, texts: List[str]):
+        if ml_model.vectorizer is None:
+            return None
+        return ml_model.vectorize_texts(texts)
+
+    def _rebuild(self, db: Session, fingerprint: str) -> _SkillMatrix:
+        """Повна побудова профілів з усієї історії вирішених тікетів."""
+        agents = (
+            db.query(User.id, User.specialty)
+            .filter(User.role.in_([RoleEnum.AGENT, RoleEnum.LEAD]))
+            .order_by(User.id)
+            .all()
+        )
+        agent_ids = [agent_id for agent_id, _ in agents]
+        specialties = {agent_id: specialty or None for agent_id, specialty in agents}
+
+        specialty = self._vectorize_specialties([specialties[agent_id] for agent_id in agent_ids])
+        vocab_size = specialty.shape[1]
+        empty_history = sparse.csr_matrix((len(agent_ids), vocab_size))
+
+        state = _SkillMatrix(fingerprint, agent_ids, specialties, specialty, empty_history, None)
+        state, _ = self._apply_new_history(db, state)
+
+        print(f"[SKILL-VECTORS] Rebuilt profiles for {len(agent_ids)} agents")
+        return state
+
+    def _apply_new_history(self, db: Session, state: _SkillMatrix):
+        """Додає до профілів тікети, вирішені після state.watermark."""
+        resolved_at = func.coalesce(Ticket.resolved_at, Ticket.closed_at)
+        query = (
+            db.query(Ticket.assigned_to_user_id, Ticket.title, Ticket.description, resolved_at)
+            .filter(
+                Ticket.status.in_(SkillVectorService.RESOLVED_STATUSES),
+                Ticket.assigned_to_user_id.isnot(None),
+            )
+        )
+        if state.watermark is not None:
+            query = query.filter(resolved_at > state.watermark)
+
+        agent_ids = list(state.agent_ids)
+        row_by_agent = dict(state.row_by_agent)
+        history = state.history
+        watermark = state.watermark
+        added = 0
+
+        rows = query.order_by(resolved_at).yield_per(SkillVectorService.BATCH_SIZE)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if row[3] is not None:
+                watermark = row[3]
+            if len(batch) >= SkillVectorService.BATCH_SIZE:
+                history = self._add_batch(history, batch, agent_ids, row_by_agent)
+                added += len(batch)
+                batch = []
+        if batch:
+            history = self._add_batch(history, batch, agent_ids, row_by_agent)
+            added += len(batch)
+
+        if not added:
+            return state, False
+
+        specialty = state.specialty
+        if len(agent_ids) > specialty.shape[0]:
+            specialty = sparse.vstack([
+                specialty,
+                sparse.csr_matrix((len(agent_ids) - specialty.shape[0], specialty.shape[1])),
+            ]).tocsr()
+
+        print(f"[SKILL-VECTORS] Added {added} resolved ticket(s) to agent profiles")
+        return _SkillMatrix(
+            state.fingerprint, agent_ids, state.specialties, specialty, history, watermark
+        ), True
+
+    def _add_batch(self, history, batch, agent_ids: List[int], row_by_agent: Dict[int, int]):
+        """Сумує TF-IDF вектори пачки тікетів у рядки їх виконавців (agent_ids доповнюються)."""
+        for assignee_id, *_ in batch:
+            if assignee_id not in row_by_agent:
+                row_by_agent[assignee_id] = len(agent_ids)
+                agent_ids.append(assignee_id)
+
+        vectors = self._vectorize([f"{title}\n{description}" for _, title, description, _ in batch])
+
+        # Індикаторна матриця агенти x тікети пачки: один sparse product замість циклу
+        target_rows = [row_by_agent[assignee_id] for assignee_id, *_ in batch]
+        indicator = sparse.csr_matrix(
+            (np.ones(len(batch)), (target_rows, np.arange(len(batch)))),
+            shape=(len(agent_ids), len(batch)),
+        )
+
+        if history.shape[0] < len(agent_ids):
+            history = sparse.vstack([
+                history,
+                sparse.csr_matrix((len(agent_ids) - history.shape[0], history.shape[1])),
+            ])
+
+        return (history + indicator @ vectors).tocsr()
+
+    def _with_specialties(self, state: _SkillMatrix, specialties: Dict[int, Optional[str]]):
+        """Новий знімок з оновленими specialty-рядками (і новими агентами)."""
+        changed = {
+            agent_id: specialty or None
+            for agent_id, specialty in specialties.items()
+            if agent_id not in state.row_by_agent
+            or state.specialties.get(agent_id) != (specialty or None)
+        }
+        if not changed:
+            return state, False
+
+        agent_ids = list(state.agent_ids)
+        for agent_id in changed:
+            if agent_id not in state.row_by_agent:
+                agent_ids.append(agent_id)
+
+        extra = len(agent_ids) - len(state.agent_ids)
+        vocab_size = state.specialty.shape[1]
+        specialty = sparse.vstack([state.specialty, sparse.csr_matrix((extra, vocab_size))]).tolil()
+        history = sparse.vstack([state.history, sparse.csr_matrix((extra, vocab_size))]).tocsr()
+
+        vectors = self._vectorize_specialties(list(changed.values()))
+        row_by_agent = {agent_id: row for row, agent_id in enumerate(agent_ids)}
+        for i, agent_id in enumerate(changed):
+            specialty[row_by_agent[agent_id]] = vectors[i]
+
+        specialties_all = dict(state.specialties)
+        specialties_all.update(changed)
+
+        return _SkillMatrix(
+            state.fingerprint, agent_ids, specialties_all, specialty.tocsr(), history, state.watermark
+        ), True
+
+    def _vectorize_specialties(self, specialties: List[Optional[str]]):
+        return self._vectorize([(specialty or "").replace(",", " ") for specialty in specialties])
+
+    def _load_artifact(self) -> None:
+        """Завантажує профілі з artifacts/ (один раз на процес)."""
+        if self._artifact_checked:
+            return
+        self._artifact_checked = True
+
+        if not self.artifact_path.exists():
+            return
+
+        try:
+            self._artifact_mtime = self.artifact_path.stat().st_mtime_ns
+            data = joblib.load(self.artifact_path)
+            self._state = _SkillMatrix(
+                data["fingerprint"],
+                data["agent_ids"],
+                data["specialties"],
+                data["specialty"],
+                data["history"],
+                data["watermark"],
+            )
+        except Exception as e:
+            print(f"[SKILL-VECTORS] WARNING: Не вдалося завантажити {self.artifact_path}: {e}")
+
+    def _save(self, state: _SkillMatrix) -> None:
+        """Атомарно записує профілі (tmp файл + rename)."""
+        tmp_path = self.artifact_path.with_suffix(f".{os.getpid()}.tmp")
+        joblib.dump(
+            {
+                "fingerprint": state.fingerprint,
+                "agent_ids": list(state.agent_ids),
+                "specialties": state.specialties,
+                "specialty": state.specialty,
+                "history": state.history,
+                "watermark": state.watermark,
+            },
+            tmp_path,
+        )
+        os.replace(tmp_path, self.artifact_path)
+        self._artifact_mtime = self.artifact_path.stat().st_mtime_ns
+
+
+skill_vector_service = SkillVectorService()
@@ -6,16 +6,25 @@ Hybrid Approach:
 2. Smart Service (workload, availability, skills matching)
 3. Historical performance analysis
 4. Weighted voting для фінального рішення
+
+Batch mode (plan_batch_assignment) розподіляє одразу набір тікетів:
+матриця тікети x слоти агентів (workload_capacity - активні тікети) і
+Hungarian algorithm замість жадібного вибору по одному тікету.
 """
-import json
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import List, Dict, Optional
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
 
 from app.models.user import User
 from app.models.ticket import Ticket
-from app.core.enums import StatusEnum, RoleEnum
+from app.core.enums import RoleEnum
+from app.services.workload_service import workload_service
+from app.services.specialty_index_service import specialty_index_service
+from app.services.skill_vector_service import skill_vector_service
+from app.services.candidate_pool_service import candidate_pool_service, CandidateAgent
 
 
 class SmartAssignmentService:
@@ -30,6 +39,23 @@ class SmartAssignmentService:
     PERFORMANCE_WEIGHT = 0.15   # Historical performance
     AVAILABILITY_WEIGHT = 0.10  # Availability status
 
+    # Порядок колонок у матриці scores (кандидати x фактори)
+    SCORE_COLUMNS = ("llm_match", "skill_match", "workload", "performance", "availability")
+
+    # Scores доступності агента
+    AVAILABILITY_SCORES = {
+        "AVAILABLE": 1.0,
+        "BUSY": 0.5,
+        "OFFLINE": 0.0,
+        "ON_LEAVE": 0.0,
+    }
+
+    # Скільки кандидатів повертати в alternatives
+    TOP_K_ALTERNATIVES = 3
+
+    # Максимум тікетів в одному batch assignment
+    MAX_BATCH_SIZE = 500
+
     # Пороги
     MIN_CONFIDENCE_THRESHOLD = 0.50  # Мінімальна впевненість для auto-assignment
     HIGH_CONFIDENCE_THRESHOLD = 0.75 # Висока впевненість
@@ -43,6 +69,7 @@ class SmartAssignmentService:
         llm_team: Optional[str],
         llm_assignee: Optional[str],
         db: Session,
+        ticket_vector=None,
     ) -> Dict:
         """
         Головний метод: знаходить найкращого виконавця використовуючи hybrid approach.
@@ -55,6 +82,7 @@ class SmartAssignmentService:
             llm_team: Team suggestion від LLM
             llm_assignee: Assignee suggestion від LLM (може бути None)
             db: Database session
+            ticket_vector: TF-IDF вектор тікета з ml_model.vectorize_texts (щоб не векторизувати вдруге)
 
         Returns:
             Dict з полями:
@@ -81,66 +109,64 @@ class SmartAssignmentService:
                 "alternatives": [],
             }
 
-        # 2. Рахуємо scores для кожного кандидата
-        scored_candidates = []
-        for agent in candidates:
-            scores = SmartAssignmentService._calculate_agent_scores(
-                agent=agent,
-                ticket_text=ticket_text,
-                priority=priority,
-                category=category,
-                llm_assignee=llm_assignee,
-                db=db,
-            )
+        # 2. Читаємо лічильники активних тікетів всіх кандидатів (agent_workload)
+        active_counts = workload_service.get_active_counts(
+            agent_ids=[agent.id for agent in candidates],
+            db=db,
+        )
 
-            # Weighted sum
-            final_score = (
-                scores["llm_match"] * SmartAssignmentService.LLM_WEIGHT +
-                scores["skill_match"] * SmartAssignmentService.SKILL_MATCH_WEIGHT +
-                scores["workload"] * SmartAssignmentService.WORKLOAD_WEIGHT +
-                scores["performance"] * SmartAssignmentService.PERFORMANCE_WEIGHT +
-                scores["availability"] * SmartAssignmentService.AVAILABILITY_WEIGHT
-            )
+        # 3. Skill match для всіх кандидатів одразу (TF-IDF профілі або інвертований індекс)
+        skill_scores = SmartAssignmentService._skill_scores(
+            ticket_text=ticket_text,
+            ticket_vector=ticket_vector,
+            candidates=candidates,
+            db=db,
+        )
 
-            scored_candidates.append({
-                "agent": agent,
-                "final_score": final_score,
-                "scores_breakdown": scores,
-            })
+        # 4. Матриця scores (кандидати x фактори) і weighted sum для всіх кандидатів одразу
+        score_matrix = SmartAssignmentService._build_score_matrix(
+            candidates=candidates,
+            llm_assignee=llm_assignee,
+            skill_scores=skill_scores,
+            active_counts=active_counts,
+        )
+        final_scores = SmartAssignmentService._weighted_sum(score_matrix)
 
-        # 3. Сортуємо за final_score (найкращий = найвищий score)
-        scored_candidates.sort(key=lambda x: x["final_score"], reverse=True)
+        # 5. Топ-k кандидатів за final_score (найкращий = найвищий score)
+        top = SmartAssignmentService._top_k(final_scores, SmartAssignmentService.TOP_K_ALTERNATIVES)
 
-        # 4. Беремо топ-1 як фінальне рішення
-        best = scored_candidates[0]
-        best_agent = best["agent"]
-        confidence = best["final_score"]
+        # 6. Беремо топ-1 як фінальне рішення
+        best_idx = top[0]
+        best_agent = candidates[best_idx]
+        confidence = float(final_scores[best_idx])
 
-        # 5. Визначаємо method
+        # 7. Визначаємо method
         method = SmartAssignmentService._determine_method(
             llm_assignee=llm_assignee,
             best_agent_id=best_agent.id,
             confidence=confidence,
         )
 
-        # 6. Генеруємо reasoning
+        # 8. Генеруємо reasoning
         reasoning = SmartAssignmentService._generate_reasoning(
             agent=best_agent,
-            scores=best["scores_breakdown"],
+            scores=SmartAssignmentService._scores_breakdown(score_matrix[best_idx]),
             confidence=confidence,
             method=method,
         )
 
-        # 7. Формуємо alternatives (топ-3)
+        # 9. Формуємо alternatives (топ-3)
+        skill_col = SmartAssignmentService.SCORE_COLUMNS.index("skill_match")
+        workload_col = SmartAssignmentService.SCORE_COLUMNS.index("workload")
         alternatives = [
             {
-                "agent_id": c["agent"].id,
-                "agent_name": c["agent"].full_name,
-                "score": round(c["final_score"], 3),
-                "skill_match": round(c["scores_breakdown"]["skill_match"], 2),
-                "workload": round(c["scores_breakdown"]["workload"], 2),
+                "agent_id": candidates[i].id,
+                "agent_name": candidates[i].full_name,
+                "score": round(float(final_scores[i]), 3),
+                "skill_match": round(float(score_matrix[i, skill_col]), 2),
+                "workload": round(float(score_matrix[i, workload_col]), 2),
             }
-            for c in scored_candidates[:3]
+            for i in top
         ]
 
         return {
@@ -151,14 +177,193 @@ class SmartAssignmentService:
             "alternatives": alternatives,
         }
 
+    @staticmethod
+    def plan_batch_assignment(tickets: List[Ticket], db: Session) -> Dict:
+        """
+        Capacity-aware розподіл набору тікетів між агентами за один прохід.
+
+        Кожен агент має workload_capacity - active_tickets вільних слотів;
+        j-й слот оцінюється з workload після j вже запланованих тікетів, тому
+        один і той самий топ-агент не отримує весь backlog. Для кожного
+        департаменту будується матриця scores тікети x слоти (ті самі фактори
+        і ваги, що у find_best_assignee, без LLM suggestion) і розв'язується
+        задача призначення з максимальним сумарним score.
+
+        Args:
+            tickets: Тікети для розподілу
+            db: Database session
+
+        Returns:
+            Dict з полями:
+                - assignments: List[Dict] (ticket_id, assignee_id, score, ...)
+                - unassigned_ticket_ids: тікети, для яких не вистачило вільних слотів
+                - total_score: сумарний score плану
+        """
+
+        by_department: Dict[Optional[int], List[Ticket]] = defaultdict(list)
+        for ticket in tickets:
+            by_department[ticket.department_id].append(ticket)
+
+        # Тікети без департаменту розподіляються між усіма агентами,
+        # тому плануємо їх останніми з урахуванням вже зайнятих слотів
+        departments = sorted(by_department, key=lambda dept_id: dept_id is None)
+
+        planned_counts: Dict[int, int] = defaultdict(int)
+        assignments: List[Dict] = []
+        unassigned_ticket_ids: List[int] = []
+
+        for department_id in departments:
+            dept_tickets = by_department[department_id]
+
+            candidates = SmartAssignmentService._get_candidate_agents(
+                department_id=department_id,
+                llm_team=None,
+                db=db
+            )
+
+            if not candidates:
+                unassigned_ticket_ids.extend(ticket.id for ticket in dept_tickets)
+                continue
+
+            active_counts = workload_service.get_active_counts(
+                agent_ids=[agent.id for agent in candidates],
+                db=db,
+            )
+            for agent_id, planned in planned_counts.items():
+                if planned:
+                    active_counts[agent_id] = active_counts.get(agent_id, 0) + planned
+
+            dept_assignments = SmartAssignmentService._solve_batch(
+                tickets=dept_tickets,
+                candidates=candidates,
+                active_counts=active_counts,
+                db=db,
+            )
+
+            assigned_ids = set()
+            for item in dept_assignments:
+                assigned_ids.add(item["ticket_id"])
+                planned_counts[item["assignee_id"]] += 1
+
+            assignments.extend(dept_assignments)
+            unassigned_ticket_ids.extend(
+                ticket.id for ticket in dept_tickets if ticket.id not in assigned_ids
+            )
+
+        return {
+            "assignments": assignments,
+            "unassigned_ticket_ids": unassigned_ticket_ids,
+            "total_score": round(sum(item["score"] for item in assignments), 3),
+        }
+
+    @staticmethod
+    def _solve_batch(
+        tickets: List[Ticket],
+        candidates: List[CandidateAgent],
+        active_counts: Dict[int, int],
+        db: Session,
+    ) -> List[Dict]:
+        """
+        Розв'язує задачу призначення для тікетів одного департаменту.
+
+        Returns:
+            List[Dict] призначень; тікети без вільного слоту відсутні
+        """
+
+        # 1. Вільні слоти агентів (не більше ніж тікетів у batch)
+        slot_agent: List[int] = []
+        slot_load: List[int] = []
+        for idx, agent in enumerate(candidates):
+            active = active_counts.get(agent.id, 0)
+            free = min(agent.workload_capacity - active, len(tickets))
+            for j in range(max(free, 0)):
+                slot_agent.append(idx)
+                slot_load.append(active + j)
+
+        if not slot_agent:
+            return []
+
+        slots = np.array(slot_agent)
+        capacity = np.array([agent.workload_capacity for agent in candidates], dtype=float)
+
+        # 2. Skill match тікети x агенти (одна векторизація всіх тікетів batch)
+        skill_match = skill_vector_service.similarity_matrix(
+            skill_vector_service.vectorize_tickets(tickets),
+            candidates,
+        )
+        if skill_match is None:
+            skill_match = np.zeros((len(tickets), len(candidates)))
+        # Тікети без збігу з профілями (або всі, якщо профілі недоступні) - keyword matching
+        fallback_rows = np.flatnonzero(~skill_match.any(axis=1))
+        if len(fallback_rows):
+            agent_index = {agent.id: idx for idx, agent in enumerate(candidates)}
+            for row in fallback_rows:
+                ticket = tickets[row]
+                scores = specialty_index_service.match_scores(
+                    ticket_text=f"{ticket.title}\n{ticket.description}",
+                    agents=candidates,
+                    db=db,
+                )
+                for agent_id, score in scores.items():
+                    skill_match[row, agent_index[agent_id]] = score
+
+        # 3. Фактори по слотах (слот завжди має load < capacity)
+        workload = 1.0 - np.array(slot_load, dtype=float) / capacity[slots]
+        performance = np.array([agent.assignment_score for agent in candidates], dtype=float)[slots]
+        availability = np.array([
+            SmartAssignmentService.AVAILABILITY_SCORES.get(agent.availability_status, 0.5)
+            for agent in candidates
+        ])[slots]
+
+        # 4. Тензор scores (тікети x слоти x фактори) -> матриця weighted sums
+        shape = (len(tickets), len(slots))
+        factors = np.stack([
+            np.zeros(shape),
+            skill_match[:, slots],
+            np.broadcast_to(workload, shape),
+            np.broadcast_to(performance, shape),
+            np.broadcast_to(availability, shape),
+        ], axis=-1)
+        final_scores = SmartAssignmentService._weighted_sum(
+            factors.reshape(-1, len(SmartAssignmentService.SCORE_COLUMNS))
+        ).reshape(shape)
+
+        # 5. Призначення з максимальним сумарним score
+        rows, cols = linear_sum_assignment(final_scores, maximize=True)
+
+        assignments = []
+        for row, col in zip(rows, cols):
+            ticket = tickets[row]
+            agent = candidates[slots[col]]
+            score = float(final_scores[row, col])
+            breakdown = SmartAssignmentService._scores_breakdown(factors[row, col])
+
+            assignments.append({
+                "ticket_id": ticket.id,
+                "incident_id": ticket.incident_id,
+                "assignee_id": agent.id,
+                "agent_name": agent.full_name,
+                "score": round(score, 3),
+                "skill_match": round(breakdown["skill_match"], 2),
+                "workload": round(breakdown["workload"], 2),
+                "reasoning": SmartAssignmentService._generate_reasoning(
+                    agent=agent,
+                    scores=breakdown,
+                    confidence=score,
+                    method="BATCH",
+                ),
+            })
+
+        return assignments
+
     @staticmethod
     def _get_candidate_agents(
         department_id: Optional[int],
         llm_team: Optional[str],
         db: Session,
-    ) -> List[User]:
+    ) -> List[CandidateAgent]:
         """
-        Отримує список потенційних candidates для assignment.
+        Отримує список потенційних candidates для assignment (з кешу пулів департаментів).
 
         Фільтри:
         - Role = AGENT або LEAD
@@ -167,157 +372,151 @@ class SmartAssignmentService:
         - Department matching (якщо є)
         """
 
-        query = db.query(User).filter(
-            User.role.in_([RoleEnum.AGENT, RoleEnum.LEAD]),
-            User.is_active == True,
-            User.availability_status.notin_(["OFFLINE", "ON_LEAVE"])
-        )
-
-        # Якщо department вказано - фільтруємо
-        if department_id:
-            query = query.filter(User.department_id == department_id)
+        pool = candidate_pool_service.get_pool(department_id=department_id, db=db)
 
         # TODO: Фільтр за llm_team якщо потрібно (наразі не реалізовано)
 
-        candidates = query.all()
-        return candidates
+        return list(pool.select(
+            roles=(RoleEnum.AGENT, RoleEnum.LEAD),
+            exclude_availability=("OFFLINE", "ON_LEAVE"),
+        ))
 
     @staticmethod
-    def _calculate_agent_scores(
-        agent: User,
+    def _skill_scores(
         ticket_text: str,
-        priority: str,
-        category: str,
-        llm_assignee: Optional[str],
+        ticket_vector,
+        candidates: List[CandidateAgent],
         db: Session,
-    ) -> Dict[str, float]:
+    ) -> Dict[int, float]:
         """
-        Рахує всі scores для одного agent.
+        Skill match для всіх кандидатів.
 
-        Returns:
-            Dict з scores (всі від 0 до 1):
-                - llm_match: Чи співпадає з LLM suggestion
-                - skill_match: TF-IDF similarity між specialty і ticket_text
-                - workload: Inverse workload (менше тікетів = краще)
-                - performance: Historical assignment_score
-                - availability: Availability bonus
+        Основний варіант - cosine similarity з TF-IDF профілями агентів
+        (specialty + історія вирішених тікетів). Поки профілі недоступні або
+        тікет не має спільних термінів з жодним профілем - збіг ключових
+        слів specialty з текстом тікета.
         """
 
-        # 1. LLM Match
-        llm_match = 1.0 if llm_assignee and str(agent.id) == str(llm_assignee) else 0.0
-
-        # 2. Skill Match (TF-IDF similarity)
-        skill_match = SmartAssignmentService._calculate_skill_match(
-            agent_specialty=agent.specialty,
+        scores = skill_vector_service.match_scores(
+            agents=candidates,
             ticket_text=ticket_text,
+            ticket_vector=ticket_vector,
         )
-
-        # 3. Workload Score
-        workload_score = SmartAssignmentService._calculate_workload_score(
-            agent_id=agent.id,
-            workload_capacity=agent.workload_capacity,
-            db=db,
-        )
-
-        # 4. Performance Score (historical)
-        performance = agent.assignment_score  # Вже normalized (0-1)
-
-        # 5. Availability Score
-        availability_map = {
-            "AVAILABLE": 1.0,
-            "BUSY": 0.5,
-            "OFFLINE": 0.0,
-            "ON_LEAVE": 0.0,
-        }
-        availability = availability_map.get(agent.availability_status, 0.5)
-
-        return {
-            "llm_match": llm_match,
-            "skill_match": skill_match,
-            "workload": workload_score,
-            "performance": performance,
-            "availability": availability,
-        }
+        if scores is None:
+            scores = specialty_index_service.match_scores(
+                ticket_text=ticket_text,
+                agents=candidates,
+                db=db,
+            )
+        return scores
 
     @staticmethod
-    def _calculate_skill_match(
-        agent_specialty: Optional[str],
-        ticket_text: str,
-    ) -> float:
+    def _build_score_matrix(
+        candidates: List[CandidateAgent],
+        llm_assignee: Optional[str],
+        skill_scores: Dict[int, float],
+        active_counts: Dict[int, int],
+    ) -> np.ndarray:
         """
-        Рахує similarity між agent specialty і ticket text.
+        Будує матрицю scores для всіх кандидатів.
 
-        Використовує покращений keyword matching з partial matching:
-        - Exact match: повний збіг ключового слова
-        - Partial match: часткове збіг (наприклад, "VPN" збігається з "OpenVPN")
-        - Weighted: точні збіги мають більшу вагу
+        Args:
+            candidates: Кандидати (рядки матриці в тому ж порядку)
+            llm_assignee: Assignee suggestion від LLM
+            skill_scores: Skill match з _skill_scores
+            active_counts: Кількість активних тікетів (з agent_workload)
 
         Returns:
-            Score від 0 до 1
+            np.ndarray shape (len(candidates), 5), колонки як у SCORE_COLUMNS (всі від 0 до 1):
+                - llm_match: Чи співпадає з LLM suggestion
+                - skill_match: Similarity профілю агента з ticket_text
+                - workload: Inverse workload (менше тікетів = краще)
+                - performance: Historical assignment_score
+                - availability: Availability bonus
         """
 
-        if not agent_specialty or not ticket_text:
-            return 0.0
+        llm_id = str(llm_assignee) if llm_assignee else None
+        availability_scores = SmartAssignmentService.AVAILABILITY_SCORES
 
-        # Lowercase для порівняння
-        specialty_lower = agent_specialty.lower()
-        ticket_lower = ticket_text.lower()
+        # 1. LLM Match
+        llm_match = np.array(
+            [1.0 if llm_id is not None and str(agent.id) == llm_id else 0.0 for agent in candidates]
+        )
 
-        # Розбиваємо specialty на keywords
-        keywords = [kw.strip() for kw in specialty_lower.split(",")]
+        # 2. Skill Match
+        skill_match = np.array([skill_scores.get(agent.id, 0.0) for agent in candidates])
 
-        if len(keywords) == 0:
-            return 0.0
+        # 3. Workload Score: 1 = немає тікетів, 0 = перевантажений
+        active = np.array([active_counts.get(agent.id, 0) for agent in candidates], dtype=float)
+        capacity = np.array([agent.workload_capacity for agent in candidates], dtype=float)
+        overloaded = active >= capacity
+        workload = np.zeros(len(candidates))
+        np.subtract(1.0, active / np.where(overloaded, 1.0, capacity), out=workload, where=~overloaded)
 
-        # Рахуємо exact matches та partial matches
-        exact_matches = 0
-        partial_matches = 0
+        # 4. Performance Score (historical, вже normalized 0-1)
+        performance = np.array([agent.assignment_score for agent in candidates], dtype=float)
 
-        for kw in keywords:
-            if not kw:  # Skip empty keywords
-                continue
+        # 5. Availability Score
+        availability = np.array(
+            [availability_scores.get(agent.availability_status, 0.5) for agent in candidates]
+        )
 
-            # Exact match: ключове слово є окремим словом у тексті
-            # Використовуємо word boundaries для точності
-            if f" {kw} " in f" {ticket_lower} " or ticket_lower.startswith(kw + " ") or ticket_lower.endswith(" " + kw):
-                exact_matches += 1
-            # Partial match: ключове слово є частиною слова (substring)
-            elif kw in ticket_lower:
-                partial_matches += 1
+        return np.column_stack([llm_match, skill_match, workload, performance, availability])
 
-        # Weighted score: exact matches = 1.0, partial matches = 0.5
-        total_weight = exact_matches * 1.0 + partial_matches * 0.5
-        max_possible_weight = len(keywords) * 1.0
+    @staticmethod
+    def _weights_vector() -> np.ndarray:
+        """Ваги факторів у порядку SCORE_COLUMNS."""
+        return np.array([
+            SmartAssignmentService.LLM_WEIGHT,
+            SmartAssignmentService.SKILL_MATCH_WEIGHT,
+            SmartAssignmentService.WORKLOAD_WEIGHT,
+            SmartAssignmentService.PERFORMANCE_WEIGHT,
+            SmartAssignmentService.AVAILABILITY_WEIGHT,
+        ])
 
-        # Normalize
-        score = min(total_weight / max_possible_weight, 1.0)
+    @staticmethod
+    def _weighted_sum(score_matrix: np.ndarray) -> np.ndarray:
+        """
+        Weighted sum по рядках матриці scores.
 
-        return score
+        Накопичуємо колонки по черзі замість score_matrix @ weights: BLAS змінює
+        порядок додавання, і округлені confidence/score інколи відрізнялись
+        би від поагентного розрахунку в останньому знаку.
+        """
+
+        weights = SmartAssignmentService._weights_vector()
+        final_scores = score_matrix[:, 0] * weights[0]
+        for col in range(1, len(weights)):
+            final_scores = final_scores + score_matrix[:, col] * weights[col]
+        return final_scores
 
     @staticmethod
-    def _calculate_workload_score(
-        agent_id: int,
-        workload_capacity: int,
-        db: Session,
-    ) -> float:
+    def _top_k(final_scores: np.ndarray, k: int) -> List[int]:
         """
-        Рахує workload score: чим менше активних тікетів, тим краще.
+        Індекси k кандидатів з найвищим score, від найкращого.
 
-        Returns:
-            Score від 0 до 1 (1 = немає тікетів, 0 = перевантажений)
+        argpartition відбирає топ-k за O(n); при однакових scores
+        перевага кандидату, що йде раніше (як у стабільному сортуванні).
         """
 
-        # Рахуємо скільки NEW/TRIAGE/IN_PROGRESS тікетів у agent
-        active_tickets = db.query(func.count(Ticket.id)).filter(
-            Ticket.assigned_to_user_id == agent_id,
-            Ticket.status.in_([StatusEnum.NEW, StatusEnum.TRIAGE, StatusEnum.IN_PROGRESS])
-        ).scalar()
+        k = min(k, len(final_scores))
+        if len(final_scores) > k:
+            part = np.argpartition(-final_scores, k - 1)[:k]
+            threshold = final_scores[part].min()
+            top = np.flatnonzero(final_scores >= threshold)
+        else:
+            top = np.arange(len(final_scores))
 
-        if active_tickets >= workload_capacity:
-            return 0.0  # Перевантажений
+        top = top[np.argsort(-final_scores[top], kind="stable")]
+        return [int(i) for i in top[:k]]
 
-        # Inverse: чим менше тікетів, тим вищий score
-        return 1.0 - (active_tickets / workload_capacity)
+    @staticmethod
+    def _scores_breakdown(row: np.ndarray) -> Dict[str, float]:
+        """Рядок матриці scores -> Dict {фактор: score}."""
+        return {
+            name: float(value)
+            for name, value in zip(SmartAssignmentService.SCORE_COLUMNS, row)
+        }
 
     @staticmethod
     def _determine_method(
@@ -344,7 +543,7 @@ class SmartAssignmentService:
 
     @staticmethod
     def _generate_reasoning(
-        agent: User,
+        agent: CandidateAgent,
         scores: Dict[str, float],
         confidence: float,
         method: str,
@@ -428,6 +627,9 @@ class SmartAssignmentService:
         # Clip до [0, 1]
         agent.assignment_score = max(0.0, min(1.0, new_score))
 
+        # assignment_score входить у знімки пулів кандидатів
+        candidate_pool_service.mark_changed(db)
+
         db.commit()
 
 
@@ -0,0 +1,158 @@
+"""
+Specialty Index Service - інвертований індекс спеціалізацій агентів для skill matching.
+
+Замість того щоб для кожного кандидата розбивати User.specialty і шукати
+кожне ключове слово в тексті тікета, індекс будується один раз:
+1. keyword -> [agent_id, ...] (нормалізовані ключові слова зі specialty)
+2. Один скомпільований regex по всіх ключових словах
+3. Один прохід по тексту тікета дає exact/partial збіги для всіх агентів одразу
+
+Індекс перебудовується при зміні specialty через users router, а також
+ліниво, якщо specialty кандидата відрізняється від проіндексованої
+(наприклад, її змінив інший worker).
+"""
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+
+class _SpecialtyIndex:
+    """
+    Незмінний знімок індексу. Перебудова створює новий об'єкт,
+    тому читачі ніколи не бачать частково оновленого стану.
+    """
+
+    __slots__ = ("specialties", "agents_by_keyword", "keyword_totals", "prefixes", "pattern", "max_words")
+
+    def __init__(self, specialties: Dict[int, Optional[str]]):
+        self.specialties = specialties
+        self.agents_by_keyword: Dict[str, List[int]] = defaultdict(list)
+        self.keyword_totals: Dict[int, int] = {}
+
+        for agent_id, specialty in specialties.items():
+            if not specialty:
+                continue
+            keywords = SpecialtyIndexService.split_specialty(specialty)
+            # Порожні елементи ("vpn,,lan") теж входять у знаменник, як і раніше
+            self.keyword_totals[agent_id] = len(keywords)
+            for kw in keywords:
+                if kw:
+                    self.agents_by_keyword[kw].append(agent_id)
+
+        keywords = sorted(self.agents_by_keyword, key=len, reverse=True)
+
+        # Для кожного keyword - інші keywords, які є його префіксом.
+        # Regex в кожній позиції знаходить найдовший keyword, а коротші
+        # з тим самим початком відновлюються з цього списку.
+        self.prefixes: Dict[str, List[str]] = {
+            kw: [other for other in keywords if other != kw and kw.startswith(other)]
+            for kw in keywords
+        }
+
+        self.max_words = max((kw.count(" ") + 1 for kw in keywords), default=0)
+
+        # Lookahead дозволяє знаходити збіги, що перекриваються ("vpn" в "openvpn")
+        self.pattern = (
+            re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+            if keywords else None
+        )
+
+
+class SpecialtyIndexService:
+    """
+    Сервіс для skill matching через інвертований індекс спеціалізацій.
+    """
+
+    EXACT_MATCH_WEIGHT = 1.0    # Ключове слово є окремим словом у тексті
+    PARTIAL_MATCH_WEIGHT = 0.5  # Ключове слово є частиною слова ("VPN" в "OpenVPN")
+
+    def __init__(self):
+        self._index: Optional[_SpecialtyIndex] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def split_specialty(specialty: str) -> List[str]:
+        """Нормалізує specialty ("VPN, Remote Access") до списку keywords."""
+        return [kw.strip() for kw in specialty.lower().split(",")]
+
+    def invalidate(self) -> None:
+        """Скидає індекс; наступний виклик match_scores перебудує його."""
+        self._index = None
+
+    def rebuild(self, db: Session) -> None:
+        """Перебудовує індекс зі specialty всіх користувачів."""
+        with self._lock:
+            rows = db.query(User.id, User.specialty).filter(User.specialty.isnot(None)).all()
+            self._index = _SpecialtyIndex({user_id: specialty or None for user_id, specialty in rows})
+
+    def match_scores(self, ticket_text: str, agents: List[User], db: Session) -> Dict[int, float]:
+        """
+        Рахує skill match score для всіх агентів за один прохід по тексту.
+
+        Exact match - ключове слово відокремлене пробілами, partial match -
+        ключове слово є підрядком тексту. Score агента:
+        (exact * 1.0 + partial * 0.5) / кількість keywords у specialty, обрізаний до 1.
+
+        Returns:
+            Dict[agent_id, score від 0 до 1]; агенти без збігів відсутні
+        """
+        if not ticket_text or not agents:
+            return {}
+
+        index = self._get_index(agents, db)
+        if index.pattern is None:
+            return {}
+
+        ticket_lower = ticket_text.lower()
+
+        found: Set[str] = set()
+        for match in index.pattern.finditer(ticket_lower):
+            kw = match.group(1)
+            if kw not in found:
+                found.add(kw)
+                found.update(index.prefixes[kw])
+
+        if not found:
+            return {}
+
+        # Exact: keyword дорівнює послідовності токенів, розділених пробілом
+        tokens = ticket_lower.split(" ")
+        ngrams: Set[str] = set()
+        for size in range(1, index.max_words + 1):
+            for start in range(len(tokens) - size + 1):
+                ngrams.add(" ".join(tokens[start:start + size]))
+
+        weights: Dict[int, float] = defaultdict(float)
+        for kw in found:
+            weight = (
+                SpecialtyIndexService.EXACT_MATCH_WEIGHT
+                if kw in ngrams
+                else SpecialtyIndexService.PARTIAL_MATCH_WEIGHT
+            )
+            for agent_id in index.agents_by_keyword[kw]:
+                weights[agent_id] += weight
+
+        agent_ids = {agent.id for agent in agents}
+        return {
+            agent_id: min(weight / index.keyword_totals[agent_id], 1.0)
+            for agent_id, weight in weights.items()
+            if agent_id in agent_ids
+        }
+
+    def _get_index(self, agents: List[User], db: Session) -> _SpecialtyIndex:
+        """Повертає індекс, перебудовуючи його якщо specialty кандидатів застаріла."""
+        index = self._index
+        if index is None or any(
+            index.specialties.get(agent.id) != (agent.specialty or None) for agent in agents
+        ):
+            self.rebuild(db)
+            index = self._index
+        return index
+
+
+specialty_index_service = SpecialtyIndexService()
@@ -0,0 +1,56 @@
+"""
+Ticket Count Service - кешовані total counts для списку тікетів.
+
+COUNT(*) по tickets росте разом з таблицею, тому GET /tickets не рахує його
+на кожну сторінку:
+1. Total рахується лише на запит (include_total) і кешується в пам'яті
+   worker-а по ключу "видимість користувача + фільтри"
+2. Значення живе COUNT_TTL_SECONDS - лічильник для UI може відставати на
+   кілька секунд, зате сторінки board/analytics не чекають на COUNT
+3. Кеш обмежений MAX_ENTRIES; при переповненні видаляються найстаріші записи
+"""
+import threading
+import time
+from typing import Dict, Hashable, Tuple
+
+from sqlalchemy.orm import Query
+
+
+class TicketCountService:
+    """
+    Сервіс для кешу кількості тікетів по фільтрах.
+    """
+
+    COUNT_TTL_SECONDS = 30
+    MAX_ENTRIES = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[Hashable, Tuple[float, int]] = {}
+
+    def get_total(self, key: Hashable, query: Query) -> int:
+        """
+        Кількість рядків query (без сортування) з кешу або з БД.
+
+        Args:
+            key: Ключ кешу - має однозначно описувати фільтри query
+            query: Відфільтрований запит по tickets
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached and now - cached[0] < self.COUNT_TTL_SECONDS:
+                return cached[1]
+
+        total = query.order_by(None).count()
+
+        with self._lock:
+            if len(self._counts) >= self.MAX_ENTRIES:
+                for stale_key, _ in sorted(self._counts.items(), key=lambda item: item[1][0])[: self.MAX_ENTRIES // 4]:
+                    del self._counts[stale_key]
+            self._counts[key] = (now, total)
+
+        return total
+
+
+ticket_count_service = TicketCountService()
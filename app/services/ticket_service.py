@@ -2,10 +2,11 @@
 Ticket Service - бізнес-логіка роботи з тікетами.
 Містить логіку створення, оновлення, тріажу та статусів.
 """
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 from sqlalchemy.orm import Session
+from sqlalchemy import or_
 from fastapi import HTTPException
 
 from app.core.enums import (
@@ -14,11 +15,17 @@ from app.core.enums import (
 )
 from app.models.ticket import Ticket
 from app.models.user import User
+from app.models.ml_log import MLPredictionLog
+from app.models.department import Department
 from app.models.settings import SystemSettings
 from app.schemas.ticket import TicketCreate, TicketUpdate
 from app.services.ml_service import ml_service
 from app.services.assignee_service import assignee_service
 from app.services.smart_assignment_service import smart_assignment_service
+from app.services.workload_service import workload_service
+from app.services.learning_service import learning_service
+from app.services.retrain_trigger_service import retrain_trigger_service
+from app.services.feedback_export_worker import feedback_export_worker
 import json
 
 
@@ -122,6 +129,7 @@ class TicketService:
                     llm_team=llm_team,
                     llm_assignee=llm_assignee,
                     db=db,
+                    ticket_vector=ml_result.get("skill_vector"),
                 )
 
                 # Застосовуємо результат assignment
@@ -171,6 +179,14 @@ class TicketService:
                     ticket.auto_assigned = False
                     print(f"[TRIAGE AUTO-ASSIGN] Тікет #{ticket.incident_id} призначено на LEAD департаменту (user_id: {dept.lead_user_id})")
 
+        # 5. Оновлюємо лічильник навантаження виконавця (в тій самій транзакції)
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=None,
+            previous_status=None,
+        )
+
         db.commit()
         db.refresh(ticket)
 
@@ -205,6 +221,8 @@ class TicketService:
         new_priority = update_data.get("priority_manual")
         priority_changed = False
         previous_priority = ticket.priority_manual
+        previous_assignee_id = ticket.assigned_to_user_id
+        previous_status = ticket.status
 
         if "priority_manual" in update_data:
             if new_priority is None:
@@ -222,6 +240,18 @@ class TicketService:
 
         ticket.updated_at = datetime.utcnow()
 
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=previous_assignee_id,
+            previous_status=previous_status,
+        )
+        learning_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=previous_assignee_id,
+        )
+
         if priority_changed:
             TicketService._record_priority_feedback(
                 db=db,
@@ -235,10 +265,7 @@ class TicketService:
         db.commit()
 
         if priority_changed:
-            try:
-                training_feedback_service.export_priority_feedback_dataset(db)
-            except Exception as exc:
-                print(f"[TRAINING_FEEDBACK] Failed to export dataset: {exc}")
+            feedback_export_worker.notify()
 
         db.refresh(ticket)
 
@@ -274,6 +301,7 @@ class TicketService:
             raise HTTPException(status_code=400, detail="Ticket does not require triage")
 
         previous_priority = ticket.priority_manual
+        previous_status = ticket.status
 
         # Застосовуємо рішення LEAD
         ticket.priority_manual = priority_final
@@ -289,6 +317,13 @@ class TicketService:
 
         ticket.updated_at = datetime.utcnow()
 
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=ticket.assigned_to_user_id,
+            previous_status=previous_status,
+        )
+
         if priority_final == previous_priority:
             reason_to_store = priority_change_reason or "TRIAGE_CONFIRMED"
         else:
@@ -309,10 +344,7 @@ class TicketService:
         )
 
         db.commit()
-        try:
-            training_feedback_service.export_priority_feedback_dataset(db)
-        except Exception as exc:
-            print(f"[TRAINING_FEEDBACK] Failed to export dataset: {exc}")
+        feedback_export_worker.notify()
         db.refresh(ticket)
 
         return ticket
@@ -359,6 +391,7 @@ class TicketService:
             log_entry.category_predicted = ticket.category_ml_suggested
             log_entry.category_confidence = ticket.category_ml_confidence
 
+        retrain_trigger_service.record_feedback(db)
         db.flush()
 
     @staticmethod
@@ -417,6 +450,7 @@ class TicketService:
         if ticket.category_ml_suggested:
             ticket.category_accepted = True
 
+        retrain_trigger_service.record_feedback(db)
         db.flush()
 
     @staticmethod
@@ -464,10 +498,19 @@ class TicketService:
                         detail="Can only claim tickets from your department",
                     )
 
+        previous_status = ticket.status
+
         ticket.assigned_to_user_id = agent.id
         ticket.status = StatusEnum.IN_PROGRESS
         ticket.updated_at = datetime.utcnow()
 
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=None,
+            previous_status=previous_status,
+        )
+
         db.commit()
         db.refresh(ticket)
 
@@ -498,16 +541,170 @@ class TicketService:
         if not assignee or assignee.role not in [RoleEnum.AGENT, RoleEnum.LEAD]:
             raise HTTPException(status_code=400, detail="Invalid assignee")
 
+        previous_assignee_id = ticket.assigned_to_user_id
+        previous_status = ticket.status
+
         ticket.assigned_to_user_id = assignee_id
         if ticket.status == StatusEnum.NEW:
             ticket.status = StatusEnum.IN_PROGRESS
         ticket.updated_at = datetime.utcnow()
 
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=previous_assignee_id,
+            previous_status=previous_status,
+        )
+        learning_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=previous_assignee_id,
+        )
+
+        db.commit()
+        db.refresh(ticket)
+
+        return ticket
+
+    @staticmethod
+    def update_assignees(
+        ticket_id: int,
+        assignee_ids: List[int],
+        db: Session,
+    ) -> Ticket:
+        """
+        LEAD/ADMIN призначає множинних виконавців до тікету.
+
+        Args:
+            ticket_id: ID тікета
+            assignee_ids: ID виконавців (перший стає основним assigned_to_user_id)
+            db: Database session
+
+        Returns:
+            Оновлений Ticket
+        """
+        ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        # Перевіряємо що всі користувачі існують
+        users = db.query(User).filter(User.id.in_(assignee_ids)).all()
+        if len(users) != len(assignee_ids):
+            raise HTTPException(status_code=400, detail="One or more assignees not found")
+
+        previous_assignee_id = ticket.assigned_to_user_id
+
+        # Замінюємо попередніх виконавців новими
+        ticket.assignees = users
+
+        # assigned_to_user_id = перший виконавець (зворотна сумісність)
+        if users:
+            ticket.assigned_to_user_id = users[0].id
+        else:
+            ticket.assigned_to_user_id = None
+
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=previous_assignee_id,
+            previous_status=ticket.status,
+        )
+        learning_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=previous_assignee_id,
+        )
+
         db.commit()
         db.refresh(ticket)
 
         return ticket
 
+    @staticmethod
+    def batch_assign(
+        department_id: Optional[int],
+        ticket_ids: Optional[List[int]],
+        apply: bool,
+        db: Session,
+        reassign: bool = False,
+    ) -> Dict:
+        """
+        LEAD/ADMIN розподіляє backlog NEW/TRIAGE тікетів між агентами одним планом.
+
+        Беруться тікети без виконавця або ті, що висять на LEAD департаменту
+        (автопризначення тріажу); ticket_ids звужує вибір. Тікети, вже
+        призначені іншим агентам, перепризначаються лише з reassign=True.
+
+        Args:
+            department_id: Обмежити департаментом (опціонально)
+            ticket_ids: Конкретні тікети (опціонально)
+            apply: False = тільки план, True = застосувати призначення
+            db: Database session
+            reassign: Дозволити перепризначення тікетів з виконавцем
+
+        Returns:
+            План від smart_assignment_service.plan_batch_assignment + applied
+        """
+        max_batch = smart_assignment_service.MAX_BATCH_SIZE
+        if ticket_ids and len(ticket_ids) > max_batch:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many tickets in one batch (max {max_batch})"
+            )
+
+        query = db.query(Ticket).filter(
+            Ticket.status.in_([StatusEnum.NEW, StatusEnum.TRIAGE])
+        )
+
+        if ticket_ids:
+            query = query.filter(Ticket.id.in_(ticket_ids))
+        if not reassign:
+            query = query.outerjoin(Department, Ticket.department_id == Department.id).filter(
+                or_(
+                    Ticket.assigned_to_user_id.is_(None),
+                    Ticket.assigned_to_user_id == Department.lead_user_id,
+                )
+            )
+
+        if department_id:
+            query = query.filter(Ticket.department_id == department_id)
+
+        tickets = query.order_by(Ticket.created_at, Ticket.id).limit(max_batch).all()
+
+        plan = smart_assignment_service.plan_batch_assignment(tickets=tickets, db=db)
+        plan["applied"] = False
+
+        if not apply or not plan["assignments"]:
+            return plan
+
+        tickets_by_id = {ticket.id: ticket for ticket in tickets}
+        for item in plan["assignments"]:
+            ticket = tickets_by_id[item["ticket_id"]]
+            previous_assignee_id = ticket.assigned_to_user_id
+
+            ticket.assigned_to_user_id = item["assignee_id"]
+            ticket.auto_assigned = True
+            ticket.assignment_confirmed = None
+            ticket.assignment_method = "BATCH"
+            ticket.assignment_confidence = item["score"]
+            ticket.assignment_reasoning = item["reasoning"]
+            ticket.updated_at = datetime.utcnow()
+
+            workload_service.on_ticket_changed(
+                db=db,
+                ticket=ticket,
+                previous_assignee_id=previous_assignee_id,
+                previous_status=ticket.status,
+            )
+
+        db.commit()
+        plan["applied"] = True
+
+        print(f"[BATCH-ASSIGN] Призначено {len(plan['assignments'])} тікетів, "
+              f"без вільних слотів: {len(plan['unassigned_ticket_ids'])}")
+
+        return plan
+
     @staticmethod
     def update_status(
         ticket_id: int,
@@ -548,6 +745,14 @@ class TicketService:
         ticket.status = new_status
         ticket.updated_at = datetime.utcnow()
 
+        workload_service.on_ticket_changed(
+            db=db,
+            ticket=ticket,
+            previous_assignee_id=ticket.assigned_to_user_id,
+            previous_status=previous_status,
+        )
+        learning_service.on_ticket_changed(db=db, ticket=ticket)
+
         if new_status == StatusEnum.RESOLVED:
             ticket.resolved_at = datetime.utcnow()
 
@@ -571,10 +776,7 @@ class TicketService:
 
         # Експортуємо dataset якщо є новий feedback
         if new_status == StatusEnum.RESOLVED and ticket.priority_ml_suggested:
-            try:
-                training_feedback_service.export_priority_feedback_dataset(db)
-            except Exception as exc:
-                print(f"[TRAINING_FEEDBACK] Failed to export dataset: {exc}")
+            feedback_export_worker.notify()
 
         db.refresh(ticket)
 
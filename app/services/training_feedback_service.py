@@ -1,106 +1,283 @@
-"""Service helpers for exporting ML/LLM feedback datasets."""
+"""Service helpers for exporting ML/LLM feedback datasets.
+
+The priority feedback CSV is append-only: every export appends only the rows
+whose ``priority_feedback_recorded_at`` is past the high-water mark stored in
+``priority_feedback.state.json``, so a single priority override costs one
+indexed range query and one small append. The query reaches
+``EXPORT_OVERLAP_SECONDS`` behind the mark so that transactions committed
+late are not skipped; rows already exported in that window are remembered
+in the state file. A log row whose feedback changes later is appended
+again; readers should keep the last row per ``log_id``.
+Compaction (scheduled, or on the first export) rewrites the file from the
+database with one row per log.
+
+Every uvicorn worker exports, and the scheduler leader compacts. So the
+read-state/append/save-state sequence and compaction hold an exclusive
+``fcntl.flock`` on the ``priority_feedback.lock`` sidecar file, and an append
+never lands in a file that compaction is replacing. Where ``fcntl`` is not
+available (Windows), only the in-process lock applies.
+"""
 from __future__ import annotations
 
 import csv
+import io
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.models.ml_log import MLPredictionLog
+from app.models.ticket import Ticket
+from app.models.user import User
+
+FIELDNAMES = [
+    "ticket_id",
+    "created_at",
+    "updated_at",
+    "full_text",
+    "priority_ml",
+    "priority_ml_confidence",
+    "priority_llm",
+    "priority_llm_confidence",
+    "priority_final",
+    "priority_feedback_previous",
+    "priority_feedback_reason",
+    "priority_feedback_author",
+    "priority_feedback_recorded_at",
+    "triage_reason",
+    "log_id",
+]
 
 
 class TrainingFeedbackService:
     """Aggregate feedback for retraining pipelines."""
 
+    # How often the scheduler compacts the append-only CSV
+    COMPACT_INTERVAL_HOURS = 24
+
+    # Feedback committed up to this long after it was recorded is still exported
+    EXPORT_OVERLAP_SECONDS = 300
+
+    BATCH_SIZE = 5000
+
     def __init__(self, export_path: Optional[Path] = None) -> None:
         self._export_path = export_path or (settings.TRAINING_DATA_DIR / "priority_feedback.csv")
         self._export_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
 
     @property
     def export_path(self) -> Path:
         return self._export_path
 
+    @property
+    def state_path(self) -> Path:
+        return self._export_path.with_suffix(".state.json")
+
+    @property
+    def lock_path(self) -> Path:
+        return self._export_path.with_suffix(".lock")
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Serialize exports and compaction across threads and processes."""
+
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with self.lock_path.open("a") as lock_fp:
+                fcntl.flock(lock_fp.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fp.fileno(), fcntl.LOCK_UN)
+
     def export_priority_feedback_dataset(self, db: Session) -> Path:
-        """Materialise all priority feedback logs into a CSV file.
+        """Append feedback recorded since the last export to the CSV file.
 
         The dataset consolidates ML and LLM predictions alongside manual
         corrections so that offline training scripts can bootstrap from a
-        single artefact.
+        single artefact. Without a previous export this is a full compaction.
         """
 
-        logs: Iterable[MLPredictionLog] = (
-            db.query(MLPredictionLog)
-            .options(
-                joinedload(MLPredictionLog.ticket),
-                joinedload(MLPredictionLog.feedback_author),
-            )
-            .filter(MLPredictionLog.priority_final.isnot(None))
-            .order_by(MLPredictionLog.created_at.desc())
-            .all()
-        )
+        with self._exclusive():
+            state = self._load_state()
+            if state is None or not self.export_path.exists():
+                return self._compact(db)
+
+            watermark = datetime.fromisoformat(state["watermark"]) if state["watermark"] else None
+            recent = {(log_id, recorded_at) for log_id, recorded_at in state.get("recent", [])}
+
+            query = self._feedback_query()
+            if watermark is not None:
+                since = watermark - timedelta(seconds=self.EXPORT_OVERLAP_SECONDS)
+                query = query.where(MLPredictionLog.priority_feedback_recorded_at >= since)
+            else:
+                query = query.where(MLPredictionLog.priority_feedback_recorded_at.isnot(None))
 
-        with self.export_path.open("w", encoding="utf-8", newline="") as fp:
-            writer = csv.DictWriter(
-                fp,
-                fieldnames=[
-                    "ticket_id",
-                    "created_at",
-                    "updated_at",
-                    "full_text",
-                    "priority_ml",
-                    "priority_ml_confidence",
-                    "priority_llm",
-                    "priority_llm_confidence",
-                    "priority_final",
-                    "priority_feedback_previous",
-                    "priority_feedback_reason",
-                    "priority_feedback_author",
-                    "priority_feedback_recorded_at",
-                    "triage_reason",
-                ],
+            rows = [
+                row for row in db.execute(query)
+                if (row.id, row.priority_feedback_recorded_at.isoformat()) not in recent
+            ]
+            if not rows:
+                return self.export_path
+
+            # One write per export keeps concurrent appends from interleaving rows
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=FIELDNAMES)
+            for row in rows:
+                writer.writerow(_row_to_dict(row))
+            with self.export_path.open("a", encoding="utf-8", newline="") as fp:
+                fp.write(buffer.getvalue())
+
+            recent.update((row.id, row.priority_feedback_recorded_at.isoformat()) for row in rows)
+            watermark = max(filter(None, [watermark, rows[-1].priority_feedback_recorded_at]))
+
+            state.update(
+                watermark=watermark.isoformat(),
+                recent=[list(pair) for pair in sorted(self._prune_recent(recent, watermark))],
+                appended_rows=state.get("appended_rows", 0) + len(rows),
             )
+            self._save_state(state)
+
+        return self.export_path
+
+    def compact_priority_feedback_dataset(self, db: Session) -> Path:
+        """Rewrite the CSV from the database with one row per feedback log."""
+
+        with self._exclusive():
+            return self._compact(db)
+
+    def _compact(self, db: Session) -> Path:
+        query = self._feedback_query().execution_options(yield_per=self.BATCH_SIZE)
+
+        rows = 0
+        watermark: Optional[datetime] = None
+        recent: Set[Tuple[int, str]] = set()
+
+        tmp_path = self.export_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8", newline="") as fp:
+            writer = csv.DictWriter(fp, fieldnames=FIELDNAMES)
             writer.writeheader()
 
-            for log in logs:
-                ticket = log.ticket
-                full_text = None
-                created_at = None
-                updated_at = None
-                if ticket is not None:
-                    title = ticket.title or ""
-                    description = ticket.description or ""
-                    full_text = f"{title}\n{description}".strip()
-                    created_at = ticket.created_at.isoformat() if ticket.created_at else None
-                    updated_at = ticket.updated_at.isoformat() if ticket.updated_at else None
-
-                writer.writerow(
-                    {
-                        "ticket_id": log.ticket_id,
-                        "created_at": created_at,
-                        "updated_at": updated_at,
-                        "full_text": full_text,
-                        "priority_ml": _enum_to_str(log.priority_predicted),
-                        "priority_ml_confidence": log.priority_confidence,
-                        "priority_llm": _enum_to_str(log.priority_llm_predicted),
-                        "priority_llm_confidence": log.priority_llm_confidence,
-                        "priority_final": _enum_to_str(log.priority_final),
-                        "priority_feedback_previous": _enum_to_str(log.priority_feedback_previous),
-                        "priority_feedback_reason": log.priority_feedback_reason,
-                        "priority_feedback_author": (log.feedback_author.email if log.feedback_author else None),
-                        "priority_feedback_recorded_at": (
-                            log.priority_feedback_recorded_at.isoformat()
-                            if log.priority_feedback_recorded_at
-                            else None
-                        ),
-                        "triage_reason": _enum_to_str(log.triage_reason),
-                    }
-                )
+            for partition in db.execute(query).partitions():
+                for row in partition:
+                    writer.writerow(_row_to_dict(row))
+                    rows += 1
+
+                    recorded_at = row.priority_feedback_recorded_at
+                    if recorded_at is not None:
+                        # Rows are ordered by recorded_at: the last one is the high-water mark
+                        watermark = recorded_at
+                        recent.add((row.id, recorded_at.isoformat()))
+                if watermark is not None:
+                    recent = self._prune_recent(recent, watermark)
 
+        os.replace(tmp_path, self.export_path)
+        self._save_state({
+            "watermark": watermark.isoformat() if watermark else None,
+            "recent": [list(pair) for pair in sorted(recent)],
+            "rows": rows,
+            "appended_rows": 0,
+            "compacted_at": datetime.utcnow().isoformat(),
+        })
+
+        print(f"[TRAINING_FEEDBACK] Compacted {self.export_path} ({rows} rows)")
         return self.export_path
 
+    def _prune_recent(self, recent: Iterable[Tuple[int, str]], watermark: datetime) -> Set[Tuple[int, str]]:
+        """(log_id, recorded_at) pairs that the next export query can still return."""
+
+        since = (watermark - timedelta(seconds=self.EXPORT_OVERLAP_SECONDS)).isoformat()
+        return {pair for pair in recent if pair[1] >= since}
+
+    @staticmethod
+    def _feedback_query():
+        """Flat feedback rows ordered by recorded_at (legacy rows without it first)."""
+
+        return (
+            select(
+                MLPredictionLog.id,
+                MLPredictionLog.ticket_id,
+                Ticket.title,
+                Ticket.description,
+                Ticket.created_at,
+                Ticket.updated_at,
+                MLPredictionLog.priority_predicted,
+                MLPredictionLog.priority_confidence,
+                MLPredictionLog.priority_llm_predicted,
+                MLPredictionLog.priority_llm_confidence,
+                MLPredictionLog.priority_final,
+                MLPredictionLog.priority_feedback_previous,
+                MLPredictionLog.priority_feedback_reason,
+                User.email.label("author_email"),
+                MLPredictionLog.priority_feedback_recorded_at,
+                MLPredictionLog.triage_reason,
+            )
+            .outerjoin(Ticket, Ticket.id == MLPredictionLog.ticket_id)
+            .outerjoin(User, User.id == MLPredictionLog.priority_feedback_author_id)
+            .where(MLPredictionLog.priority_final.isnot(None))
+            .order_by(
+                MLPredictionLog.priority_feedback_recorded_at.asc().nulls_first(),
+                MLPredictionLog.id,
+            )
+        )
+
+    def _load_state(self) -> Optional[Dict]:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            print(f"[TRAINING_FEEDBACK] Ignoring unreadable export state: {exc}")
+            return None
+
+    def _save_state(self, state: Dict) -> None:
+        tmp_path = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+
+
+def _row_to_dict(row) -> Dict[str, object]:
+    full_text = None
+    if row.title is not None or row.description is not None:
+        full_text = f"{row.title or ''}\n{row.description or ''}".strip()
+
+    return {
+        "ticket_id": row.ticket_id,
+        "created_at": _isoformat(row.created_at),
+        "updated_at": _isoformat(row.updated_at),
+        "full_text": full_text,
+        "priority_ml": _enum_to_str(row.priority_predicted),
+        "priority_ml_confidence": row.priority_confidence,
+        "priority_llm": _enum_to_str(row.priority_llm_predicted),
+        "priority_llm_confidence": row.priority_llm_confidence,
+        "priority_final": _enum_to_str(row.priority_final),
+        "priority_feedback_previous": _enum_to_str(row.priority_feedback_previous),
+        "priority_feedback_reason": row.priority_feedback_reason,
+        "priority_feedback_author": row.author_email,
+        "priority_feedback_recorded_at": _isoformat(row.priority_feedback_recorded_at),
+        "triage_reason": _enum_to_str(row.triage_reason),
+        "log_id": row.id,
+    }
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
 
 def _enum_to_str(value: Optional[Enum]) -> Optional[str]:
     if value is None:
@@ -0,0 +1,208 @@
+"""
+Training Worker Service - навчання ML моделі в окремому процесі.
+
+Навчання (vectorize + fit) - CPU-bound робота, яка в потоці API чи scheduler-а
+конкурує з обробкою запитів за GIL. Тому:
+1. API/scheduler створює MLTrainingJob (QUEUED) і одразу повертає його id
+2. Job виконується в ProcessPoolExecutor (spawn, окремий процес на кожен job)
+3. Worker оновлює phase/progress в ml_training_jobs і між фазами перевіряє
+   cancel_requested
+4. Після завершення основний процес перезавантажує ml_model, якщо нову
+   модель активовано
+
+Перевірку активного job і його створення процеси виконують під lease
+SUBMIT_LEASE: два uvicorn workers не поставлять у чергу два jobs одночасно.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.ml_model_metadata import MLTrainingJob
+from app.services.active_learning_service import active_learning_service
+from app.services.scheduler_lease_service import scheduler_lease_service
+
+
+def _run_training_job(job_id: int, auto_activate: bool) -> Dict:
+    """
+    Точка входу worker-процесу (функція модуля, щоб її можна було передати в pool).
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(MLTrainingJob, job_id)
+        if job is None:
+            return {"status": "MISSING", "model_version": None, "activated": False}
+
+        try:
+            active_learning_service.run_job(db, job)
+        except Exception:
+            # run_job вже записав FAILED і error_message
+            pass
+
+        activated = False
+        if auto_activate and job.status == "COMPLETED":
+            activated = active_learning_service.activate_if_better(db, job)
+
+        return {"status": job.status, "model_version": job.model_version, "activated": activated}
+    finally:
+        db.close()
+
+
+class TrainingSubmitConflict(Exception):
+    """Інший процес саме ставить training job у чергу (lease SUBMIT_LEASE зайнята)."""
+
+
+class TrainingWorkerService:
+    """
+    Сервіс для запуску training jobs у фоновому процесі.
+    """
+
+    # Одночасно навчається не більше однієї моделі
+    MAX_WORKERS = 1
+
+    # QUEUED/RUNNING jobs, старші за це, вважаються перерваними (впав процес)
+    STALE_JOB_HOURS = 6
+
+    ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+
+    # Lease, під якою процес перевіряє активний job і створює новий
+    SUBMIT_LEASE = "training_submit"
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Lease належить процесу, тому потоки одного процесу серіалізуються окремо
+        self._submit_lock = threading.Lock()
+
+    def submit(
+        self,
+        db: Session,
+        training_type: str,
+        auto_activate: bool = True,
+    ) -> Tuple[MLTrainingJob, bool]:
+        """
+        Ставить навчання в чергу і одразу повертає job.
+
+        Returns:
+            (job, created): якщо вже є активний job - повертається він і created=False
+
+        Raises:
+            TrainingSubmitConflict: інший процес одночасно ставить job у чергу
+        """
+        with self._submit_lock:
+            if not scheduler_lease_service.try_acquire(db, self.SUBMIT_LEASE):
+                raise TrainingSubmitConflict("Another training job is being queued right now")
+            try:
+                active_job = self.get_active_job(db)
+                if active_job is not None:
+                    return active_job, False
+
+                job = active_learning_service.create_job(db, training_type, status="QUEUED")
+            finally:
+                scheduler_lease_service.release(db, self.SUBMIT_LEASE)
+
+        try:
+            future = self._get_executor().submit(_run_training_job, job.id, auto_activate)
+        except BrokenProcessPool:
+            # Попередній worker впав - pool непридатний, створюємо новий
+            self._reset_executor()
+            future = self._get_executor().submit(_run_training_job, job.id, auto_activate)
+        future.add_done_callback(partial(self._on_job_done, job.id))
+
+        print(f"[TrainingWorker] Job {job.id} ({training_type}) queued")
+        return job, True
+
+    def cancel(self, db: Session, job: MLTrainingJob) -> MLTrainingJob:
+        """
+        Запитує скасування job. Worker зупиниться на найближчій межі фаз;
+        job, що ще не стартував, одразу отримує статус CANCELLED.
+        """
+        job.cancel_requested = True
+        if job.status == "QUEUED":
+            job.status = "CANCELLED"
+            job.completed_at = datetime.utcnow()
+        db.commit()
+        db.refresh(job)
+
+        print(f"[TrainingWorker] Cancellation requested for job {job.id}")
+        return job
+
+    def get_active_job(self, db: Session) -> Optional[MLTrainingJob]:
+        """Поточний QUEUED/RUNNING job (без завислих після падіння процесу)."""
+        stale_before = datetime.utcnow() - timedelta(hours=self.STALE_JOB_HOURS)
+        return (
+            db.query(MLTrainingJob)
+            .filter(
+                MLTrainingJob.status.in_(self.ACTIVE_STATUSES),
+                MLTrainingJob.started_at > stale_before,
+            )
+            .order_by(MLTrainingJob.started_at.desc())
+            .first()
+        )
+
+    def shutdown(self) -> None:
+        """Зупиняє pool; job в черзі скасовуються, поточний дораховує сам."""
+        self._reset_executor()
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: дочірній процес не успадковує потоки/з'єднання БД батька
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.MAX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=1,
+                )
+            return self._executor
+
+    def _on_job_done(self, job_id: int, future: Future) -> None:
+        """Callback в основному процесі після завершення job."""
+        if future.cancelled():
+            self._mark_failed(job_id, "Training worker shut down before the job started")
+            return
+
+        try:
+            result = future.result()
+        except Exception as e:
+            # Процес worker-а впав (наприклад, OOM) - job не встиг записати статус
+            print(f"[TrainingWorker] Job {job_id} crashed: {e}")
+            self._mark_failed(job_id, f"Training worker crashed: {e}")
+            return
+
+        print(f"[TrainingWorker] Job {job_id} finished: {result['status']}")
+
+        if result["activated"]:
+            from app.ml_model import ml_model
+
+            try:
+                ml_model.load()
+            except Exception as e:
+                print(f"[TrainingWorker] WARNING: Не вдалося перезавантажити модель: {e}")
+
+    @staticmethod
+    def _mark_failed(job_id: int, message: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.get(MLTrainingJob, job_id)
+            if job is not None and job.status in TrainingWorkerService.ACTIVE_STATUSES:
+                job.status = "FAILED"
+                job.completed_at = datetime.utcnow()
+                job.error_message = message
+                db.commit()
+        finally:
+            db.close()
+
+
+training_worker_service = TrainingWorkerService()
@@ -0,0 +1,162 @@
+"""
+Workload Service - інкрементальні лічильники активних тікетів агентів.
+
+Замість COUNT по таблиці tickets на кожного агента:
+1. TicketService викликає on_ticket_changed в тій самій транзакції, що і зміну тікета
+2. Assignment-сервіси читають лічильники з agent_workload (O(1) на агента)
+3. Періодична reconciliation-задача перераховує лічильники і виправляє дрейф
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models.agent_workload import AgentWorkload
+from app.models.ticket import Ticket
+from app.core.enums import StatusEnum
+
+
+class WorkloadService:
+    """
+    Сервіс для підтримки таблиці agent_workload.
+    """
+
+    # Статуси, які вважаються активним навантаженням
+    ACTIVE_STATUSES = (StatusEnum.NEW, StatusEnum.TRIAGE, StatusEnum.IN_PROGRESS)
+
+    # Як часто scheduler запускає reconciliation
+    RECONCILE_INTERVAL_MINUTES = 15
+
+    @staticmethod
+    def on_ticket_changed(
+        db: Session,
+        ticket: Ticket,
+        previous_assignee_id: Optional[int],
+        previous_status: Optional[StatusEnum],
+    ) -> None:
+        """
+        Оновлює лічильники після зміни assignee/статусу тікета.
+
+        Викликається до db.commit(), тому лічильник комітиться разом з тікетом.
+
+        Args:
+            db: Database session
+            ticket: Тікет вже з новими значеннями
+            previous_assignee_id: Assignee до зміни (None для нового тікета)
+            previous_status: Статус до зміни (None для нового тікета)
+        """
+        was_active = (
+            previous_assignee_id is not None
+            and previous_status in WorkloadService.ACTIVE_STATUSES
+        )
+        is_active = (
+            ticket.assigned_to_user_id is not None
+            and ticket.status in WorkloadService.ACTIVE_STATUSES
+        )
+
+        if was_active and is_active and previous_assignee_id == ticket.assigned_to_user_id:
+            return
+
+        if was_active:
+            WorkloadService._adjust(db, previous_assignee_id, -1)
+        if is_active:
+            WorkloadService._adjust(db, ticket.assigned_to_user_id, 1)
+
+    @staticmethod
+    def _adjust(db: Session, user_id: int, delta: int) -> None:
+        """
+        Атомарно змінює лічильник агента на delta.
+
+        Якщо рядка ще немає - створює його з фактичним значенням з tickets
+        (зміна тікета вже має бути в сесії, тому робимо flush перед COUNT).
+        Якщо паралельна транзакція створила рядок першою (конфлікт PK),
+        повторюємо UPDATE: її значення не містить нашої зміни.
+        """
+        if WorkloadService._increment(db, user_id, delta):
+            return
+
+        db.flush()
+        active_tickets = db.query(func.count(Ticket.id)).filter(
+            Ticket.assigned_to_user_id == user_id,
+            Ticket.status.in_(WorkloadService.ACTIVE_STATUSES)
+        ).scalar()
+
+        try:
+            # Savepoint: конфлікт не відкочує зміну тікета в зовнішній транзакції
+            with db.begin_nested():
+                db.add(AgentWorkload(user_id=user_id, active_tickets=active_tickets))
+        except IntegrityError:
+            WorkloadService._increment(db, user_id, delta)
+
+    @staticmethod
+    def _increment(db: Session, user_id: int, delta: int) -> bool:
+        updated = (
+            db.query(AgentWorkload)
+            .filter(AgentWorkload.user_id == user_id)
+            .update(
+                {AgentWorkload.active_tickets: AgentWorkload.active_tickets + delta},
+                synchronize_session=False,
+            )
+        )
+        return bool(updated)
+
+    @staticmethod
+    def get_active_counts(agent_ids: List[int], db: Session) -> Dict[int, int]:
+        """
+        Повертає кількість активних тікетів для списку агентів одним запитом по PK.
+
+        Returns:
+            Dict[agent_id, active_tickets]; агенти без рядка в agent_workload відсутні
+        """
+        if not agent_ids:
+            return {}
+
+        rows = (
+            db.query(AgentWorkload.user_id, AgentWorkload.active_tickets)
+            .filter(AgentWorkload.user_id.in_(agent_ids))
+            .all()
+        )
+
+        return {user_id: active_tickets for user_id, active_tickets in rows}
+
+    @staticmethod
+    def reconcile(db: Session) -> int:
+        """
+        Перераховує всі лічильники з таблиці tickets і виправляє розбіжності.
+
+        Returns:
+            Кількість агентів, у яких лічильник було виправлено
+        """
+        actual = dict(
+            db.query(Ticket.assigned_to_user_id, func.count(Ticket.id))
+            .filter(
+                Ticket.assigned_to_user_id.isnot(None),
+                Ticket.status.in_(WorkloadService.ACTIVE_STATUSES)
+            )
+            .group_by(Ticket.assigned_to_user_id)
+            .all()
+        )
+
+        fixed = 0
+        stored = {row.user_id: row for row in db.query(AgentWorkload).all()}
+
+        for user_id, row in stored.items():
+            expected = actual.pop(user_id, 0)
+            if row.active_tickets != expected:
+                row.active_tickets = expected
+                fixed += 1
+
+        for user_id, expected in actual.items():
+            db.add(AgentWorkload(user_id=user_id, active_tickets=expected))
+            fixed += 1
+
+        db.commit()
+
+        if fixed:
+            print(f"[WORKLOAD] Reconciled {fixed} agent workload counter(s)")
+
+        return fixed
+
+
+workload_service = WorkloadService()
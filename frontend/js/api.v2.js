@@ -3,6 +3,7 @@
  */
 
 const API_BASE = 'http://127.0.0.1:8000';
+const TICKETS_PAGE_SIZE = 100;  // сторінка списку/Board, далі - "Завантажити ще"
 
 class ApiClient {
     constructor() {
@@ -20,6 +21,12 @@ class ApiClient {
     }
 
     async request(endpoint, options = {}) {
+        const { data } = await this.requestWithResponse(endpoint, options);
+        return data;
+    }
+
+    // Як request, але повертає і Response (для заголовків пагінації)
+    async requestWithResponse(endpoint, options = {}) {
         const url = `${API_BASE}${endpoint}`;
         const config = {
             ...options,
@@ -34,7 +41,7 @@ class ApiClient {
                 throw new Error(data.detail || 'Request failed');
             }
 
-            return data;
+            return { data, response };
         } catch (error) {
             console.error('API Error:', error);
             throw error;
@@ -64,15 +71,32 @@ class ApiClient {
     }
 
     // Tickets
-    async getTickets(filters = {}) {
+    ticketQuery(filters = {}) {
         const params = new URLSearchParams();
         Object.keys(filters).forEach(key => {
             if (filters[key] !== null && filters[key] !== undefined) {
-                params.append(key, filters[key]);
+                params.set(key, filters[key]);
             }
         });
-        const queryString = params.toString();
-        return this.request(`/tickets${queryString ? '?' + queryString : ''}`);
+        return params;
+    }
+
+    // Одна сторінка тікетів за фільтрами; cursor - nextCursor попередньої сторінки
+    async getTickets(filters = {}, cursor = null) {
+        const params = this.ticketQuery(filters);
+        params.set('limit', TICKETS_PAGE_SIZE);
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+
+        const { data, response } = await this.requestWithResponse(`/tickets?${params.toString()}`);
+        return { tickets: data, nextCursor: response.headers.get('X-Next-Cursor') };
+    }
+
+    // Лічильники тікетів за тими самими фільтрами (без завантаження сторінок)
+    async getTicketStats(filters = {}) {
+        const query = this.ticketQuery(filters).toString();
+        return this.request(`/tickets/stats${query ? `?${query}` : ''}`);
     }
 
     async getTicket(id) {
@@ -0,0 +1,43 @@
+"""add_agent_workload
+
+Revision ID: 7c1f2a9d4e30
+Revises: 431101891901
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1f2a9d4e30'
+down_revision: Union[str, Sequence[str], None] = '431101891901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('agent_workload',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('active_tickets', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Початкове заповнення лічильників з поточних тікетів
+    op.execute(
+        "INSERT INTO agent_workload (user_id, active_tickets, updated_at) "
+        "SELECT assigned_to_user_id, COUNT(id), CURRENT_TIMESTAMP FROM tickets "
+        "WHERE assigned_to_user_id IS NOT NULL "
+        "AND status IN ('NEW', 'TRIAGE', 'IN_PROGRESS') "
+        "GROUP BY assigned_to_user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_workload')
@@ -0,0 +1,42 @@
+"""add_model_benchmark_columns
+
+Revision ID: a7d3e91f5c20
+Revises: f2c6d8a4b913
+Create Date: 2026-10-19 19:12:40.318227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e91f5c20'
+down_revision: Union[str, Sequence[str], None] = 'f2c6d8a4b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ml_model_metadata', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('benchmark_p50_ms', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('benchmark_p99_ms', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('benchmark_throughput', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('benchmark_load_ms', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('benchmark_artifact_bytes', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('benchmark_rss_mb', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('benchmarked_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ml_model_metadata', schema=None) as batch_op:
+        batch_op.drop_column('benchmarked_at')
+        batch_op.drop_column('benchmark_rss_mb')
+        batch_op.drop_column('benchmark_artifact_bytes')
+        batch_op.drop_column('benchmark_load_ms')
+        batch_op.drop_column('benchmark_throughput')
+        batch_op.drop_column('benchmark_p99_ms')
+        batch_op.drop_column('benchmark_p50_ms')
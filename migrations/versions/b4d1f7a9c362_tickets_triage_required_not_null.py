@@ -0,0 +1,37 @@
+"""tickets_triage_required_not_null
+
+Revision ID: b4d1f7a9c362
+Revises: e3b7c1d05a92
+Create Date: 2026-10-20 10:14:37.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d1f7a9c362'
+down_revision: Union[str, Sequence[str], None] = 'e3b7c1d05a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL ламає keyset курсор (triage_required, created_at, id) у списку тікетів
+    op.execute("UPDATE tickets SET triage_required = false WHERE triage_required IS NULL")
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.alter_column('triage_required',
+               existing_type=sa.Boolean(),
+               nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.alter_column('triage_required',
+               existing_type=sa.Boolean(),
+               nullable=True)
@@ -0,0 +1,41 @@
+"""seed_ml_feedback_counter
+
+Revision ID: b8e4f02a6d71
+Revises: a7d3e91f5c20
+Create Date: 2026-10-19 20:03:17.604512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f02a6d71'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e91f5c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Лічильник feedback стартує з кількості feedback після останнього навчання,
+    # щоб перенавчання за подіями не чекало повного нового порогу
+    op.execute(
+        "INSERT INTO cache_versions (name, version, updated_at) "
+        "SELECT 'ml_feedback', COUNT(id), CURRENT_TIMESTAMP FROM ml_prediction_logs "
+        "WHERE priority_final IS NOT NULL AND ("
+        "NOT EXISTS (SELECT 1 FROM ml_training_jobs WHERE status = 'COMPLETED') "
+        "OR priority_feedback_recorded_at > "
+        "(SELECT MAX(completed_at) FROM ml_training_jobs WHERE status = 'COMPLETED'))"
+    )
+    op.execute(
+        "INSERT INTO cache_versions (name, version, updated_at) "
+        "VALUES ('ml_feedback_trained', 0, CURRENT_TIMESTAMP)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM cache_versions WHERE name IN ('ml_feedback', 'ml_feedback_trained')")
@@ -0,0 +1,43 @@
+"""add_scheduler_leases
+
+Revision ID: c6f1a8e3b254
+Revises: b8e4f02a6d71
+Create Date: 2026-10-19 20:41:05.927134
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1a8e3b254'
+down_revision: Union[str, Sequence[str], None] = 'b8e4f02a6d71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('holder', sa.String(length=100), nullable=False),
+    sa.Column('acquired_at', sa.DateTime(), nullable=False),
+    sa.Column('renewed_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    with op.batch_alter_table('ml_training_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('queued_by', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('executed_by', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ml_training_jobs', schema=None) as batch_op:
+        batch_op.drop_column('executed_by')
+        batch_op.drop_column('queued_by')
+
+    op.drop_table('scheduler_leases')
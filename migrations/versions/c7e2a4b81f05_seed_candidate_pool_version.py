@@ -0,0 +1,33 @@
+"""seed_candidate_pool_version
+
+Revision ID: c7e2a4b81f05
+Revises: b4d1f7a9c362
+Create Date: 2026-10-20 14:41:09.338217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a4b81f05'
+down_revision: Union[str, Sequence[str], None] = 'b4d1f7a9c362'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Рядок версії пулів кандидатів існує заздалегідь: writers лише роблять UPDATE
+    op.execute(
+        "INSERT INTO cache_versions (name, version, updated_at) "
+        "SELECT 'candidate_pool', 0, CURRENT_TIMESTAMP "
+        "WHERE NOT EXISTS (SELECT 1 FROM cache_versions WHERE name = 'candidate_pool')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM cache_versions WHERE name = 'candidate_pool'")
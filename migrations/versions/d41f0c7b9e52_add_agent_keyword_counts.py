@@ -0,0 +1,103 @@
+"""add_agent_keyword_counts
+
+Revision ID: d41f0c7b9e52
+Revises: b3e8d51f6a27
+Create Date: 2026-10-19 15:40:08.512934
+
+"""
+from collections import Counter, defaultdict
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f0c7b9e52'
+down_revision: Union[str, Sequence[str], None] = 'b3e8d51f6a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Токенізатор і константи заморожені на момент ревізії: міграція не залежить
+# від подальших змін LearningService
+MAX_KEYWORD_LENGTH = 100
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
+    'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'should', 'could', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her',
+    'its', 'our', 'their', 'me', 'him', 'us', 'them',
+    'і', 'в', 'на', 'з', 'до', 'за', 'про', 'як', 'не', 'що', 'це', 'той',
+    'та', 'або', 'але', 'я', 'ти', 'він', 'вона', 'воно', 'ми', 'ви', 'вони',
+    'мій', 'твій', 'його', 'її', 'наш', 'ваш', 'їх', 'мене', 'тебе', 'нас', 'вас', 'їх'
+}
+
+
+def _ticket_keyword_counts(title, description) -> Counter:
+    text = f"{title or ''}\n{description or ''}".lower()
+    return Counter(
+        w for w in re.findall(r'\b\w+\b', text)
+        if len(w) > 2 and w not in STOP_WORDS and len(w) <= MAX_KEYWORD_LENGTH
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('agent_keyword_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('keyword', sa.String(length=100), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'keyword')
+    )
+    op.create_index(op.f('ix_agent_keyword_counts_keyword'), 'agent_keyword_counts', ['keyword'], unique=False)
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('expertise_user_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_tickets_expertise_user_id', 'users', ['expertise_user_id'], ['id'])
+
+    # Початкове заповнення профілів з історії вирішених тікетів
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, title, description, assigned_to_user_id, auto_assigned, assignment_confirmed "
+        "FROM tickets WHERE status IN ('RESOLVED', 'CLOSED') AND assigned_to_user_id IS NOT NULL"
+    )).fetchall()
+
+    profiles = defaultdict(Counter)
+    credited = defaultdict(list)
+    for ticket_id, title, description, agent_id, auto_assigned, confirmed in rows:
+        if auto_assigned and not confirmed:
+            continue
+        profiles[agent_id].update(_ticket_keyword_counts(title, description))
+        credited[agent_id].append(ticket_id)
+
+    for agent_id, counts in profiles.items():
+        if counts:
+            bind.execute(
+                sa.text(
+                    "INSERT INTO agent_keyword_counts (user_id, keyword, count, updated_at) "
+                    "VALUES (:user_id, :keyword, :count, CURRENT_TIMESTAMP)"
+                ),
+                [{"user_id": agent_id, "keyword": kw, "count": cnt} for kw, cnt in counts.items()],
+            )
+        bind.execute(
+            sa.text("UPDATE tickets SET expertise_user_id = :user_id WHERE id IN :ids").bindparams(
+                sa.bindparam("ids", expanding=True)
+            ),
+            {"user_id": agent_id, "ids": credited[agent_id]},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_tickets_expertise_user_id', type_='foreignkey')
+        batch_op.drop_column('expertise_user_id')
+
+    op.drop_index(op.f('ix_agent_keyword_counts_keyword'), table_name='agent_keyword_counts')
+    op.drop_table('agent_keyword_counts')
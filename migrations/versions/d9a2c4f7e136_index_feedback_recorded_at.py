@@ -0,0 +1,30 @@
+"""index_feedback_recorded_at
+
+Revision ID: d9a2c4f7e136
+Revises: c6f1a8e3b254
+Create Date: 2026-10-19 21:15:48.210377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a2c4f7e136'
+down_revision: Union[str, Sequence[str], None] = 'c6f1a8e3b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ml_prediction_logs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ml_prediction_logs_priority_feedback_recorded_at'), ['priority_feedback_recorded_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ml_prediction_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ml_prediction_logs_priority_feedback_recorded_at'))
@@ -0,0 +1,30 @@
+"""index_tickets_list_order
+
+Revision ID: e3b7c1d05a92
+Revises: d9a2c4f7e136
+Create Date: 2026-10-19 23:02:11.583104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c1d05a92'
+down_revision: Union[str, Sequence[str], None] = 'd9a2c4f7e136'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_tickets_list_order', ['triage_required', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_tickets_list_order')
@@ -0,0 +1,103 @@
+"""add_decayed_keyword_counts
+
+Revision ID: e5a92c3d1b84
+Revises: d41f0c7b9e52
+Create Date: 2026-10-19 17:22:51.093716
+
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a92c3d1b84'
+down_revision: Union[str, Sequence[str], None] = 'd41f0c7b9e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Токенізатор і константи заморожені на момент ревізії: міграція не залежить
+# від подальших змін LearningService і ExpertiseMatrixService
+MAX_KEYWORD_LENGTH = 100
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
+    'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'should', 'could', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her',
+    'its', 'our', 'their', 'me', 'him', 'us', 'them',
+    'і', 'в', 'на', 'з', 'до', 'за', 'про', 'як', 'не', 'що', 'це', 'той',
+    'та', 'або', 'але', 'я', 'ти', 'він', 'вона', 'воно', 'ми', 'ви', 'вони',
+    'мій', 'твій', 'його', 'її', 'наш', 'ваш', 'їх', 'мене', 'тебе', 'нас', 'вас', 'їх'
+}
+
+HALF_LIFE_DAYS = 180
+
+
+def _ticket_keyword_counts(title, description) -> Counter:
+    text = f"{title or ''}\n{description or ''}".lower()
+    return Counter(
+        w for w in re.findall(r'\b\w+\b', text)
+        if len(w) > 2 and w not in STOP_WORDS and len(w) <= MAX_KEYWORD_LENGTH
+    )
+
+
+def _decay(value: float, since, now: datetime) -> float:
+    if since is None or now <= since:
+        return value
+    age_days = (now - since).total_seconds() / 86400
+    return value * 0.5 ** (age_days / HALF_LIFE_DAYS)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('agent_keyword_counts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('decayed_count', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('decayed_at', sa.DateTime(), nullable=True))
+
+    # Початкове заповнення: внесок кожного тікета затухає від дати вирішення
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    rows = bind.execute(sa.text(
+        "SELECT title, description, expertise_user_id, COALESCE(resolved_at, closed_at, updated_at) "
+        "FROM tickets WHERE expertise_user_id IS NOT NULL"
+    )).fetchall()
+
+    decayed = defaultdict(float)
+    for title, description, agent_id, resolved_at in rows:
+        if isinstance(resolved_at, str):
+            resolved_at = datetime.fromisoformat(resolved_at)
+        for keyword, count in _ticket_keyword_counts(title, description).items():
+            decayed[(agent_id, keyword)] += _decay(count, resolved_at, now)
+
+    if decayed:
+        bind.execute(
+            sa.text(
+                "UPDATE agent_keyword_counts SET decayed_count = :value, decayed_at = :now "
+                "WHERE user_id = :user_id AND keyword = :keyword"
+            ),
+            [
+                {"value": value, "now": now, "user_id": agent_id, "keyword": keyword}
+                for (agent_id, keyword), value in decayed.items()
+            ],
+        )
+    bind.execute(
+        sa.text("UPDATE agent_keyword_counts SET decayed_at = :now WHERE decayed_at IS NULL"),
+        {"now": now},
+    )
+
+    with op.batch_alter_table('agent_keyword_counts', schema=None) as batch_op:
+        batch_op.alter_column('decayed_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('agent_keyword_counts', schema=None) as batch_op:
+        batch_op.drop_column('decayed_at')
+        batch_op.drop_column('decayed_count')
@@ -0,0 +1,34 @@
+"""add_training_job_progress
+
+Revision ID: f2c6d8a4b913
+Revises: e5a92c3d1b84
+Create Date: 2026-10-19 18:04:12.551203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6d8a4b913'
+down_revision: Union[str, Sequence[str], None] = 'e5a92c3d1b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ml_training_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phase', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('progress', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ml_training_jobs', schema=None) as batch_op:
+        batch_op.drop_column('cancel_requested')
+        batch_op.drop_column('progress')
+        batch_op.drop_column('phase')
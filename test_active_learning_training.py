@@ -0,0 +1,139 @@
+"""
+Тест кроків навчання ActiveLearningService без БД.
+
+Перевіряє, що інкрементальний partial_fit застосовує ваги класів один раз,
+що пошук гіперпараметрів вмикається лише ML_HYPERPARAM_SEARCH і що з нульовим
+бюджетом оцінюється тільки DEFAULT_HYPERPARAMS.
+"""
+import copy
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier
+
+from app.config import settings
+from app.services.active_learning_service import ActiveLearningService
+
+
+def _dataset(classes, n_rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = sparse.csr_matrix(rng.random((n_rows, 20)))
+    # Останній клас - більшість, решта - меншість
+    pattern = list(classes[:-1]) + [classes[-1]] * 3
+    labels = np.array((pattern * n_rows)[:n_rows])
+    return X, labels
+
+
+def _base_model(classes, class_weight):
+    X, labels = _dataset(classes)
+    model = SGDClassifier(max_iter=1000, random_state=42, class_weight=class_weight)
+    model.fit(X, labels)
+    return model
+
+
+def test_partial_fit_matches_unweighted_clone_with_sample_weight():
+    # Для двох класів class_weight рівносильний sample_weight з тими самими вагами
+    class_weight = {"high": 2.5, "low": 0.5}
+    base = _base_model(["high", "low"], class_weight)
+    X_new, labels_new = _dataset(["high", "low"], seed=1)
+
+    weighted = copy.deepcopy(base)
+    ActiveLearningService._partial_fit_step(weighted, X_new, labels_new, class_weight)
+
+    explicit = copy.deepcopy(base)
+    explicit.class_weight = None
+    sample_weight = np.array([class_weight[label] for label in labels_new])
+    explicit.partial_fit(X_new, labels_new, classes=explicit.classes_, sample_weight=sample_weight)
+
+    print(f"[OK] max |coef diff| = {np.abs(weighted.coef_ - explicit.coef_).max():.2e}")
+    assert np.allclose(weighted.coef_, explicit.coef_)
+    assert np.allclose(weighted.intercept_, explicit.intercept_)
+
+
+def test_partial_fit_does_not_square_class_weight():
+    class_weight = {"high": 2.5, "medium": 1.25, "low": 0.5}
+    base = _base_model(["high", "medium", "low"], class_weight)
+    X_new, labels_new = _dataset(["high", "medium", "low"], seed=1)
+
+    step = copy.deepcopy(base)
+    ActiveLearningService._partial_fit_step(step, X_new, labels_new, class_weight)
+
+    # Той самий крок, що й full refit: ваги лише з model.class_weight
+    single = copy.deepcopy(base)
+    single.partial_fit(X_new, labels_new, classes=single.classes_)
+
+    doubled = copy.deepcopy(base)
+    sample_weight = np.array([class_weight[label] for label in labels_new])
+    doubled.partial_fit(X_new, labels_new, classes=doubled.classes_, sample_weight=sample_weight)
+
+    assert np.allclose(step.coef_, single.coef_)
+    assert not np.allclose(step.coef_, doubled.coef_)
+    print("[OK] Ваги класів застосовано один раз")
+
+
+def _search_service(n_rows=150):
+    service = ActiveLearningService()
+    service.SEARCH_N_JOBS = 2
+    X, labels = _dataset(ActiveLearningService.LABELS, n_rows=n_rows)
+    # Без БД: матриця ознак і порівняння з активною моделлю підмінені
+    service._cached_feature_matrix = lambda db, vectorizer: (X, labels)
+    service._compare_with_active = lambda db, X_val, y_val: None
+    return service, X, labels
+
+
+def test_zero_budget_search_evaluates_only_defaults():
+    service, X, labels = _search_service()
+    class_weight = {label: 1.0 for label in ActiveLearningService.LABELS}
+
+    original_budget = settings.ML_SEARCH_BUDGET_SECONDS
+    settings.ML_SEARCH_BUDGET_SECONDS = 0
+    try:
+        params, search = service._search_hyperparameters(X, labels, class_weight)
+    finally:
+        settings.ML_SEARCH_BUDGET_SECONDS = original_budget
+
+    print(f"[OK] Нульовий бюджет: {search['candidates_evaluated']}/{search['candidates_total']} кандидатів")
+    assert params == ActiveLearningService.DEFAULT_HYPERPARAMS
+    assert search["candidates_total"] > 1
+    assert search["candidates_evaluated"] == 1
+    assert [result["params"] for result in search["trace"]] == [ActiveLearningService.DEFAULT_HYPERPARAMS]
+
+
+def test_hyperparameter_search_is_opt_in():
+    service, _, _ = _search_service()
+    calls = []
+    original_search = service._search_hyperparameters
+
+    def recording_search(*args):
+        calls.append(True)
+        return original_search(*args)
+
+    service._search_hyperparameters = recording_search
+
+    original_flag, original_budget = settings.ML_HYPERPARAM_SEARCH, settings.ML_SEARCH_BUDGET_SECONDS
+    settings.ML_SEARCH_BUDGET_SECONDS = 0
+    try:
+        settings.ML_HYPERPARAM_SEARCH = False
+        default_run = service._train_full(db=None, trained_until=datetime.utcnow())
+        assert calls == []
+        assert default_run["metadata"]["hyperparameter_search"] is None
+        assert default_run["metadata"]["hyperparameters"] == ActiveLearningService.DEFAULT_HYPERPARAMS
+
+        settings.ML_HYPERPARAM_SEARCH = True
+        search_run = service._train_full(db=None, trained_until=datetime.utcnow())
+    finally:
+        settings.ML_HYPERPARAM_SEARCH, settings.ML_SEARCH_BUDGET_SECONDS = original_flag, original_budget
+
+    search = search_run["metadata"]["hyperparameter_search"]
+    print(f"[OK] ML_HYPERPARAM_SEARCH=True: {search['candidates_evaluated']} кандидат(ів)")
+    assert calls == [True]
+    assert search["best"]["params"] == search_run["metadata"]["hyperparameters"]
+    assert search_run["model"].alpha == search_run["metadata"]["hyperparameters"]["alpha"]
+
+
+if __name__ == "__main__":
+    test_partial_fit_matches_unweighted_clone_with_sample_weight()
+    test_partial_fit_does_not_square_class_weight()
+    test_zero_budget_search_evaluates_only_defaults()
+    test_hyperparameter_search_is_opt_in()
@@ -0,0 +1,137 @@
+"""
+Тест знімка метрик агентів (AssigneeService.build_snapshot).
+
+Перевіряє, що активні тікети беруться з лічильників agent_workload, досвід -
+з вирішених тікетів по category з fallback на category_ml_suggested, і що
+recommend будує знімок один раз для всіх стратегій, а також що перший
+mark_changed переживає паралельне створення рядка версії пулів.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, Department, Ticket
+from app.core.enums import RoleEnum, StatusEnum, CategoryEnum
+from app.services.assignee_service import AssigneeService, assignee_service
+from app.services.workload_service import workload_service
+from app.models.cache_version import CacheVersion
+from app.services.candidate_pool_service import CandidatePoolService, candidate_pool_service
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    dept = Department(name="Support")
+    creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+    db.add_all([dept, creator])
+    db.flush()
+
+    agent_a = User(email="a@example.com", hashed_password="x", full_name="Agent A",
+                   role=RoleEnum.AGENT, department_id=dept.id)
+    agent_b = User(email="b@example.com", hashed_password="x", full_name="Agent B",
+                   role=RoleEnum.AGENT, department_id=dept.id)
+    db.add_all([agent_a, agent_b])
+    db.flush()
+
+    def ticket(assignee, status, category=None, ml_category=None):
+        return Ticket(
+            title="Laptop", description="Laptop does not boot", status=status,
+            created_by_user_id=creator.id, department_id=dept.id,
+            assigned_to_user_id=assignee.id, category=category, category_ml_suggested=ml_category,
+        )
+
+    db.add_all([
+        ticket(agent_a, StatusEnum.IN_PROGRESS),
+        ticket(agent_a, StatusEnum.NEW),
+        ticket(agent_a, StatusEnum.RESOLVED, category=CategoryEnum.HARDWARE),
+        ticket(agent_b, StatusEnum.CLOSED, ml_category=CategoryEnum.HARDWARE),
+        ticket(agent_b, StatusEnum.CLOSED, ml_category=CategoryEnum.HARDWARE),
+        ticket(agent_b, StatusEnum.CLOSED, category=CategoryEnum.SOFTWARE),
+    ])
+    db.commit()
+    workload_service.reconcile(db)
+
+    candidate_pool_service.invalidate()
+    return db, dept, agent_a, agent_b
+
+
+def test_snapshot_uses_workload_counters_and_category_experience():
+    db, dept, agent_a, agent_b = _make_db()
+
+    snapshot = AssigneeService.build_snapshot([agent_a.id, agent_b.id], CategoryEnum.HARDWARE, db)
+    print(f"[OK] Активні: {snapshot.active_counts}, досвід: {snapshot.experience_counts}")
+    assert snapshot.active_counts == workload_service.get_active_counts([agent_a.id, agent_b.id], db)
+    assert (snapshot.active(agent_a.id), snapshot.active(agent_b.id)) == (2, 0)
+    # A - по category, B - fallback на category_ml_suggested
+    assert (snapshot.experience(agent_a.id), snapshot.experience(agent_b.id)) == (1, 2)
+
+    no_category = AssigneeService.build_snapshot([agent_a.id, agent_b.id], None, db)
+    assert no_category.experience_counts == {}
+    db.close()
+
+
+def test_recommend_builds_snapshot_once():
+    db, dept, agent_a, agent_b = _make_db()
+
+    original_build = AssigneeService.build_snapshot
+    calls = []
+
+    def counting_build(agent_ids, category, session):
+        calls.append(category)
+        return original_build(agent_ids, category, session)
+
+    AssigneeService.build_snapshot = staticmethod(counting_build)
+    try:
+        # Без профілів експертизи recommend переходить до стратегії по категорії
+        chosen = assignee_service.recommend("Printer offline", CategoryEnum.HARDWARE, dept.id, db)
+    finally:
+        AssigneeService.build_snapshot = staticmethod(original_build)
+
+    print(f"[OK] Обрано {chosen.full_name}, знімків: {len(calls)}")
+    assert chosen.id == agent_b.id
+    assert calls == [CategoryEnum.HARDWARE]
+    db.close()
+
+
+def test_mark_changed_retries_update_after_concurrent_insert():
+    db, _, agent_a, _ = _make_db()
+
+    original_increment = CandidatePoolService._increment_version
+    calls = []
+
+    def racing_increment(session):
+        calls.append(True)
+        if len(calls) == 1:
+            # Інша транзакція створює рядок версії між нашим UPDATE і INSERT
+            session.execute(insert(CacheVersion).values(name=CandidatePoolService.VERSION_KEY, version=4))
+            return False
+        return original_increment(session)
+
+    agent_a.full_name = "Agent A renamed"
+    CandidatePoolService._increment_version = staticmethod(racing_increment)
+    try:
+        candidate_pool_service.mark_changed(db)
+    finally:
+        CandidatePoolService._increment_version = staticmethod(original_increment)
+    db.commit()
+
+    version = db.get(CacheVersion, CandidatePoolService.VERSION_KEY).version
+    print(f"[OK] Версія пулів після конфлікту INSERT: {version}")
+    assert len(calls) == 2
+    assert version == 5
+    assert db.get(User, agent_a.id).full_name == "Agent A renamed"
+    db.close()
+
+
+if __name__ == "__main__":
+    test_snapshot_uses_workload_counters_and_category_experience()
+    test_recommend_builds_snapshot_once()
+    test_mark_changed_retries_update_after_concurrent_insert()
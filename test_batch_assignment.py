@@ -0,0 +1,137 @@
+"""
+Тест batch assignment (TicketService.batch_assign).
+
+Перевіряє, що план не перевищує workload_capacity агентів, що тікети
+інших агентів не перепризначаються без reassign=True і що LEAD без
+департаменту не може розподіляти тікети.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, Department, Ticket
+from app.core.enums import RoleEnum, StatusEnum
+from app.routers.tickets import batch_assign_tickets
+from app.schemas.ticket import TicketBatchAssign
+from app.services.ticket_service import ticket_service
+from app.services.workload_service import workload_service
+from app.services.candidate_pool_service import candidate_pool_service
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    dept = Department(name="Network")
+    creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+    db.add_all([dept, creator])
+    db.flush()
+
+    agents = [
+        User(
+            email=f"agent{i}@example.com",
+            hashed_password="x",
+            full_name=f"Agent {i}",
+            role=RoleEnum.AGENT,
+            department_id=dept.id,
+            workload_capacity=2,
+        )
+        for i in range(2)
+    ]
+    db.add_all(agents)
+    db.commit()
+
+    # Кожен тест має власну БД - пул кандидатів будується саме з неї
+    candidate_pool_service.invalidate()
+    return db, dept, creator, agents
+
+
+def _new_ticket(db, dept, creator, assignee_id=None):
+    ticket = Ticket(
+        title="VPN",
+        description="VPN connection drops",
+        status=StatusEnum.NEW,
+        created_by_user_id=creator.id,
+        department_id=dept.id,
+        assigned_to_user_id=assignee_id,
+    )
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def test_batch_respects_capacity():
+    db, dept, creator, agents = _make_db()
+    tickets = [_new_ticket(db, dept, creator) for _ in range(6)]
+
+    plan = ticket_service.batch_assign(department_id=dept.id, ticket_ids=None, apply=True, db=db)
+
+    per_agent = {agent.id: 0 for agent in agents}
+    for item in plan["assignments"]:
+        per_agent[item["assignee_id"]] += 1
+
+    print(f"[OK] Призначено: {per_agent}, без слотів: {plan['unassigned_ticket_ids']}")
+    assert plan["applied"] is True
+    assert per_agent == {agents[0].id: 2, agents[1].id: 2}
+    assert len(plan["unassigned_ticket_ids"]) == len(tickets) - 4
+    assert workload_service.get_active_counts([agent.id for agent in agents], db) == per_agent
+    db.close()
+
+
+def test_explicit_ids_do_not_steal_assigned_tickets():
+    db, dept, creator, agents = _make_db()
+    free_ticket = _new_ticket(db, dept, creator)
+    taken_ticket = _new_ticket(db, dept, creator, assignee_id=agents[0].id)
+    workload_service.reconcile(db)
+
+    plan = ticket_service.batch_assign(
+        department_id=dept.id,
+        ticket_ids=[free_ticket.id, taken_ticket.id],
+        apply=False,
+        db=db,
+    )
+    planned_ids = {item["ticket_id"] for item in plan["assignments"]}
+    assert planned_ids == {free_ticket.id}
+
+    plan = ticket_service.batch_assign(
+        department_id=dept.id,
+        ticket_ids=[free_ticket.id, taken_ticket.id],
+        apply=False,
+        db=db,
+        reassign=True,
+    )
+    planned_ids = {item["ticket_id"] for item in plan["assignments"]}
+    print(f"[OK] reassign=True планує: {sorted(planned_ids)}")
+    assert planned_ids == {free_ticket.id, taken_ticket.id}
+    db.close()
+
+
+def test_lead_without_department_is_rejected():
+    db, dept, creator, agents = _make_db()
+    _new_ticket(db, dept, creator)
+    lead = User(email="lead@example.com", hashed_password="x", role=RoleEnum.LEAD)
+    db.add(lead)
+    db.commit()
+
+    try:
+        batch_assign_tickets(data=TicketBatchAssign(apply=True), current_user=lead, db=db)
+    except HTTPException as exc:
+        print(f"[OK] LEAD без департаменту: {exc.status_code}")
+        assert exc.status_code == 403
+    else:
+        raise AssertionError("LEAD without department must not batch-assign")
+    db.close()
+
+
+if __name__ == "__main__":
+    test_batch_respects_capacity()
+    test_explicit_ids_do_not_steal_assigned_tickets()
+    test_lead_without_department_is_rejected()
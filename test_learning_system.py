@@ -1,32 +1,217 @@
 """
-Тестовий скрипт для перевірки системи навчання на історичних даних
+Тести системи навчання на історичних даних.
+
+test_incremental_expertise_credit_and_debit перевіряє інкрементальний профіль
+експертизи (agent_keyword_counts) на окремій in-memory SQLite базі,
+test_concurrent_keyword_insert_merges_counts - конфлікт паралельної вставки
+нового ключового слова.
+demo_learning_system - ручний прогін підбору спеціалістів на робочій БД
+(запускається через python test_learning_system.py).
 """
-from app.database import SessionLocal
-from app.services.learning_service import learning_service
-from app.models import User
-from app.core.enums import RoleEnum
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, SessionLocal
+from app.services.learning_service import LearningService, learning_service
+from app.models import User, Ticket, AgentKeywordCount
+from app.core.enums import RoleEnum, StatusEnum
+
+
+def _keyword_counts(db, agent_id):
+    return dict(
+        db.query(AgentKeywordCount.keyword, AgentKeywordCount.count)
+        .filter(AgentKeywordCount.user_id == agent_id)
+        .all()
+    )
+
+
+def _change(db, ticket, **fields):
+    for name, value in fields.items():
+        setattr(ticket, name, value)
+    learning_service.on_ticket_changed(db=db, ticket=ticket)
+    db.commit()
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def test_incremental_expertise_credit_and_debit():
+    engine, db = _make_db()
+
+    try:
+        creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+        agent_a = User(email="a@example.com", hashed_password="x", role=RoleEnum.AGENT)
+        agent_b = User(email="b@example.com", hashed_password="x", role=RoleEnum.AGENT)
+        db.add_all([creator, agent_a, agent_b])
+        db.commit()
+
+        ticket = Ticket(
+            title="VPN tunnel",
+            description="VPN tunnel drops every hour",
+            status=StatusEnum.IN_PROGRESS,
+            created_by_user_id=creator.id,
+            assigned_to_user_id=agent_a.id,
+        )
+        db.add(ticket)
+        db.commit()
+
+        # Активний тікет ще не входить у профіль
+        _change(db, ticket)
+        assert _keyword_counts(db, agent_a.id) == {}
+
+        # Resolve: ключові слова зараховуються виконавцю
+        _change(db, ticket, status=StatusEnum.RESOLVED)
+        assert _keyword_counts(db, agent_a.id) == {"vpn": 2, "tunnel": 2, "drops": 1, "every": 1, "hour": 1}
+        assert ticket.expertise_user_id == agent_a.id
+
+        # Повторний виклик без змін не зараховує вдруге
+        _change(db, ticket)
+        assert _keyword_counts(db, agent_a.id)["vpn"] == 2
+
+        # Reopen: внесок списується
+        _change(db, ticket, status=StatusEnum.IN_PROGRESS)
+        assert _keyword_counts(db, agent_a.id) == {}
+        assert ticket.expertise_user_id is None
+
+        # Переназначення вирішеного тікета: з A списується, B зараховується
+        _change(db, ticket, status=StatusEnum.CLOSED)
+        _change(db, ticket, assigned_to_user_id=agent_b.id)
+        print(f"[OK] Профіль B після переназначення: {_keyword_counts(db, agent_b.id)}")
+        assert _keyword_counts(db, agent_a.id) == {}
+        assert _keyword_counts(db, agent_b.id)["vpn"] == 2
+
+        # Непідтверджене автопризначення не входить у профіль
+        _change(db, ticket, auto_assigned=True, assignment_confirmed=None)
+        assert _keyword_counts(db, agent_b.id) == {}
+        _change(db, ticket, assignment_confirmed=True)
+        assert _keyword_counts(db, agent_b.id)["tunnel"] == 2
+    finally:
+        db.close()
+        engine.dispose()
+
 
-def test_learning_system():
+def test_specialist_stats_invalidated_after_commit():
+    engine, db = _make_db()
+
+    try:
+        creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+        agent_a = User(email="a@example.com", hashed_password="x", role=RoleEnum.AGENT)
+        agent_b = User(email="b@example.com", hashed_password="x", role=RoleEnum.AGENT)
+        db.add_all([creator, agent_a, agent_b])
+        db.commit()
+
+        ticket = Ticket(
+            title="Printer jam",
+            description="Printer jam on floor two",
+            status=StatusEnum.RESOLVED,
+            created_by_user_id=creator.id,
+            assigned_to_user_id=agent_a.id,
+        )
+        db.add(ticket)
+        db.commit()
+        _change(db, ticket)
+        learning_service.invalidate_specialist_stats(agent_a.id, agent_b.id)
+        assert learning_service.get_specialist_stats(agent_a.id, db)["total_resolved"] == 1
+
+        # Переназначення: до commit кеш A не чіпаємо, після - скинуто і A, і B
+        previous_assignee_id = ticket.assigned_to_user_id
+        ticket.assigned_to_user_id = agent_b.id
+        db.flush()
+        learning_service.on_ticket_changed(db=db, ticket=ticket, previous_assignee_id=previous_assignee_id)
+        assert agent_a.id in learning_service._stats_cache
+
+        db.commit()
+        assert agent_a.id not in learning_service._stats_cache
+        stats_a = learning_service.get_specialist_stats(agent_a.id, db)
+        stats_b = learning_service.get_specialist_stats(agent_b.id, db)
+        print(f"[OK] Статистика після commit: A={stats_a['total_resolved']}, B={stats_b['total_resolved']}")
+        assert stats_a["total_resolved"] == 0
+        assert stats_b["total_resolved"] == 1
+    finally:
+        learning_service.invalidate_specialist_stats(agent_a.id, agent_b.id)
+        db.close()
+        engine.dispose()
+
+
+def test_concurrent_keyword_insert_merges_counts():
+    engine, db = _make_db()
+
+    try:
+        creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+        agent = User(email="a@example.com", hashed_password="x", role=RoleEnum.AGENT)
+        db.add_all([creator, agent])
+        db.commit()
+
+        ticket = Ticket(
+            title="VPN tunnel",
+            description="VPN tunnel drops",
+            status=StatusEnum.RESOLVED,
+            created_by_user_id=creator.id,
+            assigned_to_user_id=agent.id,
+        )
+        db.add(ticket)
+        db.commit()
+
+        original_insert = LearningService._insert_keyword_count
+
+        def racing_insert(session, agent_id, keyword, count, now):
+            if keyword == "vpn":
+                # Інша транзакція вставляє той самий лічильник між нашим SELECT і INSERT
+                session.execute(insert(AgentKeywordCount).values(
+                    user_id=agent_id, keyword=keyword, count=3,
+                    decayed_count=3.0, decayed_at=datetime.utcnow(),
+                ))
+            return original_insert(session, agent_id, keyword, count, now)
+
+        LearningService._insert_keyword_count = staticmethod(racing_insert)
+        try:
+            _change(db, ticket)
+        finally:
+            LearningService._insert_keyword_count = staticmethod(original_insert)
+
+        counts = _keyword_counts(db, agent.id)
+        print(f"[OK] Профіль після конфлікту INSERT: {counts}")
+        assert counts == {"vpn": 5, "tunnel": 2, "drops": 1}
+        assert ticket.expertise_user_id == agent.id
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def demo_learning_system():
     db = SessionLocal()
     try:
         print("=" * 80)
         print("ТЕСТ СИСТЕМИ НАВЧАННЯ НА ІСТОРИЧНИХ ДАНИХ")
         print("=" * 80)
 
-        # 1. Будуємо профілі експертизи на основі вирішених тікетів
-        print("\n[1] Побудова профілів експертизи всіх спеціалістів...\n")
-        expertise_profiles = learning_service.build_expertise_profiles(db)
+        # 1. Профілі експертизи (оновлюються інкрементально при зміні тікетів)
+        print("\n[1] Профілі експертизи всіх спеціалістів...\n")
+        agent_ids = [
+            agent_id for (agent_id,) in
+            db.query(AgentKeywordCount.user_id).distinct().all()
+        ]
 
-        if not expertise_profiles:
+        if not agent_ids:
             print("[!] Поки що немає вирішених тікетів для аналізу.")
             print("[INFO] Створіть кілька тікетів, призначте їх спеціалістам, та змініть статус на RESOLVED/CLOSED")
             print("[INFO] Після цього система автоматично навчиться на основі цих даних.\n")
         else:
-            print(f"[OK] Знайдено профілі експертизи для {len(expertise_profiles)} спеціалістів:\n")
-            for agent_id, keywords in expertise_profiles.items():
-                agent = db.query(User).filter(User.id == agent_id).first()
+            print(f"[OK] Знайдено профілі експертизи для {len(agent_ids)} спеціалістів:\n")
+            for agent_id in agent_ids:
+                agent = db.get(User, agent_id)
                 if agent:
-                    top_5 = sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:5]
+                    top_5 = sorted(_keyword_counts(db, agent_id).items(), key=lambda x: x[1], reverse=True)[:5]
                     print(f"  • {agent.full_name} ({agent.email})")
                     print(f"    Топ-5 ключових слів: {', '.join([f'{kw}({cnt})' for kw, cnt in top_5])}")
 
@@ -144,12 +329,12 @@ def test_learning_system():
         print("  4. Призначає найбільш досвідченого та доступного спеціаліста")
         print("=" * 80)
 
-    except Exception as e:
-        print(f"[ERROR] Помилка: {e}")
-        import traceback
-        traceback.print_exc()
     finally:
         db.close()
 
+
 if __name__ == "__main__":
-    test_learning_system()
+    test_incremental_expertise_credit_and_debit()
+    test_specialist_stats_invalidated_after_commit()
+    test_concurrent_keyword_insert_merges_counts()
+    demo_learning_system()
@@ -0,0 +1,155 @@
+"""
+Тест потокового експорту ML логів (GET /ml/logs/export).
+
+Перевіряє CSV (заголовок і рядки), JSONL з вибором колонок через columns=,
+400 на невідому колонку, фільтр disagreement_only (NULL LLM/final priority
+не вважається розбіжністю) і фільтри created_from/created_to.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.routers.ml_logs as ml_logs_router
+from app.database import Base
+from app.models import User, Ticket
+from app.models.ml_log import MLPredictionLog
+from app.core.enums import RoleEnum, PriorityEnum
+from app.routers.ml_logs import DEFAULT_EXPORT_COLUMNS, export_ml_logs
+
+EXPORT_DEFAULTS = dict(
+    format="csv", columns=None, created_from=None, created_to=None,
+    model_version=None, disagreement_only=False,
+)
+
+
+def _make_session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+
+    db = factory()
+    admin = User(email="admin@example.com", hashed_password="x", role=RoleEnum.ADMIN)
+    db.add(admin)
+    db.flush()
+    ticket = Ticket(title="VPN", description="VPN drops", created_by_user_id=admin.id)
+    db.add(ticket)
+    db.flush()
+
+    P1, P2, P3 = PriorityEnum.P1, PriorityEnum.P2, PriorityEnum.P3
+    # (ML, LLM, final, день січня)
+    rows = [
+        (P1, P1, P1, 1),      # згода
+        (P1, P2, None, 2),    # розбіжність з LLM
+        (P2, P2, P3, 3),      # розбіжність з final
+        (P3, None, None, 4),  # NULL LLM і final - не розбіжність
+        (P3, None, P3, 5),    # NULL LLM, final збігається - не розбіжність
+    ]
+    db.add_all([
+        MLPredictionLog(
+            ticket_id=ticket.id,
+            priority_predicted=ml,
+            priority_llm_predicted=llm,
+            priority_final=final,
+            model_version="v1",
+            created_at=datetime(2026, 1, day, 9, 0),
+        )
+        for ml, llm, final, day in rows
+    ])
+    db.commit()
+    return engine, factory, db, admin
+
+
+def _body(response) -> str:
+    async def collect():
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk if isinstance(chunk, str) else chunk.decode("utf-8"))
+        return "".join(chunks)
+
+    return asyncio.run(collect())
+
+
+def _export(factory, admin, **params):
+    original = ml_logs_router.SessionLocal
+    ml_logs_router.SessionLocal = factory
+    try:
+        response = export_ml_logs(current_user=admin, **dict(EXPORT_DEFAULTS, **params))
+        return response, _body(response)
+    finally:
+        ml_logs_router.SessionLocal = original
+
+
+def test_csv_export_header_and_rows():
+    engine, factory, db, admin = _make_session_factory()
+
+    response, body = _export(factory, admin)
+    rows = list(csv.reader(io.StringIO(body)))
+    print(f"[OK] CSV: {len(rows) - 1} рядків, заголовок {rows[0]}")
+    assert response.media_type == "text/csv"
+    assert rows[0] == DEFAULT_EXPORT_COLUMNS
+    assert len(rows) == 6
+    first = dict(zip(rows[0], rows[1]))
+    assert first["priority_predicted"] == "P1"
+    assert first["created_at"] == "2026-01-01T09:00:00"
+    db.close()
+    engine.dispose()
+
+
+def test_jsonl_export_selected_columns():
+    engine, factory, db, admin = _make_session_factory()
+
+    response, body = _export(factory, admin, format="jsonl", columns="id, priority_predicted,priority_final")
+    records = [json.loads(line) for line in body.splitlines()]
+    assert response.media_type == "application/x-ndjson"
+    assert len(records) == 5
+    assert all(list(record) == ["id", "priority_predicted", "priority_final"] for record in records)
+    assert (records[2]["priority_predicted"], records[2]["priority_final"]) == ("P2", "P3")
+    assert records[3]["priority_final"] is None
+
+    try:
+        export_ml_logs(current_user=admin, **dict(EXPORT_DEFAULTS, columns="id,password"))
+        raise AssertionError("невідома колонка мала дати 400")
+    except HTTPException as e:
+        print(f"[OK] Невідома колонка: {e.status_code}")
+        assert e.status_code == 400
+        assert "password" in e.detail
+    db.close()
+    engine.dispose()
+
+
+def test_disagreement_and_date_filters():
+    engine, factory, db, admin = _make_session_factory()
+
+    _, body = _export(factory, admin, format="jsonl", columns="created_at", disagreement_only=True)
+    days = [json.loads(line)["created_at"][:10] for line in body.splitlines()]
+    print(f"[OK] disagreement_only: {days}")
+    # Рядки з NULL LLM/final priority без іншої розбіжності відкидаються
+    assert days == ["2026-01-02", "2026-01-03"]
+
+    _, body = _export(
+        factory, admin, format="jsonl", columns="created_at",
+        created_from=datetime(2026, 1, 2), created_to=datetime(2026, 1, 4, 9, 0),
+    )
+    days = [json.loads(line)["created_at"][:10] for line in body.splitlines()]
+    # created_from включно, created_to - ні
+    assert days == ["2026-01-02", "2026-01-03"]
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    test_csv_export_header_and_rows()
+    test_jsonl_export_selected_columns()
+    test_disagreement_and_date_filters()
@@ -0,0 +1,85 @@
+"""
+Тест політики активації моделі (ActiveLearningService.activate_if_better).
+
+Перевіряє, що нова модель порівнюється з активною на спільному holdout,
+що модель з невідомими метриками не активується автоматично і що
+порівняння з іншою версією, ніж поточна активна, не враховується.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.ml_model_metadata import MLModelMetadata, MLTrainingJob
+from app.services.active_learning_service import active_learning_service
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(MLModelMetadata(version="v_active", created_at=datetime.utcnow(), accuracy=0.90, is_active=True))
+    db.commit()
+    return db
+
+
+def _candidate(db, version, accuracy, comparison):
+    db.add(MLModelMetadata(
+        version=version,
+        created_at=datetime.utcnow(),
+        accuracy=accuracy,
+        is_active=False,
+        metadata_json={"active_comparison": comparison},
+    ))
+    db.commit()
+    return MLTrainingJob(model_version=version)
+
+
+def _activate_if_better(db, job):
+    activated = []
+    original = active_learning_service.activate_model
+    active_learning_service.activate_model = lambda session, version: activated.append(version) or True
+    try:
+        result = active_learning_service.activate_if_better(db, job)
+    finally:
+        active_learning_service.activate_model = original
+    return result, activated
+
+
+def test_candidate_compared_on_shared_holdout():
+    db = _make_db()
+
+    # Збережена accuracy активної (0.90) з іншого validation set не враховується
+    job = _candidate(db, "v_better", 0.80, {"version": "v_active", "accuracy": 0.70, "holdout_size": 20})
+    result, activated = _activate_if_better(db, job)
+    assert result is True and activated == ["v_better"]
+
+    job = _candidate(db, "v_worse", 0.80, {"version": "v_active", "accuracy": 0.85, "holdout_size": 20})
+    result, activated = _activate_if_better(db, job)
+    print("[OK] Порівняння на спільному holdout")
+    assert result is False and activated == []
+    db.close()
+
+
+def test_unknown_or_stale_comparison_is_not_activated():
+    db = _make_db()
+
+    job = _candidate(db, "v_unknown", None, None)
+    assert _activate_if_better(db, job) == (False, [])
+
+    job = _candidate(db, "v_stale", 0.99, {"version": "v_other", "accuracy": 0.10, "holdout_size": 20})
+    assert _activate_if_better(db, job) == (False, [])
+    print("[OK] Невідомі метрики / порівняння з іншою версією - без активації")
+    db.close()
+
+
+if __name__ == "__main__":
+    test_candidate_compared_on_shared_holdout()
+    test_unknown_or_stale_comparison_is_not_activated()
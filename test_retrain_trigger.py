@@ -0,0 +1,139 @@
+"""
+Тест debounce перенавчання (RetrainTriggerService).
+
+Перевіряє поріг нових feedback, quiet period після останнього feedback,
+максимальне очікування після попереднього запуску і off-peak вікно.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.database import Base
+from app.models.cache_version import CacheVersion
+from app.services.retrain_trigger_service import RetrainTriggerService, retrain_trigger_service
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _set_counter(db, name, version, updated_at):
+    row = db.get(CacheVersion, name) or CacheVersion(name=name)
+    row.version = version
+    db.add(row)
+    db.flush()
+    # onupdate перезаписав би час - виставляємо його окремим UPDATE
+    db.query(CacheVersion).filter(CacheVersion.name == name).update(
+        {CacheVersion.updated_at: updated_at}, synchronize_session=False
+    )
+    db.commit()
+
+
+def _with_settings(**overrides):
+    saved = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return saved
+
+
+def test_threshold_and_quiet_period():
+    db = _make_db()
+    saved = _with_settings(
+        ML_RETRAIN_QUIET_MINUTES=10,
+        ML_RETRAIN_MAX_WAIT_HOURS=6,
+        ML_RETRAIN_OFFPEAK_START_HOUR=None,
+        ML_RETRAIN_OFFPEAK_END_HOUR=None,
+    )
+    try:
+        now = datetime(2026, 1, 15, 12, 0)
+        _set_counter(db, RetrainTriggerService.TRAINED_KEY, 10, now - timedelta(hours=1))
+
+        # Замало нових feedback
+        _set_counter(db, RetrainTriggerService.FEEDBACK_KEY, 12, now - timedelta(hours=1))
+        due, pending, _ = retrain_trigger_service.check(db, min_feedback=5, now=now)
+        assert (due, pending) == (False, 2)
+
+        # Достатньо, але останній feedback щойно - чекаємо quiet period
+        _set_counter(db, RetrainTriggerService.FEEDBACK_KEY, 20, now - timedelta(minutes=2))
+        due, pending, reason = retrain_trigger_service.check(db, min_feedback=5, now=now)
+        assert (due, pending) == (False, 10)
+        assert "quiet" in reason
+
+        # Quiet period минув
+        due, pending, _ = retrain_trigger_service.check(db, min_feedback=5, now=now + timedelta(minutes=10))
+        print(f"[OK] Після quiet period: due={due}, pending={pending}")
+        assert (due, pending) == (True, 10)
+
+        # mark_triggered скидає лічильник нових feedback
+        retrain_trigger_service.mark_triggered(db)
+        db.commit()
+        due, pending, _ = retrain_trigger_service.check(db, min_feedback=5, now=now + timedelta(minutes=10))
+        assert (due, pending) == (False, 0)
+    finally:
+        _with_settings(**saved)
+        db.close()
+
+
+def test_max_wait_overrides_quiet_period():
+    db = _make_db()
+    saved = _with_settings(
+        ML_RETRAIN_QUIET_MINUTES=10,
+        ML_RETRAIN_MAX_WAIT_HOURS=6,
+        ML_RETRAIN_OFFPEAK_START_HOUR=None,
+        ML_RETRAIN_OFFPEAK_END_HOUR=None,
+    )
+    try:
+        now = datetime(2026, 1, 15, 12, 0)
+        # Feedback надходить безперервно, але з попереднього запуску минуло 7 годин
+        _set_counter(db, RetrainTriggerService.TRAINED_KEY, 0, now - timedelta(hours=7))
+        _set_counter(db, RetrainTriggerService.FEEDBACK_KEY, 50, now - timedelta(seconds=30))
+
+        due, pending, _ = retrain_trigger_service.check(db, min_feedback=5, now=now)
+        print(f"[OK] Max wait: due={due}, pending={pending}")
+        assert (due, pending) == (True, 50)
+
+        # Без попереднього запуску max wait не відраховується
+        db.query(CacheVersion).filter(CacheVersion.name == RetrainTriggerService.TRAINED_KEY).delete()
+        db.commit()
+        due, _, _ = retrain_trigger_service.check(db, min_feedback=5, now=now)
+        assert due is False
+    finally:
+        _with_settings(**saved)
+        db.close()
+
+
+def test_offpeak_window():
+    saved = _with_settings(ML_RETRAIN_OFFPEAK_START_HOUR=None, ML_RETRAIN_OFFPEAK_END_HOUR=None)
+    try:
+        assert RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 14, 0))
+
+        # Вікно в межах доби
+        _with_settings(ML_RETRAIN_OFFPEAK_START_HOUR=1, ML_RETRAIN_OFFPEAK_END_HOUR=5)
+        assert RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 1, 0))
+        assert RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 4, 59))
+        assert not RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 5, 0))
+
+        # Вікно через північ
+        _with_settings(ML_RETRAIN_OFFPEAK_START_HOUR=22, ML_RETRAIN_OFFPEAK_END_HOUR=6)
+        assert RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 23, 0))
+        assert RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 3, 0))
+        assert not RetrainTriggerService.in_offpeak_window(datetime(2026, 1, 15, 12, 0))
+        print("[OK] Off-peak вікна")
+    finally:
+        _with_settings(**saved)
+
+
+if __name__ == "__main__":
+    test_threshold_and_quiet_period()
+    test_max_wait_overrides_quiet_period()
+    test_offpeak_window()
@@ -0,0 +1,97 @@
+"""
+Тест lease лідера фонових задач (SchedulerLeaseService).
+
+Два екземпляри сервісу з різними process_id імітують два uvicorn workers:
+захоплення, продовження, блокування іншого власника, перехоплення після
+спливання TTL і звільнення при shutdown.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.scheduler_lease import SchedulerLease
+from app.services.scheduler_lease_service import SchedulerLeaseService
+
+LEASE = "ml_scheduler"
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _worker(name):
+    service = SchedulerLeaseService()
+    # Фіксований id замість host:pid:token - обидва "процеси" живуть в одному
+    service._process_id = name
+    service._process_pid = os.getpid()
+    return service
+
+
+def _expire(db):
+    db.query(SchedulerLease).filter(SchedulerLease.name == LEASE).update(
+        {SchedulerLease.expires_at: datetime.utcnow() - timedelta(seconds=1)},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def test_acquire_renew_and_block():
+    db = _make_db()
+    worker_a, worker_b = _worker("worker-a"), _worker("worker-b")
+
+    assert worker_a.try_acquire(db, LEASE) is True
+    lease = SchedulerLeaseService.get_lease(db, LEASE)
+    acquired_at, first_expiry = lease.acquired_at, lease.expires_at
+
+    # Інший процес не захоплює чинну lease
+    assert worker_b.try_acquire(db, LEASE) is False
+
+    # Heartbeat продовжує lease, не змінюючи acquired_at
+    assert worker_a.try_acquire(db, LEASE) is True
+    db.expire_all()
+    lease = SchedulerLeaseService.get_lease(db, LEASE)
+    print(f"[OK] Лідер {lease.holder}, lease до {lease.expires_at}")
+    assert lease.holder == "worker-a"
+    assert lease.acquired_at == acquired_at
+    assert lease.expires_at >= first_expiry
+    db.close()
+
+
+def test_takeover_after_expiry_and_release():
+    db = _make_db()
+    worker_a, worker_b = _worker("worker-a"), _worker("worker-b")
+
+    assert worker_a.try_acquire(db, LEASE) is True
+
+    # Лідер "впав": heartbeat не продовжив lease до TTL
+    _expire(db)
+    assert worker_b.try_acquire(db, LEASE) is True
+    assert worker_a.try_acquire(db, LEASE) is False
+    db.expire_all()
+    assert SchedulerLeaseService.get_lease(db, LEASE).holder == "worker-b"
+
+    # Звільнення чужої lease нічого не змінює; своєї - дозволяє перехоплення одразу
+    worker_a.release(db, LEASE)
+    assert worker_a.try_acquire(db, LEASE) is False
+    worker_b.release(db, LEASE)
+    assert worker_a.try_acquire(db, LEASE) is True
+    db.expire_all()
+    print(f"[OK] Після release лідер: {SchedulerLeaseService.get_lease(db, LEASE).holder}")
+    assert SchedulerLeaseService.get_lease(db, LEASE).holder == "worker-a"
+    db.close()
+
+
+if __name__ == "__main__":
+    test_acquire_renew_and_block()
+    test_takeover_after_expiry_and_release()
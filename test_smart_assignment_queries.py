@@ -0,0 +1,190 @@
+"""
+Тест кількості SQL-запитів SmartAssignmentService.find_best_assignee.
+
+Перевіряє, що кількість запитів не залежить від розміру департаменту
+(workload читається одним запитом з agent_workload, кандидати - з кешу пулів,
+для якого перевіряється лише версія), і що skill match переходить на keyword
+matching, коли вектор тікета не має спільних термінів з профілями агентів.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+import tempfile
+from pathlib import Path
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, Department, Ticket
+from app.core.enums import RoleEnum, StatusEnum
+from app.ml_model import MLClassifier, ml_model
+from app.services.smart_assignment_service import SmartAssignmentService, smart_assignment_service
+from app.services.skill_vector_service import SkillVectorService
+from app.services.workload_service import workload_service
+from app.services.specialty_index_service import specialty_index_service
+from app.services.candidate_pool_service import candidate_pool_service
+
+
+def _count_queries_for_department(agents_count: int) -> int:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        dept = Department(name=f"Dept {agents_count}")
+        creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+        db.add_all([dept, creator])
+        db.flush()
+
+        agents = [
+            User(
+                email=f"agent{i}@example.com",
+                hashed_password="x",
+                full_name=f"Agent {i}",
+                role=RoleEnum.AGENT,
+                department_id=dept.id,
+                specialty="VPN,Network",
+            )
+            for i in range(agents_count)
+        ]
+        db.add_all(agents)
+        db.flush()
+
+        # Кожному агенту по одному активному тікету
+        db.add_all([
+            Ticket(
+                title=f"Ticket {i}",
+                description="VPN connection drops",
+                status=StatusEnum.IN_PROGRESS,
+                created_by_user_id=creator.id,
+                assigned_to_user_id=agent.id,
+                department_id=dept.id,
+            )
+            for i, agent in enumerate(agents)
+        ])
+        db.commit()
+        workload_service.reconcile(db)
+        specialty_index_service.rebuild(db)
+        dept_id = dept.id
+
+        # Кожен тест має власну БД - прогріваємо пул кандидатів саме з неї
+        candidate_pool_service.invalidate()
+        candidate_pool_service.get_pool(dept_id, db)
+
+        statements = []
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _on_execute)
+        try:
+            result = smart_assignment_service.find_best_assignee(
+                ticket_text="VPN is not working",
+                priority="P2",
+                category="Network",
+                department_id=dept_id,
+                llm_team=None,
+                llm_assignee=None,
+                db=db,
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", _on_execute)
+
+        assert result["assignee_id"] is not None
+        assert result["alternatives"][0]["workload"] == 0.9
+
+        return len(statements)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_find_best_assignee_query_count_is_constant():
+    small = _count_queries_for_department(3)
+    large = _count_queries_for_department(80)
+
+    print(f"[OK] Запитів для 3 агентів: {small}, для 80 агентів: {large}")
+    assert small == large
+    assert large <= 2
+
+
+class _IdentityTranslator:
+    def __init__(self):
+        self.calls = 0
+
+    def translate(self, text):
+        self.calls += 1
+        return text
+
+
+def test_skill_scores_fall_back_when_ticket_vector_is_zero():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    import app.services.smart_assignment_service as smart_assignment_module
+
+    saved_model = (ml_model.model, ml_model.vectorizer, ml_model.vectorizer_fingerprint, ml_model.translator)
+    saved_service = smart_assignment_module.skill_vector_service
+    try:
+        creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+        network = User(email="net@example.com", hashed_password="x", role=RoleEnum.AGENT, specialty="VPN,Network")
+        printers = User(email="print@example.com", hashed_password="x", role=RoleEnum.AGENT, specialty="Printer")
+        db.add_all([creator, network, printers])
+        db.flush()
+        db.add(Ticket(
+            title="VPN tunnel", description="VPN tunnel drops on network switch",
+            status=StatusEnum.RESOLVED, created_by_user_id=creator.id, assigned_to_user_id=network.id,
+        ))
+        db.commit()
+        specialty_index_service.rebuild(db)
+
+        # Словник моделі без "printer": тікет про принтер дає нульовий вектор
+        vectorizer = TfidfVectorizer().fit(["vpn tunnel drops", "network switch outage", "password reset"])
+        ml_model.model = {"vectorizer": vectorizer}
+        ml_model.vectorizer = vectorizer
+        ml_model.vectorizer_fingerprint = MLClassifier.fingerprint(vectorizer)
+        ml_model.translator = _IdentityTranslator()
+
+        service = SkillVectorService()
+        service.artifact_path = Path(tempfile.mkdtemp()) / SkillVectorService.ARTIFACT_NAME
+        service.refresh(db)
+        smart_assignment_module.skill_vector_service = service
+        agents = [network, printers]
+
+        # Без перекладу вектор тікета рахується один раз і йде і в skill matching, і в модель
+        source_vector, model_vector = ml_model.transform_with_source("VPN tunnel drops")
+        assert source_vector is model_vector
+        assert ml_model.translator.calls == 1
+
+        vpn_scores = SmartAssignmentService._skill_scores("VPN tunnel drops", source_vector, agents, db)
+        assert set(vpn_scores) == {network.id}
+        assert 0 < vpn_scores[network.id] < 1
+
+        printer_vector, _ = ml_model.transform_with_source("Printer jam")
+        assert printer_vector.nnz == 0
+        assert service.match_scores(agents, ticket_vector=printer_vector) is None
+
+        printer_scores = SmartAssignmentService._skill_scores("Printer jam", printer_vector, agents, db)
+        print(f"[OK] Skill scores: VPN={vpn_scores}, Printer (keyword fallback)={printer_scores}")
+        assert printer_scores == {printers.id: 1.0}
+    finally:
+        ml_model.model, ml_model.vectorizer, ml_model.vectorizer_fingerprint, ml_model.translator = saved_model
+        smart_assignment_module.skill_vector_service = saved_service
+        specialty_index_service.invalidate()
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_find_best_assignee_query_count_is_constant()
+    test_skill_scores_fall_back_when_ticket_vector_is_zero()
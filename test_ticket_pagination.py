@@ -0,0 +1,130 @@
+"""
+Тест keyset пагінації списку тікетів (GET /tickets) і агрегатів для analytics.
+
+Перевіряє, що проходження сторінок за X-Next-Cursor повертає кожен тікет
+рівно один раз у порядку (triage_required, created_at, id) desc, що
+X-Total-Count рахує всі тікети за фільтрами і що GET /tickets/stats
+рахує з тими самими правами видимості і фільтрами.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, Ticket
+from app.core.enums import RoleEnum, StatusEnum, PriorityEnum
+from app.routers.tickets import list_tickets, get_ticket_stats
+from app.services.ticket_count_service import ticket_count_service
+
+LIST_DEFAULTS = dict(
+    status=None, priority=None, category=None, department_id=None,
+    assignee_id=None, creator_id=None, triage_required=None,
+)
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    admin = User(email="admin@example.com", hashed_password="x", role=RoleEnum.ADMIN)
+    creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+    db.add_all([admin, creator])
+    db.commit()
+
+    # Однаковий created_at у кількох тікетів - порядок між ними визначає id
+    base = datetime(2026, 1, 1, 12, 0)
+    db.add_all([
+        Ticket(
+            title=f"T{i}",
+            description="d",
+            status=StatusEnum.TRIAGE if i % 3 == 0 else StatusEnum.NEW,
+            priority_manual=PriorityEnum.P1 if i % 2 else PriorityEnum.P3,
+            triage_required=i % 3 == 0,
+            created_by_user_id=(creator if i < 5 else admin).id,
+            created_at=base + timedelta(minutes=i // 2),
+        )
+        for i in range(11)
+    ])
+    db.commit()
+
+    # Кеш total живе між тестами - кожен тест має власну БД
+    ticket_count_service._counts.clear()
+    return db, admin, creator
+
+
+def _page(db, user, cursor=None, limit=3, include_total=False):
+    response = Response()
+    tickets = list_tickets(
+        response=response, limit=limit, cursor=cursor, include_total=include_total,
+        current_user=user, db=db, **LIST_DEFAULTS,
+    )
+    return tickets, response.headers.get("X-Next-Cursor"), response.headers.get("X-Total-Count")
+
+
+def test_cursor_round_trip_and_total():
+    db, admin, _ = _make_db()
+
+    pages = []
+    tickets, cursor, total = _page(db, admin, include_total=True)
+    pages.append(tickets)
+    while cursor:
+        tickets, cursor, _ = _page(db, admin, cursor=cursor)
+        pages.append(tickets)
+
+    seen = [ticket.id for page in pages for ticket in page]
+    expected = [
+        ticket.id for ticket in sorted(
+            db.query(Ticket).all(),
+            key=lambda t: (t.triage_required, t.created_at, t.id),
+            reverse=True,
+        )
+    ]
+    print(f"[OK] {len(pages)} сторінок, total={total}")
+    assert seen == expected
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    assert total == "11"
+    db.close()
+
+
+def test_stats_respect_visibility():
+    db, admin, creator = _make_db()
+
+    stats = get_ticket_stats(current_user=admin, db=db, **LIST_DEFAULTS)
+    print(f"[OK] Stats (ADMIN): {stats.model_dump()}")
+    assert stats.total == 11
+    assert stats.triage_required == 4
+    assert stats.by_status == {"NEW": 7, "TRIAGE": 4, "IN_PROGRESS": 0, "RESOLVED": 0, "CLOSED": 0}
+    assert stats.by_priority == {"P1": 5, "P2": 0, "P3": 6}
+
+    # USER бачить лише свої тікети - як і в списку
+    own = get_ticket_stats(current_user=creator, db=db, **LIST_DEFAULTS)
+    tickets, cursor, _ = _page(db, creator, limit=100)
+    assert cursor is None
+    assert own.total == len(tickets) == 5
+
+    # Лічильники Board за фільтром збігаються зі списком за тим самим фільтром
+    filters = dict(LIST_DEFAULTS, priority=PriorityEnum.P1, triage_required=False)
+    filtered = get_ticket_stats(current_user=admin, db=db, **filters)
+    listed = list_tickets(
+        response=Response(), limit=100, cursor=None, include_total=False,
+        current_user=admin, db=db, **filters,
+    )
+    assert filtered.total == len(listed) == 3
+    assert filtered.triage_required == 0
+    assert filtered.by_status["NEW"] == 3
+    assert filtered.by_priority == {"P1": 3, "P2": 0, "P3": 0}
+    db.close()
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip_and_total()
+    test_stats_respect_visibility()
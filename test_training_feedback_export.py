@@ -0,0 +1,203 @@
+"""
+Тест append-only експорту priority feedback (TrainingFeedbackService).
+
+Перевіряє, що повторні експорти дописують лише новий feedback (watermark +
+перекриття без дублів), що пізно закомічений feedback в межах перекриття не
+губиться, що compaction лишає один рядок на лог, і що експорт тримає
+міжпроцесний flock на sidecar lock-файлі. Для FeedbackExportWorker - що
+сигнали впалого експорту повертаються в чергу і експорт повторюється.
+Використовує окрему in-memory SQLite базу і тимчасовий каталог.
+"""
+import csv
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, Ticket
+from app.models.ml_log import MLPredictionLog
+from app.core.enums import RoleEnum, PriorityEnum
+from app.config import settings
+from app.services import feedback_export_worker as worker_module
+from app.services import training_feedback_service as feedback_module
+from app.services.feedback_export_worker import FeedbackExportWorker
+from app.services.training_feedback_service import TrainingFeedbackService
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+    db.add(creator)
+    db.commit()
+    return db, creator
+
+
+def _feedback(db, creator, recorded_at, priority=PriorityEnum.P1):
+    ticket = Ticket(title="Disk", description="Disk is full", created_by_user_id=creator.id)
+    db.add(ticket)
+    db.flush()
+    log = MLPredictionLog(
+        ticket_id=ticket.id,
+        priority_predicted=PriorityEnum.P3,
+        priority_final=priority,
+        priority_feedback_recorded_at=recorded_at,
+    )
+    db.add(log)
+    db.commit()
+    return log
+
+
+def _log_ids(path):
+    with path.open(encoding="utf-8", newline="") as fp:
+        return [int(row["log_id"]) for row in csv.DictReader(fp)]
+
+
+def test_append_and_compaction_watermark_dedup():
+    db, creator = _make_db()
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TrainingFeedbackService(export_path=Path(tmp) / "priority_feedback.csv")
+        now = datetime.utcnow()
+
+        first = _feedback(db, creator, now - timedelta(minutes=1))
+        second = _feedback(db, creator, now)
+
+        # Перший експорт - compaction з БД
+        service.export_priority_feedback_dataset(db)
+        assert _log_ids(service.export_path) == [first.id, second.id]
+
+        # Без нових feedback нічого не дописується, хоча запит перекриває watermark
+        service.export_priority_feedback_dataset(db)
+        assert _log_ids(service.export_path) == [first.id, second.id]
+
+        # Пізно закомічений feedback (раніше watermark, але в межах перекриття) і новий
+        late = _feedback(db, creator, now - timedelta(seconds=30))
+        new = _feedback(db, creator, now + timedelta(seconds=5))
+        service.export_priority_feedback_dataset(db)
+        assert _log_ids(service.export_path) == [first.id, second.id, late.id, new.id]
+
+        # Зміна feedback дописує лог ще раз; compaction лишає один рядок на лог
+        first.priority_final = PriorityEnum.P2
+        first.priority_feedback_recorded_at = now + timedelta(seconds=10)
+        db.commit()
+        service.export_priority_feedback_dataset(db)
+        assert _log_ids(service.export_path).count(first.id) == 2
+
+        service.compact_priority_feedback_dataset(db)
+        ids = _log_ids(service.export_path)
+        print(f"[OK] Після compaction: {ids}")
+        assert sorted(ids) == sorted([first.id, second.id, late.id, new.id])
+        assert ids[-1] == first.id
+    db.close()
+
+
+def test_export_holds_cross_process_lock():
+    if feedback_module.fcntl is None:
+        print("[SKIP] fcntl недоступний на цій платформі")
+        return
+    fcntl = feedback_module.fcntl
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TrainingFeedbackService(export_path=Path(tmp) / "priority_feedback.csv")
+        entered, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with service._exclusive():
+                entered.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        assert entered.wait(5)
+        try:
+            # Окремий open() - як інший процес: flock не дається, поки експорт триває
+            with service.lock_path.open("a") as other:
+                try:
+                    fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    blocked = True
+                else:
+                    blocked = False
+                    fcntl.flock(other.fileno(), fcntl.LOCK_UN)
+        finally:
+            release.set()
+            holder.join()
+
+        print(f"[OK] Інший процес заблоковано: {blocked}")
+        assert blocked
+
+        with service.lock_path.open("a") as other:
+            fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(other.fileno(), fcntl.LOCK_UN)
+
+
+class _FlakyFeedbackService:
+    """Перший експорт падає, наступні успішні."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def export_priority_feedback_dataset(self, db):
+        self.calls += 1
+        if self.calls == 1:
+            raise OSError("disk full")
+
+
+class _NullSession:
+    def close(self):
+        pass
+
+
+def test_worker_retries_failed_export():
+    flaky = _FlakyFeedbackService()
+    worker = FeedbackExportWorker()
+
+    original = (
+        worker_module.training_feedback_service, worker_module.SessionLocal,
+        settings.FEEDBACK_EXPORT_DEBOUNCE_SECONDS, settings.TRAINING_EXPORT_FORMAT,
+    )
+    worker_module.training_feedback_service = flaky
+    worker_module.SessionLocal = _NullSession
+    settings.FEEDBACK_EXPORT_DEBOUNCE_SECONDS = 0.05
+    settings.TRAINING_EXPORT_FORMAT = "csv"
+    try:
+        worker.notify()
+        worker.notify()
+
+        deadline = time.monotonic() + 5
+        while worker.metrics()["exports"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        metrics = worker.metrics()
+    finally:
+        worker.shutdown()
+        (
+            worker_module.training_feedback_service, worker_module.SessionLocal,
+            settings.FEEDBACK_EXPORT_DEBOUNCE_SECONDS, settings.TRAINING_EXPORT_FORMAT,
+        ) = original
+
+    print(f"[OK] Після збою: {metrics['failures']} failure, {metrics['exports']} export")
+    assert flaky.calls == 2
+    assert metrics["failures"] == 1
+    assert metrics["exports"] == 1
+    assert metrics["pending_signals"] == 0
+    # Обидва сигнали впалого вікна увійшли в повторний експорт
+    assert metrics["last_batch_signals"] == 2
+    assert metrics["coalesced_signals"] == 1
+    assert metrics["last_error"] is None
+
+
+if __name__ == "__main__":
+    test_append_and_compaction_watermark_dedup()
+    test_export_holds_cross_process_lock()
+    test_worker_retries_failed_export()
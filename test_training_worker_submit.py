@@ -0,0 +1,125 @@
+"""
+Тест постановки навчання в чергу (TrainingWorkerService.submit).
+
+Перевіряє, що перевірка активного job і його створення виконуються під lease:
+поки інший процес тримає lease, submit не створює job, а POST /ml/training/trigger
+повертає 409; після звільнення lease другий submit повертає вже активний job.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User
+from app.models.ml_model_metadata import MLTrainingJob
+from app.models.scheduler_lease import SchedulerLease
+from app.core.enums import RoleEnum
+from app.routers.ml_training import trigger_retrain
+from app.services.scheduler_lease_service import SchedulerLeaseService
+from app.services.training_worker_service import TrainingSubmitConflict, TrainingWorkerService
+
+
+class _FakeExecutor:
+    """Executor, що не запускає процес: job лишається QUEUED."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+        return Future()
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _make_service():
+    service = TrainingWorkerService()
+    executor = _FakeExecutor()
+    service._get_executor = lambda: executor
+    return service, executor
+
+
+def _hold_lease(db, holder="other-worker"):
+    now = datetime.utcnow()
+    db.add(SchedulerLease(
+        name=TrainingWorkerService.SUBMIT_LEASE,
+        holder=holder,
+        acquired_at=now,
+        renewed_at=now,
+        expires_at=now + timedelta(seconds=SchedulerLeaseService.TTL_SECONDS),
+    ))
+    db.commit()
+
+
+def test_submit_creates_single_job_and_releases_lease():
+    db = _make_db()
+    service, executor = _make_service()
+
+    job, created = service.submit(db, training_type="MANUAL")
+    assert created is True
+    assert job.status == "QUEUED"
+    assert len(executor.submitted) == 1
+
+    # Lease звільнено одразу після створення job
+    lease = SchedulerLeaseService.get_lease(db, TrainingWorkerService.SUBMIT_LEASE)
+    assert lease.expires_at <= datetime.utcnow()
+
+    again, created_again = service.submit(db, training_type="INCREMENTAL")
+    print(f"[OK] Повторний submit повернув активний job {again.id}")
+    assert created_again is False
+    assert again.id == job.id
+    assert db.query(MLTrainingJob).count() == 1
+    assert len(executor.submitted) == 1
+    db.close()
+
+
+def test_submit_conflicts_while_other_process_holds_lease():
+    db = _make_db()
+    service, executor = _make_service()
+    _hold_lease(db)
+
+    try:
+        service.submit(db, training_type="MANUAL")
+        raise AssertionError("submit мав завершитися TrainingSubmitConflict")
+    except TrainingSubmitConflict:
+        pass
+    assert db.query(MLTrainingJob).count() == 0
+    assert executor.submitted == []
+
+    admin = User(email="admin@example.com", hashed_password="x", role=RoleEnum.ADMIN)
+    db.add(admin)
+    db.commit()
+
+    import app.routers.ml_training as ml_training_router
+
+    original_service = ml_training_router.training_worker_service
+    ml_training_router.training_worker_service = service
+    try:
+        trigger_retrain(force=True, current_user=admin, db=db)
+        raise AssertionError("trigger мав повернути 409")
+    except HTTPException as e:
+        print(f"[OK] Конкурентний trigger: {e.status_code} {e.detail}")
+        assert e.status_code == 409
+    finally:
+        ml_training_router.training_worker_service = original_service
+
+    assert db.query(MLTrainingJob).count() == 0
+    db.close()
+
+
+if __name__ == "__main__":
+    test_submit_creates_single_job_and_releases_lease()
+    test_submit_conflicts_while_other_process_holds_lease()
@@ -0,0 +1,139 @@
+"""
+Тест лічильників agent_workload (WorkloadService).
+
+Перевіряє інкрементальні зміни при призначенні/закритті тікетів,
+виправлення дрейфу reconciliation-задачею і конфлікт першого INSERT
+лічильника з паралельною транзакцією.
+Використовує окрему in-memory SQLite базу, робоча БД не зачіпається.
+"""
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import User, Ticket
+from app.models.agent_workload import AgentWorkload
+from app.core.enums import RoleEnum, StatusEnum
+from app.services.workload_service import WorkloadService, workload_service
+
+
+def _make_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _setup(db):
+    creator = User(email="creator@example.com", hashed_password="x", role=RoleEnum.USER)
+    agent_a = User(email="a@example.com", hashed_password="x", role=RoleEnum.AGENT)
+    agent_b = User(email="b@example.com", hashed_password="x", role=RoleEnum.AGENT)
+    db.add_all([creator, agent_a, agent_b])
+    db.commit()
+    return creator, agent_a, agent_b
+
+
+def _assign(db, ticket, assignee_id=None, status=None):
+    previous_assignee_id, previous_status = ticket.assigned_to_user_id, ticket.status
+    if assignee_id is not None:
+        ticket.assigned_to_user_id = assignee_id
+    if status is not None:
+        ticket.status = status
+    workload_service.on_ticket_changed(db, ticket, previous_assignee_id, previous_status)
+    db.commit()
+
+
+def test_counters_follow_assignment_and_status():
+    db = _make_db()
+    creator, agent_a, agent_b = _setup(db)
+
+    tickets = [
+        Ticket(title=f"T{i}", description="d", status=StatusEnum.NEW, created_by_user_id=creator.id)
+        for i in range(3)
+    ]
+    db.add_all(tickets)
+    db.commit()
+
+    for ticket in tickets:
+        _assign(db, ticket, assignee_id=agent_a.id)
+    assert workload_service.get_active_counts([agent_a.id, agent_b.id], db) == {agent_a.id: 3}
+
+    # Перепризначення: -1 у старого, +1 у нового
+    _assign(db, tickets[0], assignee_id=agent_b.id)
+    # Закриття знімає тікет з активного навантаження
+    _assign(db, tickets[1], status=StatusEnum.CLOSED)
+    # Зміна між активними статусами не змінює лічильник
+    _assign(db, tickets[2], status=StatusEnum.IN_PROGRESS)
+
+    counts = workload_service.get_active_counts([agent_a.id, agent_b.id], db)
+    print(f"[OK] Лічильники після змін: {counts}")
+    assert counts == {agent_a.id: 1, agent_b.id: 1}
+    db.close()
+
+
+def test_reconcile_fixes_drift():
+    db = _make_db()
+    creator, agent_a, agent_b = _setup(db)
+
+    db.add_all([
+        Ticket(title="T1", description="d", status=StatusEnum.IN_PROGRESS,
+               created_by_user_id=creator.id, assigned_to_user_id=agent_a.id),
+        Ticket(title="T2", description="d", status=StatusEnum.NEW,
+               created_by_user_id=creator.id, assigned_to_user_id=agent_b.id),
+        Ticket(title="T3", description="d", status=StatusEnum.RESOLVED,
+               created_by_user_id=creator.id, assigned_to_user_id=agent_b.id),
+    ])
+    # Дрейф: в agent_a зайвий лічильник, в agent_b рядка немає взагалі
+    db.add(AgentWorkload(user_id=agent_a.id, active_tickets=5))
+    db.commit()
+
+    fixed = workload_service.reconcile(db)
+
+    counts = workload_service.get_active_counts([agent_a.id, agent_b.id], db)
+    print(f"[OK] Виправлено {fixed} лічильник(и): {counts}")
+    assert fixed == 2
+    assert counts == {agent_a.id: 1, agent_b.id: 1}
+    assert workload_service.reconcile(db) == 0
+    db.close()
+
+
+def test_concurrent_first_insert_retries_update():
+    db = _make_db()
+    creator, agent_a, _ = _setup(db)
+
+    ticket = Ticket(title="T1", description="d", status=StatusEnum.NEW, created_by_user_id=creator.id)
+    db.add(ticket)
+    db.commit()
+
+    original_increment = WorkloadService._increment
+    calls = []
+
+    def racing_increment(session, user_id, delta):
+        calls.append(delta)
+        if len(calls) == 1:
+            # Інша транзакція створює рядок між нашим UPDATE і INSERT
+            session.execute(insert(AgentWorkload).values(user_id=user_id, active_tickets=2))
+            return False
+        return original_increment(session, user_id, delta)
+
+    WorkloadService._increment = staticmethod(racing_increment)
+    try:
+        _assign(db, ticket, assignee_id=agent_a.id)
+    finally:
+        WorkloadService._increment = staticmethod(original_increment)
+
+    counts = workload_service.get_active_counts([agent_a.id], db)
+    print(f"[OK] Після конфлікту INSERT: {counts}")
+    assert len(calls) == 2
+    assert counts == {agent_a.id: 3}
+    assert db.get(Ticket, ticket.id).assigned_to_user_id == agent_a.id
+    db.close()
+
+
+if __name__ == "__main__":
+    test_counters_follow_assignment_and_status()
+    test_reconcile_fixes_drift()
+    test_concurrent_first_insert_retries_update()
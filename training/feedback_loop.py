@@ -19,7 +19,7 @@ def session_scope():
 
 def main() -> None:
     with session_scope() as session:
-        path = training_feedback_service.export_priority_feedback_dataset(session)
+        path = training_feedback_service.compact_priority_feedback_dataset(session)
         print(f"[training] Exported priority feedback dataset to {path}")
 
 